@@ -0,0 +1,318 @@
+"""Microbenchmarks for the local hot paths.
+
+Times project load/save, round and bullet operations, the near-duplicate
+index and the response parsers on synthetic projects of several sizes,
+plus the cold start of every CLI command with the stub client from
+benchmarks.stub (no network).
+
+    python -m benchmarks.run --rounds 10,1000,10000 --output bench.json
+    python -m benchmarks.run --output new.json --compare bench.json
+
+Results are JSON: {"meta": {...}, "results": {name: {"median", "min", "runs"}}}
+with times in seconds. ``--compare`` flags every benchmark whose median is
+more than ``--threshold`` slower than in the baseline file and exits with
+status 1 if there are any. Set PROJECTMAKER_DB to benchmark the SQLite store
+instead of project.json.
+"""
+
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+from projectmaker.core import ai_client, project
+from projectmaker.core.model import Bullet, Project, Round
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROUNDS = "10,1000,10000"
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA = 0.0005
+BULLETS_PER_ROUND = 6
+ACCEPT_EVERY = 10
+
+WORDS = (
+    "api cache queue schema index user account billing report export search sync "
+    "offline mobile webhook audit role token session dashboard metric alert"
+).split()
+
+# (name, CLI args, stdin). "init" runs in an empty directory, the rest in a synthetic project.
+CLI_COMMANDS = (
+    ("init", ["init", "bench"], None),
+    ("brainstorm", ["--no-cache", "brainstorm", "more ideas"], None),
+    ("brainstorm --stream", ["--no-cache", "brainstorm", "--stream", "more ideas"], None),
+    ("select", ["select", "1"], "1\n"),
+    ("analyze", ["--no-cache", "analyze"], None),
+    ("plan", ["--no-cache", "plan"], None),
+    ("export", ["export"], None),
+    ("cache", ["cache"], None),
+    ("stats", ["stats"], None),
+)
+
+
+def synthetic_response(rng: random.Random, response_bytes: int) -> str:
+    """A brainstorm-style response: checkbox bullets followed by filler prose."""
+    lines = [
+        f"- [ ] {' '.join(rng.choices(WORDS, k=8)).capitalize()}" for _ in range(BULLETS_PER_ROUND)
+    ]
+    text = "\n".join(lines) + "\n\n"
+    while len(text) < response_bytes:
+        text += " ".join(rng.choices(WORDS, k=16)).capitalize() + ".\n"
+    return text
+
+
+def synthetic_project(rounds: int, response_bytes: int, seed: int = 0) -> Project:
+    """A project with ``rounds`` rounds; one bullet of every ACCEPT_EVERY-th round is accepted."""
+    rng = random.Random(seed)
+    proj = project.create_project("bench")
+    timestamp = datetime.now(timezone.utc).isoformat()
+    for i in range(1, rounds + 1):
+        response = synthetic_response(rng, response_bytes)
+        bullets = [Bullet(n + 1, text) for n, text in enumerate(project.parse_bullets(response))]
+        if i % ACCEPT_EVERY == 1:
+            bullets[0].selected = True
+            proj.accepted_ideas.add(bullets[0].text)
+        proj.append_round(Round(i, timestamp, f"Prompt {i}", bullets, response))
+    return proj
+
+
+def measure(fn, setup=None, repeat: int = 5, number: int = 1) -> dict:
+    """Time ``fn(setup())``; each of ``repeat`` samples is the mean of ``number`` calls.
+
+    Garbage collection is disabled while timing, as in timeit.
+    """
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn(state)
+            samples.append((time.perf_counter() - start) / number)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    return {"median": statistics.median(samples), "min": min(samples), "runs": repeat}
+
+
+@contextmanager
+def working_directory(path: Path):
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+
+
+def bench_parsers(response_bytes: int, repeat: int) -> dict:
+    rng = random.Random(1)
+    response = synthetic_response(rng, response_bytes)
+    analysis = "READY: false\nGAPS: " + ", ".join(WORDS) + "\nSUMMARY: " + response.replace("\n", " ")
+    size = f"bytes={response_bytes}"
+    return {
+        f"parse_bullets[{size}]": measure(lambda _: project.parse_bullets(response), repeat=repeat, number=20),
+        f"parse_analysis[{size}]": measure(lambda _: ai_client.parse_analysis(analysis), repeat=repeat, number=20),
+    }
+
+
+def bench_project(rounds: int, response_bytes: int, repeat: int) -> dict:
+    """Project operations on a stored synthetic project with ``rounds`` rounds."""
+    tag = f"rounds={rounds}"
+    middle = max(1, rounds // 2)
+    response = synthetic_response(random.Random(2), response_bytes)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp, working_directory(Path(tmp)):
+        proj = synthetic_project(rounds, response_bytes)
+
+        results[f"save_project.full[{tag}]"] = measure(
+            project.save_project, lambda: Project.from_dict(proj.to_dict()), repeat=repeat
+        )
+
+        def loaded_with_round():
+            loaded = project.load_project(lazy=True)
+            project.add_round(loaded, "extra", response)
+            return loaded
+
+        results[f"save_project.journal[{tag}]"] = measure(project.save_project, loaded_with_round, repeat=repeat)
+        project.compact_project(project.load_project())
+
+        results[f"load_project[{tag}]"] = measure(lambda _: project.load_project(), repeat=repeat)
+        results[f"load_project.lazy[{tag}]"] = measure(lambda _: project.load_project(lazy=True), repeat=repeat)
+
+        loaded = project.load_project()
+        results[f"add_round[{tag}]"] = measure(
+            lambda p: project.add_round(p, "extra", response), lambda: loaded, repeat=repeat, number=10
+        )
+        results[f"select_bullets[{tag}]"] = measure(
+            lambda p: project.select_bullets(p, middle, [1, 2]), lambda: loaded, repeat=repeat, number=10
+        )
+        results[f"get_round[{tag}]"] = measure(
+            lambda p: project.get_round(p, middle), lambda: loaded, repeat=repeat, number=100
+        )
+        results[f"get_round.lazy[{tag}]"] = measure(
+            lambda p: project.get_round(p, middle), lambda: project.load_project(lazy=True), repeat=repeat
+        )
+
+        project.load_idea_index(project.load_project(lazy=True))
+        results[f"load_idea_index[{tag}]"] = measure(
+            lambda _: project.load_idea_index(project.load_project(lazy=True)), repeat=repeat
+        )
+        indexed = project.load_project(lazy=True)
+        project.load_idea_index(indexed)
+        fresh = iter([synthetic_response(random.Random(seed), response_bytes) for seed in range(repeat * 10)])
+        results[f"add_round.indexed[{tag}]"] = measure(
+            lambda p: project.add_round(p, "extra", next(fresh)), lambda: indexed, repeat=repeat, number=10
+        )
+
+        project.compact_project(project.load_project(), packed=True)
+        results[f"save_project.full.packed[{tag}]"] = measure(
+            project.save_project, lambda: Project.from_dict(proj.to_dict()), repeat=repeat
+        )
+        results[f"load_project.packed[{tag}]"] = measure(lambda _: project.load_project(), repeat=repeat)
+        results[f"get_round.lazy.packed[{tag}]"] = measure(
+            lambda p: project.get_round(p, middle), lambda: project.load_project(lazy=True), repeat=repeat
+        )
+    return results
+
+
+def run_cli(args: list[str], cwd: Path, env: dict, stdin: str | None = None) -> None:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.stub", *args],
+        cwd=cwd, env=env, input=stdin, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"projectmaker {' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+
+
+def bench_cli(rounds: int, response_bytes: int, repeat: int) -> dict:
+    """Wall-clock time of each CLI command in a fresh interpreter."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])),
+            "PROJECTMAKER_CACHE_DIR": str(tmp / "cache"),
+            "PROJECTMAKER_METRICS": str(tmp / "metrics.jsonl"),
+        }
+        project_dir = tmp / "project"
+        project_dir.mkdir()
+        with working_directory(project_dir):
+            project.save_project(synthetic_project(rounds, response_bytes))
+
+        empty_dirs = iter(range(repeat))
+        for name, args, stdin in CLI_COMMANDS:
+            if name == "init":
+                def setup():
+                    path = tmp / f"init-{next(empty_dirs)}"
+                    path.mkdir()
+                    return path
+            else:
+                def setup():
+                    return project_dir
+            results[f"cli.{name}[rounds={rounds}]"] = measure(
+                lambda cwd, args=args, stdin=stdin: run_cli(args, cwd, env, stdin), setup, repeat=repeat
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            min_delta: float = MIN_DELTA) -> list[tuple[str, float, float]]:
+    """(name, baseline median, current median) for every benchmark that regressed.
+
+    A regression is a median more than ``threshold`` (a fraction) slower
+    than the baseline and at least ``min_delta`` seconds slower, so timer
+    noise on microsecond-scale benchmarks isn't flagged.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        before, after = base["median"], current["median"]
+        if after > before * (1 + threshold) and after - before >= min_delta:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def format_seconds(value: float) -> str:
+    if value < 1e-3:
+        return f"{value * 1e6:.1f}us"
+    if value < 1:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value:.2f}s"
+
+
+@click.command()
+@click.option("--rounds", default=DEFAULT_ROUNDS, show_default=True,
+              help="Comma-separated synthetic project sizes.")
+@click.option("--response-bytes", default=4096, show_default=True,
+              help="Size of each round's raw_response.")
+@click.option("--repeat", default=5, show_default=True, type=click.IntRange(min=1),
+              help="Samples per benchmark.")
+@click.option("--cli-rounds", default=1000, show_default=True,
+              help="Project size for the CLI cold-start benchmarks.")
+@click.option("--no-cli", is_flag=True, help="Skip the CLI cold-start benchmarks.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="Write results as JSON.")
+@click.option("--compare", "baseline_path", type=click.Path(exists=True, dir_okay=False),
+              help="Baseline results file to check for regressions.")
+@click.option("--threshold", default=DEFAULT_THRESHOLD, show_default=True,
+              help="Allowed slowdown against the baseline, as a fraction.")
+def main(rounds, response_bytes, repeat, cli_rounds, no_cli, output, baseline_path, threshold):
+    """Run the benchmarks and optionally compare them with a baseline."""
+    sizes = [int(n) for n in rounds.split(",") if n.strip()]
+    results = bench_parsers(response_bytes, repeat)
+    for size in sizes:
+        click.echo(f"Benchmarking a project with {size} rounds...", err=True)
+        results.update(bench_project(size, response_bytes, repeat))
+    if not no_cli:
+        click.echo(f"Benchmarking CLI cold start ({cli_rounds} rounds)...", err=True)
+        results.update(bench_cli(cli_rounds, response_bytes, repeat))
+
+    width = max(len(name) for name in results)
+    for name, r in results.items():
+        click.echo(f"{name:<{width}}  median {format_seconds(r['median']):>10}  min {format_seconds(r['min']):>10}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "store": "sqlite" if os.environ.get("PROJECTMAKER_DB") else "file",
+            "response_bytes": response_bytes,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2) + "\n")
+        click.echo(f"Results written to {output}.", err=True)
+
+    if baseline_path:
+        baseline = json.loads(Path(baseline_path).read_text())["results"]
+        regressions = compare(results, baseline, threshold)
+        if not regressions:
+            click.echo(f"No regressions against {baseline_path}.")
+            return
+        click.echo(f"{len(regressions)} regression(s) against {baseline_path}:")
+        for name, before, after in regressions:
+            click.echo(f"  {name}: {format_seconds(before)} -> {format_seconds(after)} ({after / before:.2f}x)")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
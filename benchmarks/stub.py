@@ -0,0 +1,109 @@
+"""Offline stand-in for the Anthropic client, used by the benchmarks.
+
+``python -m benchmarks.stub <projectmaker args>`` runs the CLI in a fresh
+interpreter with ai_client's create_client/create_async_client replaced by
+the stubs below. The replacement is installed from an import hook, so
+commands that never import ai_client still start exactly as they do in
+production.
+"""
+
+import importlib.abc
+import importlib.util
+import sys
+from types import SimpleNamespace
+
+BULLETS = 6
+
+
+def respond(system: str) -> str:
+    """Canned response text matching the kind of request ``system`` belongs to."""
+    if "analy" in system.lower():
+        return "READY: true\nGAPS: none\nSUMMARY: Synthetic project is complete."
+    if "architect" in system.lower():
+        return "# Plan\n\n" + "".join(f"## Phase {i}\n\n- Task {i}\n\n" for i in range(1, 6))
+    if "summarize" in system.lower():
+        return "Synthetic summary of earlier ideas."
+    return "".join(f"- [ ] Stub idea {i}\n" for i in range(1, BULLETS + 1))
+
+
+def _message(text: str):
+    usage = SimpleNamespace(
+        input_tokens=0, output_tokens=0, cache_creation_input_tokens=0, cache_read_input_tokens=0
+    )
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage)
+
+
+class _Stream:
+    def __init__(self, text: str):
+        self._message = _message(text)
+        self.text_stream = iter(text.splitlines(keepends=True))
+
+    def get_final_message(self):
+        return self._message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Messages:
+    def create(self, system: str = "", **kwargs):
+        return _message(respond(system))
+
+    def stream(self, system: str = "", **kwargs):
+        return _Stream(respond(system))
+
+
+class _AsyncMessages:
+    async def create(self, system: str = "", **kwargs):
+        return _message(respond(system))
+
+
+class StubClient:
+    """Answers every request instantly with respond()."""
+
+    def __init__(self):
+        self.messages = _Messages()
+
+
+class AsyncStubClient:
+    def __init__(self):
+        self.messages = _AsyncMessages()
+
+
+class _StubInstaller(importlib.abc.MetaPathFinder):
+    """Patches the stub clients into ai_client right after it is first imported."""
+
+    def find_spec(self, name, path, target=None):
+        if name != "projectmaker.core.ai_client":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(name)
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            module.create_client = StubClient
+            module.create_async_client = AsyncStubClient
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
+
+
+def install() -> None:
+    """Make later imports of ai_client use the stub clients."""
+    module = sys.modules.get("projectmaker.core.ai_client")
+    if module is not None:
+        module.create_client = StubClient
+        module.create_async_client = AsyncStubClient
+    else:
+        sys.meta_path.insert(0, _StubInstaller())
+
+
+if __name__ == "__main__":
+    install()
+    from projectmaker.cli import cli
+
+    cli(sys.argv[1:], prog_name="projectmaker")
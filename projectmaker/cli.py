@@ -1,60 +1,229 @@
 """ProjectMaker CLI - Interactive AI brainstorming tool."""
 
+import importlib
+import sys
+
 import click
 from rich.console import Console
-from rich.markdown import Markdown
 
-from .core import ai_client, analyzer, project
+from .core import project, storage, structured
 
 console = Console()
 
+# ai_client and analyzer pull in the anthropic SDK, which dominates startup
+# time. Commands import them (and rich.markdown, asyncio) where they are
+# needed; this hook keeps ``projectmaker.cli.ai_client`` etc. resolvable.
+LAZY_MODULES = ("ai_client", "analyzer")
+
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        return importlib.import_module(f".core.{name}", __package__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def flush_cache_stats():
+    """Write the response cache's hit/miss counts once the command is done (if it used the API client)."""
+    ai_client = sys.modules.get(f"{__package__}.core.ai_client")
+    response_cache = ai_client.get_response_cache() if ai_client is not None else None
+    if response_cache is not None:
+        response_cache.flush()
+
+
+def print_usage():
+    """Print the API token usage of this command, if it made any calls."""
+    from .core import ai_client
+
+    usage = ai_client.usage_totals
+    if not usage["input_tokens"] and not usage["output_tokens"]:
+        return
+    console.print(
+        f"[dim]Tokens: {usage['input_tokens']} in, {usage['output_tokens']} out; "
+        f"prompt cache: {usage['cache_read_input_tokens']} read, "
+        f"{usage['cache_creation_input_tokens']} written.[/dim]"
+    )
+
+
+def save(proj) -> None:
+    """Save the project, or exit with an error if a concurrent update can't be merged."""
+    try:
+        project.save_project(proj)
+    except storage.ConflictError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+
+
+def print_bullet(bullet_id: int, text: str, selected: bool = False, similar: tuple[int, str] | None = None) -> None:
+    """One numbered checkbox bullet, with the earlier idea it repeats if any."""
+    check = "x" if selected else " "
+    console.print(f"  {bullet_id}. [{check}] {text}", markup=False, highlight=False)
+    if similar is not None:
+        console.print(f"     similar to round {similar[0]}: {similar[1]}", style="dim", markup=False, highlight=False)
+
 
 @click.group()
-def cli():
+@click.option("--no-cache", is_flag=True, help="Bypass the AI response cache.")
+@click.option("--structured", "structured_output", is_flag=True,
+              help="Request ideas, verdicts and plans as JSON via tool use (not for --stream).")
+@click.option("--hedge", is_flag=True,
+              help="Send a duplicate of requests slower than their usual p95 latency (not for --stream).")
+def cli(no_cache, structured_output, hedge):
     """ProjectMaker - Interactive AI-powered project brainstorming."""
-    pass
+    click.get_current_context().call_on_close(flush_cache_stats)
+    if no_cache or structured_output or hedge:
+        from .core import ai_client
+
+        if no_cache:
+            ai_client.set_response_cache(None)
+        if structured_output:
+            ai_client.set_structured_output(True)
+        if hedge:
+            ai_client.set_hedging(True)
 
 
 @cli.command()
 @click.argument("name")
 def init(name):
     """Initialize a new project."""
-    path = project.get_project_path()
-    if path.exists():
-        console.print(f"[red]Error:[/red] project.json already exists in this directory.")
+    location = storage.get_store().location
+    if project.project_exists():
+        console.print(f"[red]Error:[/red] a project already exists at {location}.")
         raise SystemExit(1)
 
     proj = project.create_project(name)
-    project.save_project(proj)
+    save(proj)
     console.print(f"[green]Project '{name}' initialized.[/green]")
-    console.print(f"Created {path}")
+    console.print(f"Created {location}")
 
 
 @cli.command()
 @click.argument("prompt")
-def brainstorm(prompt):
+@click.option("--stream", is_flag=True, help="Show ideas as they arrive.")
+@click.option("--collapse", is_flag=True, help="Hide ideas that repeat one from an earlier round.")
+def brainstorm(prompt, stream, collapse):
     """Generate brainstorming ideas from AI."""
+    from rich.markdown import Markdown
+
+    from .core import ai_client, analyzer
+
     try:
-        proj = project.load_project()
+        proj = project.load_project(lazy=True)
     except (FileNotFoundError, ValueError) as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
+    ideas_index = project.load_idea_index(proj)
 
     console.print(f"\n[bold]Brainstorming:[/bold] {prompt}\n")
 
+    parser = project.BulletParser() if stream else None
+    streamed = []
+    shown = 0
+
+    def show_bullets(bullets, flags=None):
+        # Streamed bullets are checked against earlier rounds as they arrive;
+        # add_round also catches repeats within the round once it is complete.
+        nonlocal shown
+        for text in bullets:
+            shown += 1
+            if flags is None:
+                streamed.append(text)
+                match = ideas_index.match(text)
+                similar = (match[1], match[0]) if match is not None else None
+            else:
+                similar = flags.get(shown)
+            if not (collapse and similar):
+                print_bullet(shown, text, similar=similar)
+
+    on_text = (lambda chunk: show_bullets(parser.feed(chunk))) if stream else None
     try:
-        response = ai_client.brainstorm(prompt, proj["accepted_ideas"])
+        ctx = analyzer.idea_context(proj, prompt)
+        covered = ideas_index.covered(proj.accepted_ideas, prompt)
+        response = ai_client.brainstorm(prompt, ctx.ideas, on_text=on_text, summary=ctx.summary, covered=covered)
     except RuntimeError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
-    project.add_round(proj, prompt, response)
-    project.save_project(proj)
+    ideas = None
+    if stream:
+        show_bullets(parser.close())
+        project.add_round(proj, prompt, response, bullets=parser.bullets)
+    else:
+        ideas = structured.decode_ideas(response)
+        project.add_round(proj, prompt, response, bullets=ideas)
+    save(proj)
+
+    round_data = proj.rounds[-1]
+    duplicates = project.near_duplicates(round_data)
+    if stream and streamed != parser.bullets:
+        # Plain bullets shown before the first checkbox bullet aren't saved, so the numbers moved.
+        console.print("\n[yellow]Renumbered: only the checkbox ideas were saved.[/yellow]")
+        shown = 0
+        show_bullets(parser.bullets, duplicates)
+    elif not stream:
+        if ideas is not None or duplicates:
+            show_bullets([b.text for b in round_data.bullets], duplicates)
+        else:
+            console.print(Markdown(response))
+    if duplicates:
+        action = "Collapsed" if collapse else "Flagged"
+        console.print(f"\n[dim]{action} {len(duplicates)} near-duplicate(s) of earlier ideas.[/dim]")
+    console.print(f"\n[dim]Saved as round {round_data.id} with {len(round_data.bullets)} bullets.[/dim]")
+    console.print(f"[dim]Run 'projectmaker select {round_data.id}' to accept ideas.[/dim]")
+    print_usage()
+
+
+@cli.command("brainstorm-batch")
+@click.argument("prompts_file", type=click.File("r"), default="-")
+@click.option("--workers", "-w", type=click.IntRange(min=1),
+              help="Maximum concurrent AI requests (default: ai_client.MAX_CONCURRENCY).")
+def brainstorm_batch(prompts_file, workers):
+    """Brainstorm one prompt per line from PROMPTS_FILE (or stdin) in parallel."""
+    import asyncio
+
+    from .core import ai_client, analyzer
+
+    workers = workers or ai_client.MAX_CONCURRENCY
+    prompts = [line.strip() for line in prompts_file if line.strip()]
+    if not prompts:
+        console.print("[yellow]No prompts given. Nothing changed.[/yellow]")
+        return
+
+    try:
+        proj = project.load_project(lazy=True)
+    except (FileNotFoundError, ValueError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
 
-    round_data = proj["rounds"][-1]
-    console.print(Markdown(response))
-    console.print(f"\n[dim]Saved as round {round_data['id']} with {len(round_data['bullets'])} bullets.[/dim]")
-    console.print(f"[dim]Run 'projectmaker select {round_data['id']}' to accept ideas.[/dim]")
+    console.print(f"\n[bold]Brainstorming {len(prompts)} prompt(s) with {workers} worker(s)...[/bold]\n")
+    ideas_index = project.load_idea_index(proj)
+    try:
+        ctx = analyzer.idea_context(proj)
+    except RuntimeError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+    covered = ideas_index.covered(proj.accepted_ideas)
+    results = asyncio.run(
+        ai_client.abrainstorm_many(prompts, ctx.ideas, limit=workers, summary=ctx.summary, covered=covered)
+    )
+
+    failed = 0
+    for prompt, result in zip(prompts, results):
+        if isinstance(result, Exception):
+            failed += 1
+            console.print(f"[red]Failed:[/red] {prompt} - {result}")
+            continue
+        project.add_round(proj, prompt, result)
+        round_data = proj.rounds[-1]
+        duplicates = len(project.near_duplicates(round_data))
+        note = f", {duplicates} near-duplicate(s)" if duplicates else ""
+        console.print(f"Round {round_data.id}: {prompt} ({len(round_data.bullets)} bullets{note})")
+
+    if failed < len(prompts):
+        save(proj)
+    console.print(f"\n[dim]Saved {len(prompts) - failed} round(s); {failed} failed.[/dim]")
+    print_usage()
+    if failed:
+        raise SystemExit(1)
 
 
 @cli.command()
@@ -62,7 +231,7 @@ def brainstorm(prompt):
 def select(round_id):
     """Select bullets to accept from a brainstorming round."""
     try:
-        proj = project.load_project()
+        proj = project.load_project(lazy=True)
     except (FileNotFoundError, ValueError) as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
@@ -73,10 +242,10 @@ def select(round_id):
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
-    console.print(f"\n[bold]Round {round_id}:[/bold] {round_data['prompt']}\n")
-    for bullet in round_data["bullets"]:
-        check = "x" if bullet["selected"] else " "
-        console.print(f"  {bullet['id']}. [{check}] {bullet['text']}")
+    console.print(f"\n[bold]Round {round_id}:[/bold] {round_data.prompt}\n")
+    duplicates = project.near_duplicates(round_data)
+    for bullet in round_data.bullets:
+        print_bullet(bullet.id, bullet.text, bullet.selected, duplicates.get(bullet.id))
 
     console.print()
     selection = click.prompt("Enter bullet numbers to accept (e.g., 1,3,5)", default="", show_default=False)
@@ -97,76 +266,366 @@ def select(round_id):
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
-    project.save_project(proj)
+    save(proj)
     console.print(f"\n[green]Accepted {len(bullet_ids)} idea(s).[/green]")
-    console.print(f"[dim]Total accepted ideas: {len(proj['accepted_ideas'])}[/dim]")
+    console.print(f"[dim]Total accepted ideas: {len(proj.accepted_ideas)}[/dim]")
 
 
 @cli.command()
-def analyze():
+@click.option("--force", is_flag=True, help="Re-evaluate all ideas even if nothing changed.")
+def analyze(force):
     """Analyze if project foundation is sufficient."""
+    from .core import analyzer
+
     try:
-        proj = project.load_project()
+        proj = project.load_project(lazy=True)
     except (FileNotFoundError, ValueError) as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
     console.print("\n[bold]Analyzing project readiness...[/bold]\n")
 
+    previous = proj.analysis
     try:
-        analysis = analyzer.run_analysis(proj)
+        analysis = analyzer.run_analysis(proj, force=force)
     except RuntimeError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
-    project.save_project(proj)
+    save(proj)
+    if analysis is previous:
+        console.print("[dim]Accepted ideas unchanged since the last analysis; showing the stored result.[/dim]\n")
 
-    if analysis["ready"]:
+    if analysis.ready:
         console.print("[green bold]Analysis: Ready to proceed![/green bold]")
     else:
         console.print("[yellow bold]Analysis: Not ready[/yellow bold]")
 
-    if analysis.get("summary"):
-        console.print(f"\n{analysis['summary']}")
+    if analysis.summary:
+        console.print(f"\n{analysis.summary}")
 
-    if analysis["gaps"]:
+    if analysis.gaps:
         console.print("\n[bold]Missing:[/bold]")
-        for gap in analysis["gaps"]:
+        for gap in analysis.gaps:
             console.print(f"  - {gap}")
 
-    if not analysis["ready"]:
+    if not analysis.ready:
         console.print("\n[dim]Recommendation: Run more brainstorming rounds to address gaps.[/dim]")
     else:
         console.print("\n[dim]Run 'projectmaker plan' to generate an implementation plan.[/dim]")
+    print_usage()
 
 
 @cli.command()
-def plan():
+@click.option("--stream", is_flag=True, help="Show the plan as it is written.")
+@click.option("--speculative", is_flag=True,
+              help="Request the plan while the readiness check runs; discard it if not ready.")
+@click.option("--sectioned", is_flag=True,
+              help="Write each plan section as a separate concurrent request.")
+@click.option("--section", "sections", multiple=True,
+              type=click.Choice(["overview", "architecture", "phases", "tech_stack", "milestones"]),
+              help="Regenerate only this section (implies --sectioned; repeatable).")
+def plan(stream, speculative, sectioned, sections):
     """Generate implementation plan from accepted ideas."""
+    from rich.markdown import Markdown
+
+    from .core import analyzer
+
+    sectioned = sectioned or bool(sections)
+    if sum((stream, speculative, sectioned)) > 1:
+        raise click.UsageError("--stream, --speculative and --sectioned cannot be combined.")
+
     try:
-        proj = project.load_project()
+        proj = project.load_project(lazy=True)
     except (FileNotFoundError, ValueError) as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
     console.print("\n[bold]Generating implementation plan...[/bold]\n")
 
+    runs_before = (proj.extra.get(analyzer.SPECULATION_KEY) or {}).get("runs", 0)
+    failures = {}
     try:
-        result = analyzer.generate_plan(proj)
+        if sectioned:
+            result, failures = analyzer.generate_plan_sections(proj, sections=list(sections) or None)
+        else:
+            on_text = (lambda chunk: console.out(chunk, end="", highlight=False)) if stream else None
+            result = analyzer.generate_plan(proj, on_text=on_text, speculative=speculative)
     except RuntimeError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
 
+    if failures:
+        save(proj)
+        for name, error in failures.items():
+            console.print(f"[red]Section {name} failed:[/red] {error}")
+        console.print("\n[dim]Completed sections were saved. Run 'projectmaker plan --sectioned' "
+                      "to retry only the failed ones.[/dim]")
+        raise SystemExit(1)
+
+    speculation = proj.extra.get(analyzer.SPECULATION_KEY) or {}
+    if speculation.get("runs", 0) > runs_before:
+        last = speculation["last"]
+        if last["used"]:
+            console.print(f"[dim]Speculative plan used: saved {last['saved_seconds']:.1f}s.[/dim]\n")
+        else:
+            console.print(f"[dim]Speculative plan discarded: about {last['wasted_tokens']} tokens wasted.[/dim]\n")
+
     if result is None:
-        analysis = proj.get("analysis", {})
+        save(proj)
+        analysis = proj.analysis
         console.print("[yellow]Project not ready for planning.[/yellow]")
-        if analysis.get("gaps"):
+        if analysis and analysis.gaps:
             console.print("\n[bold]Missing:[/bold]")
-            for gap in analysis["gaps"]:
+            for gap in analysis.gaps:
                 console.print(f"  - {gap}")
         console.print("\n[dim]Run more brainstorming rounds to address gaps, then try again.[/dim]")
         raise SystemExit(1)
 
-    project.save_project(proj)
-    console.print(Markdown(result))
+    save(proj)
+    if stream:
+        console.print()
+    else:
+        console.print(Markdown(result))
     console.print("\n[green]Plan saved to project.json.[/green]")
+    print_usage()
+
+
+@cli.command()
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True),
+              help="Write to a file instead of stdout.")
+@click.option("--compact", is_flag=True, help="Also fold the journal into the stored snapshot.")
+@click.option("--json/--packed", "as_json", default=None,
+              help="Export readable JSON (the default) or the packed binary format. "
+                   "With --compact, also store the project in that format.")
+def export(output, compact, as_json):
+    """Export the full project state as readable JSON."""
+    try:
+        proj = project.load_project()
+    except (FileNotFoundError, ValueError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+
+    packed = as_json is False
+    if compact:
+        project.compact_project(proj, packed=None if as_json is None else packed)
+    data = project.export_project(proj, packed=packed)
+    if output:
+        with open(output, "wb" if packed else "w") as f:
+            f.write(data)
+        console.print(f"[green]Exported to {output}.[/green]")
+    else:
+        click.echo(data, nl=False)
+
+
+@cli.command()
+@click.argument("root", type=click.Path(exists=True, file_okay=False), default=".")
+@click.option("--plan", "with_plan", is_flag=True, help="Also generate a plan for projects that are ready.")
+@click.option("--force", is_flag=True, help="Re-evaluate all ideas even if nothing changed.")
+@click.option("--workers", "-w", type=click.IntRange(min=1),
+              help="Maximum projects processed at once (default: ai_client.MAX_CONCURRENCY).")
+@click.option("--processes", is_flag=True, help="Use worker processes instead of threads.")
+@click.option("--report", type=click.Path(dir_okay=False, writable=True),
+              help="Write the aggregate readiness report as JSON.")
+def workspace(root, with_plan, force, workers, processes, report):
+    """Analyze every project (project.json) under ROOT in parallel."""
+    import json
+    from pathlib import Path
+
+    from .core import workspace as ws
+
+    directories = ws.discover_projects(Path(root))
+    if not directories:
+        console.print(f"[yellow]No projects found under {root}.[/yellow]")
+        return
+
+    console.print(f"\n[bold]Analyzing {len(directories)} project(s)...[/bold]\n")
+
+    def show(result):
+        if result.error:
+            console.print(f"[red]Failed:[/red] {result.path} - {result.error}")
+            return
+        status = "[green]ready[/green]" if result.ready else f"[yellow]not ready[/yellow] ({len(result.gaps)} gap(s))"
+        notes = [note for note, on in (("stored", result.reused), ("planned", result.planned)) if on]
+        suffix = f" [dim]({', '.join(notes)})[/dim]" if notes else ""
+        console.print(f"{result.name}: {status}{suffix}  [dim]{result.path}[/dim]")
+
+    results = ws.run_workspace(directories, plan=with_plan, force=force, workers=workers,
+                               processes=processes, on_result=show)
+    summary = ws.readiness_report(results)
+
+    console.print(f"\n[bold]{summary['ready']} ready, {summary['not_ready']} not ready, "
+                  f"{summary['failed']} failed[/bold] of {summary['projects']} project(s).")
+    if summary["common_gaps"]:
+        console.print("\n[bold]Most common gaps:[/bold]")
+        for gap, count in summary["common_gaps"]:
+            console.print(f"  {count}x {gap}")
+    if report:
+        with open(report, "w") as f:
+            json.dump(summary, f, indent=2)
+        console.print(f"\n[dim]Report written to {report}.[/dim]")
+    print_usage()
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option("--clear", is_flag=True, help="Delete all cached responses.")
+def cache(clear):
+    """Show AI response cache statistics."""
+    from .core import ai_client
+
+    response_cache = ai_client.get_response_cache()
+    if response_cache is None:
+        console.print("[yellow]Response cache is disabled.[/yellow]")
+        return
+
+    if clear:
+        response_cache.clear()
+        console.print("[green]Response cache cleared.[/green]")
+
+    stats = response_cache.stats()
+    total = stats["total_hits"] + stats["total_misses"]
+    rate = f"{stats['total_hits'] / total:.0%}" if total else "n/a"
+    console.print(f"\n[bold]Response cache:[/bold] {response_cache.directory}")
+    console.print(f"  Entries: {stats['disk_entries']} ({stats['disk_bytes']} bytes)")
+    console.print(f"  Hits: {stats['total_hits']}  Misses: {stats['total_misses']}  Hit rate: {rate}")
+    console.print(f"[dim]{stats['total_hits']} API round-trip(s) saved.[/dim]")
+
+
+@cli.command()
+@click.option("--clear", is_flag=True, help="Delete all recorded metrics.")
+def stats(clear):
+    """Show API latency, token and error statistics per operation."""
+    from .core import ai_client
+
+    store = ai_client.get_metrics_store()
+    if store is None:
+        console.print("[yellow]Metrics recording is disabled.[/yellow]")
+        return
+
+    if clear:
+        store.clear()
+        console.print("[green]Metrics cleared.[/green]")
+        return
+
+    summary = store.summary()
+    if not summary:
+        console.print(f"[yellow]No API calls recorded yet in {store.path}.[/yellow]")
+        return
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    console.print(f"\n[bold]API calls:[/bold] {store.path}")
+    for op, s in summary.items():
+        latency, ttfb, tokens = s["latency"], s["ttfb"], s["tokens"]
+        console.print(f"\n[bold]{op}[/bold]: {s['calls']} call(s), "
+                      f"{s['errors']} failed ({s['error_rate']:.0%}), {s['retries']} retries")
+        console.print(f"  Latency p50 {seconds(latency['p50'])}  p95 {seconds(latency['p95'])}  "
+                      f"p99 {seconds(latency['p99'])}  (first byte p50 {seconds(ttfb['p50'])})")
+        console.print(f"  Tokens: {tokens['input_tokens']} in, {tokens['output_tokens']} out; "
+                      f"prompt cache {tokens['cache_read_input_tokens']} read, "
+                      f"{tokens['cache_creation_input_tokens']} written")
+        if s["error_classes"]:
+            classes = ", ".join(f"{name} x{count}" for name, count in sorted(s["error_classes"].items()))
+            console.print(f"  Errors: {classes}")
+
+
+@cli.command()
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False),
+              help="Socket to listen on (default: PROJECTMAKER_SOCKET or ~/.cache/projectmaker/daemon.sock).")
+def serve(socket_path):
+    """Keep a warm process that runs commands forwarded by the projectmaker CLI."""
+    from . import daemon
+
+    def ready(server):
+        console.print(f"[green]Serving projectmaker commands on {server.socket_path}[/green]")
+        console.print("[dim]Commands run here until Ctrl-C. Set PROJECTMAKER_NO_DAEMON=1 to bypass.[/dim]")
+
+    try:
+        daemon.serve(socket_path, on_ready=ready)
+    except RuntimeError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+    console.print("[dim]Daemon stopped.[/dim]")
+
+
+@cli.group()
+def batch():
+    """Run analyses, plans and brainstorms offline through the Message Batches API."""
+
+
+def show_batch_job(job):
+    counts = job.counts()
+    console.print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "No requests.")
+    for entry in job.entries:
+        if entry["status"] == "errored":
+            console.print(f"[red]Failed:[/red] {entry['kind']} for {entry['project']} - {entry.get('error')}")
+    for skipped in job.data.get("skipped", []):
+        console.print(f"[yellow]Skipped:[/yellow] {skipped['project']} - {skipped['error']}")
+
+
+@batch.command("submit")
+@click.argument("root", type=click.Path(exists=True, file_okay=False), default=".")
+@click.option("--analyze/--no-analyze", default=True, show_default=True,
+              help="Queue an analysis for projects whose stored one is out of date.")
+@click.option("--plan", "with_plan", is_flag=True, help="Queue a plan for projects that are (or may become) ready.")
+@click.option("--brainstorm", "prompts", multiple=True, metavar="PROMPT",
+              help="Queue a brainstorming round with PROMPT in every project. Repeatable.")
+@click.option("--force", is_flag=True, help="Re-analyze even if the stored analysis is current.")
+@click.option("--manifest", type=click.Path(dir_okay=False), help="Job manifest file (default: ./projectmaker-batch.json).")
+@click.option("--wait", is_flag=True, help="Wait for the batch and apply its results.")
+@click.option("--interval", type=float, default=60.0, show_default=True, help="Seconds between status checks.")
+def batch_submit(root, analyze, with_plan, prompts, force, manifest, wait, interval):
+    """Queue requests for every project under ROOT and submit them as a batch."""
+    from pathlib import Path
+
+    from .core import batch as batches
+    from .core import workspace as ws
+
+    path = Path(manifest or batches.MANIFEST_FILE)
+    if path.exists() and not batches.BatchJob.load(path).finished():
+        console.print(f"[red]Error:[/red] an unfinished job exists at {path}. "
+                      "Run 'projectmaker batch collect' to resume it.")
+        raise SystemExit(1)
+
+    directories = ws.discover_projects(Path(root))
+    job = batches.BatchJob.create(path, directories, analyze=analyze, plan=with_plan, prompts=list(prompts),
+                                  force=force)
+    if not job.entries:
+        console.print("[yellow]Nothing to request; every project is up to date.[/yellow]")
+        return
+    try:
+        finished = batches.run_job(job, wait=wait, interval=interval)
+    except RuntimeError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        console.print(f"[dim]The job is saved in {path}; run 'projectmaker batch collect' to resume it.[/dim]")
+        raise SystemExit(1)
+    show_batch_job(job)
+    if not finished:
+        console.print(f"[dim]Submitted. Run 'projectmaker batch collect' to apply the results ({path}).[/dim]")
+    print_usage()
+
+
+@batch.command("collect")
+@click.option("--manifest", type=click.Path(dir_okay=False), help="Job manifest file (default: ./projectmaker-batch.json).")
+@click.option("--wait", is_flag=True, help="Wait until every batch has ended.")
+@click.option("--interval", type=float, default=60.0, show_default=True, help="Seconds between status checks.")
+def batch_collect(manifest, wait, interval):
+    """Resume a job: submit what is left, then apply finished results to the projects."""
+    from pathlib import Path
+
+    from .core import batch as batches
+
+    path = Path(manifest or batches.MANIFEST_FILE)
+    try:
+        job = batches.BatchJob.load(path)
+        finished = batches.run_job(job, wait=wait, interval=interval)
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+    show_batch_job(job)
+    if not finished:
+        console.print("[dim]Batches still in progress; run this again later.[/dim]")
+    print_usage()
@@ -0,0 +1,137 @@
+"""Thin command-line entry point that forwards to a running daemon.
+
+``projectmaker`` starts here. If a ``projectmaker serve`` daemon is
+listening on the socket, the command line, working directory, relevant
+environment and, for commands that read it, piped stdin are sent to it
+and its output is relayed as it arrives; otherwise the CLI runs in this
+process as usual, with stdin untouched. This module only imports the
+standard library so forwarding stays fast.
+"""
+
+import json
+import os
+import shutil
+import socket
+import sys
+from pathlib import Path
+
+SOCKET_ENV = "PROJECTMAKER_SOCKET"
+NO_DAEMON_ENV = "PROJECTMAKER_NO_DAEMON"
+ENV_PREFIXES = ("PROJECTMAKER_", "ANTHROPIC_")
+ENV_NAMES = ("TERM", "COLORTERM", "NO_COLOR", "FORCE_COLOR", "COLUMNS", "LINES")
+
+# Commands that always run locally, and ones that prompt when stdin is a terminal.
+LOCAL_COMMANDS = ("serve",)
+INTERACTIVE_COMMANDS = ("select", "brainstorm-batch")
+# Options of the stdin-reading commands that take a value (so it isn't mistaken for an argument).
+VALUE_OPTIONS = ("--workers", "-w")
+
+
+def default_socket_path() -> Path:
+    """Daemon socket (PROJECTMAKER_SOCKET or ~/.cache/projectmaker/daemon.sock)."""
+    env = os.environ.get(SOCKET_ENV)
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "projectmaker" / "daemon.sock"
+
+
+def command_name(argv: list[str]) -> str | None:
+    """The subcommand in ``argv``; global options are all flags, so it is the first non-option."""
+    return next((arg for arg in argv if not arg.startswith("-")), None)
+
+
+def reads_stdin(argv: list[str]) -> bool:
+    """Whether the command reads stdin: select's prompt, or brainstorm-batch without a file or with "-"."""
+    command = command_name(argv)
+    if command == "select":
+        return True
+    if command != "brainstorm-batch":
+        return False
+    args = argv[argv.index(command) + 1:]
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg in VALUE_OPTIONS:
+            args = args[1:]
+        elif arg == "--":
+            positional.extend(args)
+            break
+        elif not arg.startswith("-") or arg == "-":
+            positional.append(arg)
+    return not positional or positional[0] == "-"
+
+
+def forwardable(argv: list[str], stdin_tty: bool) -> bool:
+    command = command_name(argv)
+    if command in LOCAL_COMMANDS:
+        return False
+    return not (stdin_tty and command in INTERACTIVE_COMMANDS)
+
+
+def request_env() -> dict:
+    """The part of the environment a command depends on."""
+    env = {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIXES) or k in ENV_NAMES}
+    if sys.stdout.isatty() and "COLUMNS" not in env:
+        size = shutil.get_terminal_size()
+        env.update(COLUMNS=str(size.columns), LINES=str(size.lines))
+    return env
+
+
+def forward(
+    argv: list[str],
+    socket_path: Path | None = None,
+    stdin=None,
+    stdout=None,
+    stderr=None,
+) -> int | None:
+    """Run ``argv`` on the daemon. Returns its exit code, or None if no daemon is listening.
+
+    ``stdin`` is the command's input, as a string or a file that is only
+    read once the daemon accepted the connection, so it is left for the
+    local CLI otherwise.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path or default_socket_path()))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    if hasattr(stdin, "read"):
+        stdin = stdin.read()
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": request_env(),
+        "stdin": stdin,
+        "tty": stdout.isatty(),
+    }
+    with sock, sock.makefile("rwb") as conn:
+        conn.write(json.dumps(request).encode("utf-8") + b"\n")
+        conn.flush()
+        for line in conn:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            stream = stderr if "err" in message else stdout
+            stream.write(message.get("out", message.get("err", "")))
+            stream.flush()
+    stderr.write("Error: projectmaker daemon closed the connection.\n")
+    return 1
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    stdin_tty = sys.stdin.isatty()
+    if not os.environ.get(NO_DAEMON_ENV) and forwardable(argv, stdin_tty):
+        code = forward(argv, stdin=None if stdin_tty or not reads_stdin(argv) else sys.stdin)
+        if code is not None:
+            sys.exit(code)
+
+    from .cli import cli
+
+    cli(prog_name="projectmaker")
@@ -1,85 +1,908 @@
 """Claude API wrapper with retry logic."""
 
+import asyncio
+import os
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Awaitable, Callable, Iterable
 
 import anthropic
 
+from .cache import ResponseCache, default_cache_dir, request_key
+from .context import estimate_tokens, max_tokens_for
+from .metrics import MetricsStore, percentile
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, backoff_delay, retryable
+from .structured import ANALYSIS_TOOL, IDEAS_TOOL, decode, decode_analysis, encode
+
 MODEL = "claude-sonnet-4-5-20250929"
 MAX_RETRIES = 3
 BASE_DELAY = 1.0
+MAX_CONCURRENCY = 8
+MAX_TOKENS = 4096
+BRAINSTORM_MAX_TOKENS = 4096
+ANALYSIS_MAX_TOKENS = 1024
+PLAN_MAX_TOKENS = 4096
+SECTION_MAX_TOKENS = 2048
+SUMMARY_MAX_TOKENS = 1024
+IDEA_CHUNK = 16
+# Per-attempt deadline in seconds (for streams, the longest wait between chunks).
+REQUEST_TIMEOUT = 120.0
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Plan sections in document order: (key, heading, what to write).
+PLAN_SECTIONS = (
+    ("overview", "Project Overview", "a concise project overview: purpose, users and scope"),
+    ("architecture", "Architecture", "the architecture decisions: main components and how they interact"),
+    ("phases", "Implementation Phases", "the implementation phases, each with specific tasks"),
+    ("tech_stack", "Tech Stack", "tech stack recommendations with a short justification for each"),
+    ("milestones", "Milestones", "the key milestones and how to tell each one is reached"),
+)
+
+PLAN_TOOL = {
+    "name": "record_plan",
+    "description": "Record the implementation plan, one markdown string per section.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            key: {"type": "string", "minLength": 1, "description": f"{heading}: {brief}."}
+            for key, heading, brief in PLAN_SECTIONS
+        },
+        "required": [key for key, _, _ in PLAN_SECTIONS],
+    },
+}
+
+# Token usage reported by the API in this process, including prompt-cache reads/writes.
+usage_totals = {
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 0,
+}
+
+_response_cache = None
+_cache_disabled = bool(os.environ.get("PROJECTMAKER_NO_CACHE"))
+_metrics = None
+_metrics_disabled = bool(os.environ.get("PROJECTMAKER_NO_METRICS"))
+_structured = bool(os.environ.get("PROJECTMAKER_STRUCTURED"))
+_clients = None
+_usage_lock = threading.Lock()
+_breaker = CircuitBreaker()
+_hedging = bool(os.environ.get("PROJECTMAKER_HEDGE"))
+_hedge_delays = {}
+_limiter = RateLimiter.from_env()
 
 
 def create_client() -> anthropic.Anthropic:
-    """Create Anthropic client (uses ANTHROPIC_API_KEY env var)."""
-    return anthropic.Anthropic()
+    """Create Anthropic client (uses ANTHROPIC_API_KEY env var).
+
+    The SDK's own retries are off; call_claude and stream_claude retry.
+    With keep_clients() on, one client per API key and base URL is reused,
+    keeping its connection pool warm across commands.
+    """
+    if _clients is None:
+        return anthropic.Anthropic(max_retries=0)
+    key = (os.environ.get("ANTHROPIC_API_KEY"), os.environ.get("ANTHROPIC_BASE_URL"))
+    if key not in _clients:
+        _clients[key] = anthropic.Anthropic(max_retries=0)
+    return _clients[key]
+
+
+def keep_clients(enabled: bool = True) -> None:
+    """Reuse sync clients across calls (see create_client), or stop and drop them.
+
+    Async clients are not shared: their connections belong to the event
+    loop they were first used on, and each command runs its own loop.
+    """
+    global _clients
+    _clients = {} if enabled else None
+
+
+def create_async_client() -> anthropic.AsyncAnthropic:
+    """Create async Anthropic client (uses ANTHROPIC_API_KEY env var), without SDK retries."""
+    return anthropic.AsyncAnthropic(max_retries=0)
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Shared response cache, created on first use. None when caching is disabled."""
+    global _response_cache
+    if _cache_disabled:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(default_cache_dir())
+    return _response_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Replace the shared response cache. Passing None disables caching."""
+    global _response_cache, _cache_disabled
+    _response_cache = cache
+    _cache_disabled = cache is None
+
+
+def get_metrics_store() -> MetricsStore | None:
+    """Shared API call metrics store, created on first use. None when metrics are disabled."""
+    global _metrics
+    if _metrics_disabled:
+        return None
+    if _metrics is None:
+        _metrics = MetricsStore()
+    return _metrics
+
+
+def set_metrics_store(store: MetricsStore | None) -> None:
+    """Replace the shared metrics store. Passing None disables recording."""
+    global _metrics, _metrics_disabled
+    _metrics = store
+    _metrics_disabled = store is None
+
+
+def structured_output_enabled() -> bool:
+    """Whether brainstorm, analyze and plan requests ask for tool-use output by default."""
+    return _structured
+
+
+def set_structured_output(enabled: bool) -> None:
+    """Turn structured (tool-use) output on or off for later requests."""
+    global _structured
+    _structured = enabled
+
+
+def get_circuit_breaker() -> CircuitBreaker | None:
+    """Circuit breaker shared by all calls in this process. None when disabled."""
+    return _breaker
+
+
+def set_circuit_breaker(breaker: CircuitBreaker | None) -> None:
+    """Replace the shared circuit breaker. Passing None disables it."""
+    global _breaker
+    _breaker = breaker
+
+
+def get_rate_limiter() -> RateLimiter | None:
+    """Rate limiter shared with other processes (see ratelimit). None when no limits are set."""
+    return _limiter
+
+
+def set_rate_limiter(limiter: RateLimiter | None) -> None:
+    """Replace the rate limiter. Passing None sends requests unthrottled."""
+    global _limiter
+    _limiter = limiter
+
+
+def estimate_request_tokens(kwargs: dict) -> int:
+    """Rough input-token count of a messages.create request, for rate limiting."""
+    texts = [kwargs.get("system", "")]
+    for message in kwargs["messages"]:
+        content = message["content"]
+        texts.extend([content] if isinstance(content, str) else [block["text"] for block in content])
+    texts.extend(str(tool) for tool in kwargs.get("tools", ()))
+    return sum(estimate_tokens(text) for text in texts)
+
+
+def _settle(estimated: int, usage: dict) -> None:
+    """Correct the rate limiter's token bucket by the input tokens actually billed.
+
+    Cache reads don't count toward input-token rate limits, cache writes do.
+    """
+    if _limiter is not None and "input_tokens" in usage:
+        actual = usage["input_tokens"] + usage.get("cache_creation_input_tokens", 0)
+        _limiter.settle(MODEL, estimated, actual)
+
+
+def hedging_enabled() -> bool:
+    """Whether slow non-streamed requests get a duplicate (see hedge_delay)."""
+    return _hedging
+
+
+def set_hedging(enabled: bool) -> None:
+    """Turn hedged requests on or off for later calls; hedge delays are re-read from metrics."""
+    global _hedging
+    _hedging = enabled
+    _hedge_delays.clear()
+
 
+def hedge_delay(operation: str) -> float | None:
+    """Seconds after which a duplicate of an ``operation`` request is sent.
+
+    The HEDGE_PERCENTILE of that operation's successful single-attempt
+    latency (metrics time-to-first-byte), read once per process and at least
+    HEDGE_MIN_DELAY. None while hedging is off or fewer than
+    HEDGE_MIN_SAMPLES calls are recorded.
+    """
+    if not _hedging:
+        return None
+    if operation not in _hedge_delays:
+        store = get_metrics_store()
+        samples = [
+            entry["ttfb"] for entry in (store.read() if store is not None else [])
+            if entry.get("op") == operation and not entry.get("error") and entry.get("ttfb") is not None
+        ]
+        _hedge_delays[operation] = (
+            max(HEDGE_MIN_DELAY, percentile(samples, HEDGE_PERCENTILE))
+            if len(samples) >= HEDGE_MIN_SAMPLES else None
+        )
+    return _hedge_delays[operation]
+
+
+def _in_thread(fn, **kwargs) -> Future:
+    """Run ``fn`` on a daemon thread, so an abandoned hedge can't delay exit."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(**kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _may_hedge(tokens: int) -> bool:
+    """Whether a duplicate request fits the rate limits right now (it never queues)."""
+    return _limiter is None or _limiter.reserve(MODEL, tokens, queue=False) is not None
+
+
+def _create(client, kwargs: dict, operation: str, tokens: int):
+    """One attempt: messages.create with the per-attempt deadline, hedged when enabled.
+
+    A hedged attempt sends a duplicate once the first request has taken
+    hedge_delay(operation), if the rate limits allow it without waiting,
+    and returns whichever succeeds first; it fails only if both do. The
+    slower request is left to finish on its own thread and its response
+    (and usage) is dropped.
+    """
+    delay = hedge_delay(operation)
+    if delay is None:
+        return client.messages.create(**kwargs, timeout=REQUEST_TIMEOUT)
+    pending = {_in_thread(client.messages.create, **kwargs, timeout=REQUEST_TIMEOUT)}
+    done, _ = wait(pending, timeout=delay)
+    if not done and _may_hedge(tokens):
+        pending.add(_in_thread(client.messages.create, **kwargs, timeout=REQUEST_TIMEOUT))
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _acreate(client, kwargs: dict, operation: str, tokens: int):
+    """Async _create; the slower of two hedged requests is cancelled."""
+    delay = hedge_delay(operation)
+    if delay is None:
+        return await client.messages.create(**kwargs, timeout=REQUEST_TIMEOUT)
+    pending = {asyncio.ensure_future(client.messages.create(**kwargs, timeout=REQUEST_TIMEOUT))}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done and _may_hedge(tokens):
+            pending.add(asyncio.ensure_future(client.messages.create(**kwargs, timeout=REQUEST_TIMEOUT)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _failed(error: Exception, attempt: int) -> float | None:
+    """Note a failed attempt with the circuit breaker; the backoff delay, or None to give up."""
+    if _breaker is not None:
+        # A non-retryable error still means the API answered.
+        if retryable(error):
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
+    if not retryable(error) or attempt >= MAX_RETRIES:
+        return None
+    return backoff_delay(attempt, BASE_DELAY, error)
+
+
+def _abandoned(trial: bool) -> None:
+    """An attempt ended without an API answer or error (cancelled, or a local error):
+    if it was the breaker's half-open trial, let the next call try instead."""
+    if trial and _breaker is not None:
+        _breaker.release()
+
+
+def _use_structured(structured: bool | None) -> bool:
+    return _structured if structured is None else structured
+
+
+def record_usage(usage) -> dict:
+    """Add a response's usage counters to usage_totals and return them."""
+    counts = {}
+    with _usage_lock:
+        for key in usage_totals:
+            value = getattr(usage, key, None)
+            if isinstance(value, int):
+                usage_totals[key] += value
+                counts[key] = value
+    return counts
+
+
+def _record_call(
+    operation: str,
+    started: float,
+    attempt: int,
+    ttfb: float | None = None,
+    error: Exception | None = None,
+    usage: dict | None = None,
+) -> None:
+    store = get_metrics_store()
+    if store is None:
+        return
+    store.record(
+        operation,
+        MODEL,
+        latency=time.perf_counter() - started,
+        ttfb=ttfb,
+        retries=attempt - 1,
+        error=type(error).__name__ if error is not None else None,
+        usage=usage,
+    )
+
+
+def _request_kwargs(
+    prompt: str,
+    system: str,
+    max_tokens: int = MAX_TOKENS,
+    prefix: list[str] | None = None,
+    tool: dict | None = None,
+) -> dict:
+    """Build messages.create kwargs.
+
+    ``prefix`` blocks go before the prompt and are marked as prompt-cache
+    breakpoints: the last block, and the one before it so that a prefix
+    which has only grown at the end still hits the earlier boundary.
+    A ``tool`` is offered as the only tool and the model is made to call it.
+    """
+    content = prompt
+    if prefix:
+        content = [{"type": "text", "text": text} for text in prefix]
+        for block in content[-2:]:
+            block["cache_control"] = CACHE_CONTROL
+        content.append({"type": "text", "text": prompt})
+    kwargs = {"model": MODEL, "max_tokens": max_tokens, "messages": [{"role": "user", "content": content}]}
+    if system:
+        kwargs["system"] = system
+    if tool is not None:
+        kwargs["tools"] = [tool]
+        kwargs["tool_choice"] = {"type": "tool", "name": tool["name"]}
+    return kwargs
+
+
+def _response_text(response) -> str:
+    """The response's text, or the input of its tool call encoded as compact JSON."""
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use":
+            return encode(block.input)
+    return response.content[0].text
+
+
+def call_claude(
+    prompt: str,
+    system: str = "",
+    client: anthropic.Anthropic | None = None,
+    use_cache: bool = True,
+    max_tokens: int = MAX_TOKENS,
+    prefix: list[str] | None = None,
+    operation: str = "call",
+    tool: dict | None = None,
+) -> str:
+    """Send a prompt to Claude with retry logic. Returns response text.
+
+    Identical requests are answered from the response cache unless
+    ``use_cache`` is False. ``prefix`` blocks are sent ahead of the prompt
+    as a prompt-cacheable prefix (see _request_kwargs). Every request that
+    reaches the API is recorded in the metrics store under ``operation``;
+    time-to-first-byte is the latency of the successful attempt. With a
+    ``tool`` the model must answer by calling it, and the returned text is
+    the tool input as JSON (see structured.decode). When rate limits are
+    configured (see ratelimit), each attempt first waits for its turn.
+    """
+    kwargs = _request_kwargs(prompt, system, max_tokens, prefix, tool)
+    cache = get_response_cache() if use_cache else None
+    key = request_key(**kwargs) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-def call_claude(prompt: str, system: str = "", client: anthropic.Anthropic | None = None) -> str:
-    """Send a prompt to Claude with retry logic. Returns response text."""
     if client is None:
         client = create_client()
+    tokens = estimate_request_tokens(kwargs)
+    started = time.perf_counter()
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        trial = _breaker.check() if _breaker is not None else False
+        try:
+            if _limiter is not None:
+                _limiter.acquire(MODEL, tokens)
+            attempt_started = time.perf_counter()
+            response = _create(client, kwargs, operation, tokens)
+        except anthropic.APIError as e:
+            delay = _failed(e, attempt)
+            if delay is None:
+                _record_call(operation, started, attempt, error=e)
+                raise RuntimeError(f"AI request failed after {attempt} attempt(s): {e}")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            _abandoned(trial)
+            raise
+        ttfb = time.perf_counter() - attempt_started
+        if _breaker is not None:
+            _breaker.record_success()
+        usage = record_usage(response.usage)
+        _settle(tokens, usage)
+        text = _response_text(response)
+        if cache is not None:
+            cache.put(key, text)
+        _record_call(operation, started, attempt, ttfb=ttfb, usage=usage)
+        return text
+
+
+async def acall_claude(
+    prompt: str,
+    system: str = "",
+    client: anthropic.AsyncAnthropic | None = None,
+    use_cache: bool = True,
+    max_tokens: int = MAX_TOKENS,
+    prefix: list[str] | None = None,
+    operation: str = "call",
+    tool: dict | None = None,
+) -> str:
+    """Async call_claude: same caching and retries, with non-blocking backoff."""
+    kwargs = _request_kwargs(prompt, system, max_tokens, prefix, tool)
+    cache = get_response_cache() if use_cache else None
+    key = request_key(**kwargs) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if client is None:
+        client = create_async_client()
+    tokens = estimate_request_tokens(kwargs)
+    started = time.perf_counter()
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        trial = _breaker.check() if _breaker is not None else False
+        try:
+            if _limiter is not None:
+                queued = _limiter.reserve(MODEL, tokens)
+                if queued:
+                    await asyncio.sleep(queued)
+            attempt_started = time.perf_counter()
+            response = await _acreate(client, kwargs, operation, tokens)
+        except anthropic.APIError as e:
+            delay = _failed(e, attempt)
+            if delay is None:
+                _record_call(operation, started, attempt, error=e)
+                raise RuntimeError(f"AI request failed after {attempt} attempt(s): {e}")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            _abandoned(trial)
+            raise
+        ttfb = time.perf_counter() - attempt_started
+        if _breaker is not None:
+            _breaker.record_success()
+        usage = record_usage(response.usage)
+        _settle(tokens, usage)
+        text = _response_text(response)
+        if cache is not None:
+            cache.put(key, text)
+        _record_call(operation, started, attempt, ttfb=ttfb, usage=usage)
+        return text
 
-    messages = [{"role": "user", "content": prompt}]
-    last_error = None
+
+async def gather_limited(
+    calls: Iterable[Awaitable],
+    limit: int = MAX_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> list:
+    """Await many calls with at most ``limit`` in flight. Results keep input order.
+
+    With ``return_exceptions`` a failed call yields its exception in place
+    instead of cancelling the rest, like asyncio.gather.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*(run(c) for c in calls), return_exceptions=return_exceptions)
+
+
+def stream_claude(
+    prompt: str,
+    system: str = "",
+    client: anthropic.Anthropic | None = None,
+    on_text: Callable[[str], None] | None = None,
+    use_cache: bool = True,
+    max_tokens: int = MAX_TOKENS,
+    prefix: list[str] | None = None,
+    operation: str = "call",
+) -> str:
+    """Stream a prompt to Claude, passing text chunks to ``on_text`` as they arrive.
+
+    Returns the full response text. Retries like call_claude, but only while no
+    text has been delivered yet - once a chunk has been shown it can't be taken back.
+    A cached response is delivered to ``on_text`` as a single chunk. Metrics
+    are recorded like call_claude's, with time-to-first-byte measured to the
+    first text chunk.
+    """
+    kwargs = _request_kwargs(prompt, system, max_tokens, prefix)
+    cache = get_response_cache() if use_cache else None
+    key = request_key(**kwargs) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if on_text is not None:
+                on_text(cached)
+            return cached
+
+    if client is None:
+        client = create_client()
+    tokens = estimate_request_tokens(kwargs)
+    started = time.perf_counter()
 
     for attempt in range(1, MAX_RETRIES + 1):
+        trial = _breaker.check() if _breaker is not None else False
+        chunks = []
+        ttfb = None
         try:
-            kwargs = {"model": MODEL, "max_tokens": 4096, "messages": messages}
-            if system:
-                kwargs["system"] = system
-            response = client.messages.create(**kwargs)
-            return response.content[0].text
-        except (anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.APIStatusError) as e:
-            last_error = e
-            if attempt < MAX_RETRIES:
-                delay = BASE_DELAY * (2 ** (attempt - 1))
-                time.sleep(delay)
+            if _limiter is not None:
+                _limiter.acquire(MODEL, tokens)
+            attempt_started = time.perf_counter()
+            with client.messages.stream(**kwargs, timeout=REQUEST_TIMEOUT) as stream:
+                for text in stream.text_stream:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - attempt_started
+                    chunks.append(text)
+                    if on_text is not None:
+                        on_text(text)
+                usage = record_usage(stream.get_final_message().usage)
+        except anthropic.APIError as e:
+            delay = _failed(e, attempt)
+            if chunks:
+                _record_call(operation, started, attempt, ttfb=ttfb, error=e)
+                raise RuntimeError(f"AI stream interrupted: {e}")
+            if delay is None:
+                _record_call(operation, started, attempt, error=e)
+                raise RuntimeError(f"AI request failed after {attempt} attempt(s): {e}")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            _abandoned(trial)
+            raise
+        if _breaker is not None:
+            _breaker.record_success()
+        _settle(tokens, usage)
+        text = "".join(chunks)
+        if cache is not None:
+            cache.put(key, text)
+        _record_call(operation, started, attempt, ttfb=ttfb, usage=usage)
+        return text
+
 
-    raise RuntimeError(f"AI request failed after {MAX_RETRIES} attempts: {last_error}")
+def batch_params(
+    prefix: list[str], prompt: str, system: str, max_tokens: int, tool: dict | None = None
+) -> dict:
+    """messages.create params for one Message Batches request.
 
+    They are what call_claude would send for the same request, with
+    ``max_tokens`` as the ceiling passed to max_tokens_for.
+    """
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, max_tokens)
+    return _request_kwargs(prompt, system, max_tokens, prefix, tool)
 
-def brainstorm(user_prompt: str, accepted_ideas: list[str], client: anthropic.Anthropic | None = None) -> str:
-    """Generate brainstorming ideas."""
-    context = ""
-    if accepted_ideas:
-        ideas_list = "\n".join(f"- {idea}" for idea in accepted_ideas)
-        context = f"Previously accepted ideas:\n{ideas_list}\n\n"
 
-    prompt = f"""{context}User request: {user_prompt}
+def record_batch_result(operation: str, params: dict, message, latency: float) -> str:
+    """Account for a succeeded batch result and return its text.
+
+    Usage is added to usage_totals and the metrics store (``latency`` is
+    the time since submission), and the text is put in the response cache
+    under ``params``, so an identical interactive request is answered
+    without an API call.
+    """
+    usage = record_usage(getattr(message, "usage", None))
+    text = _response_text(message)
+    store = get_metrics_store()
+    if store is not None:
+        store.record(operation, params["model"], latency=latency, usage=usage)
+    cache = get_response_cache()
+    if cache is not None:
+        cache.put(request_key(**params), text)
+    return text
+
+
+def idea_blocks(
+    accepted_ideas: list[str], summary: str = "", heading: str = "Previously accepted ideas:"
+) -> list[str]:
+    """Stable, append-only context blocks: the summary, then ideas in IDEA_CHUNK-sized chunks.
+
+    Chunk boundaries depend only on idea positions, so adding ideas leaves
+    every earlier block - and the prompt-cache prefix they form - unchanged.
+    """
+    blocks = []
+    if summary:
+        blocks.append(f"Summary of earlier accepted ideas:\n{summary}\n\n")
+    for start in range(0, len(accepted_ideas), IDEA_CHUNK):
+        chunk = "".join(f"- {idea}\n" for idea in accepted_ideas[start:start + IDEA_CHUNK])
+        blocks.append(f"{heading}\n{chunk}" if start == 0 else chunk)
+    return blocks
+
+
+def brainstorm_request(
+    user_prompt: str,
+    accepted_ideas: list[str],
+    summary: str = "",
+    structured: bool = False,
+    covered: list[str] = (),
+) -> tuple[list[str], str, str]:
+    """Build the (prefix, prompt, system) triple for a brainstorming round.
+
+    With ``structured`` the ideas are requested through IDEAS_TOOL instead
+    of as markdown bullets. ``covered`` lists ideas proposed in earlier
+    rounds (see similarity.IdeaIndex.covered) that the model shouldn't
+    repeat; it goes in the prompt, as it changes every round and would
+    break the cached prefix.
+    """
+    prefix = idea_blocks(accepted_ideas, summary)
+    if structured:
+        prompt = f"""User request: {user_prompt}
+
+Generate 4-8 ideas and record them with the {IDEAS_TOOL["name"]} tool.
+Each idea should be specific and actionable."""
+        system = "You are a project brainstorming assistant. Generate creative, practical ideas."
+    else:
+        prompt = f"""User request: {user_prompt}
 
 Generate 4-8 ideas as a markdown bullet list with checkboxes.
 Format each as: - [ ] <idea description>
 Each idea should be specific and actionable."""
+        system = "You are a project brainstorming assistant. Generate creative, practical ideas formatted as markdown checkbox bullets."
+    if covered:
+        prompt += "\nAlready proposed in earlier rounds (don't repeat or rephrase these): " + "; ".join(covered)
+    if prefix:
+        prompt = "\n" + prompt
+    return prefix, prompt, system
+
 
-    system = "You are a project brainstorming assistant. Generate creative, practical ideas formatted as markdown checkbox bullets."
-    return call_claude(prompt, system=system, client=client)
+def brainstorm(
+    user_prompt: str,
+    accepted_ideas: list[str],
+    client: anthropic.Anthropic | None = None,
+    on_text: Callable[[str], None] | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+    covered: list[str] = (),
+) -> str:
+    """Generate brainstorming ideas. Streams chunks to ``on_text`` if given.
 
+    With ``structured`` (default: structured_output_enabled()) the ideas
+    come back as IDEAS_TOOL JSON, which project.parse_bullets decodes.
+    Streamed requests always use markdown. ``covered`` is passed to
+    brainstorm_request.
+    """
+    if on_text is not None:
+        prefix, prompt, system = brainstorm_request(user_prompt, accepted_ideas, summary, covered=covered)
+        max_tokens = max_tokens_for("".join(prefix) + prompt, system, BRAINSTORM_MAX_TOKENS)
+        return stream_claude(
+            prompt, system=system, client=client, on_text=on_text, max_tokens=max_tokens,
+            prefix=prefix, operation="brainstorm"
+        )
+    structured = _use_structured(structured)
+    prefix, prompt, system = brainstorm_request(user_prompt, accepted_ideas, summary, structured, covered)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, BRAINSTORM_MAX_TOKENS)
+    return call_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="brainstorm",
+        tool=IDEAS_TOOL if structured else None,
+    )
 
-def analyze(accepted_ideas: list[str], client: anthropic.Anthropic | None = None) -> dict:
-    """Analyze if accepted ideas form a sufficient project foundation."""
-    ideas_list = "\n".join(f"- {idea}" for idea in accepted_ideas)
 
-    prompt = f"""Evaluate these project ideas for readiness to proceed to implementation planning:
+async def abrainstorm(
+    user_prompt: str,
+    accepted_ideas: list[str],
+    client: anthropic.AsyncAnthropic | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+    covered: list[str] = (),
+) -> str:
+    """Async brainstorm."""
+    structured = _use_structured(structured)
+    prefix, prompt, system = brainstorm_request(user_prompt, accepted_ideas, summary, structured, covered)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, BRAINSTORM_MAX_TOKENS)
+    return await acall_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="brainstorm",
+        tool=IDEAS_TOOL if structured else None,
+    )
 
+
+async def abrainstorm_many(
+    prompts: list[str],
+    accepted_ideas: list[str],
+    client: anthropic.AsyncAnthropic | None = None,
+    limit: int = MAX_CONCURRENCY,
+    summary: str = "",
+    covered: list[str] = (),
+) -> list:
+    """Brainstorm many prompts concurrently against the same accepted ideas.
+
+    Returns one entry per prompt, in order: the response text, or the
+    exception that request failed with.
+    """
+    if client is None:
+        client = create_async_client()
+    calls = (abrainstorm(p, accepted_ideas, client=client, summary=summary, covered=covered) for p in prompts)
+    return await gather_limited(calls, limit=limit, return_exceptions=True)
+
+
+def summarize_ideas(ideas: list[str], previous: str = "", client: anthropic.Anthropic | None = None) -> str:
+    """Fold ``ideas`` into a compact summary, extending ``previous`` if given."""
+    ideas_list = "\n".join(f"- {idea}" for idea in ideas)
+    earlier = f"Existing summary:\n{previous}\n\n" if previous else ""
+    prompt = f"""{earlier}Accepted project ideas to fold in:
 {ideas_list}
 
-Evaluate:
-1. **Completeness:** Are core requirements covered (purpose, features, constraints, success criteria)?
-2. **Clarity:** Are ideas specific and unambiguous?
-3. **Feasibility:** Are ideas achievable and non-contradictory?
+Write a compact summary (at most 10 short lines) that preserves every
+decision and constraint above, merging it with the existing summary if any."""
+
+    system = "You are a project assistant. Summarize project decisions concisely without losing facts."
+    return call_claude(
+        prompt, system=system, client=client, max_tokens=SUMMARY_MAX_TOKENS, operation="summarize"
+    )
+
+
+def _analysis_format(structured: bool) -> str:
+    if structured:
+        return f"\n\nRecord your verdict with the {ANALYSIS_TOOL['name']} tool."
+    return """
 
 Respond in this exact format:
 READY: true or false
 GAPS: comma-separated list of missing areas (or "none")
 SUMMARY: 1-2 sentence assessment"""
 
+
+def analysis_request(
+    accepted_ideas: list[str], summary: str = "", structured: bool = False
+) -> tuple[list[str], str, str]:
+    """Build the (prefix, prompt, system) triple for a readiness analysis.
+
+    With ``structured`` the verdict is requested through ANALYSIS_TOOL.
+    """
+    prefix = idea_blocks(accepted_ideas, summary, heading="Project ideas:")
+    prompt = """
+Evaluate these project ideas for readiness to proceed to implementation planning.
+
+Evaluate:
+1. **Completeness:** Are core requirements covered (purpose, features, constraints, success criteria)?
+2. **Clarity:** Are ideas specific and unambiguous?
+3. **Feasibility:** Are ideas achievable and non-contradictory?""" + _analysis_format(structured)
+
+    system = "You are a project analysis assistant. Evaluate project readiness objectively."
+    return prefix, prompt, system
+
+
+def analyze(
+    accepted_ideas: list[str],
+    client: anthropic.Anthropic | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+) -> dict:
+    """Analyze if accepted ideas form a sufficient project foundation.
+
+    ``structured`` defaults to structured_output_enabled().
+    """
+    structured = _use_structured(structured)
+    prefix, prompt, system = analysis_request(accepted_ideas, summary, structured)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, ANALYSIS_MAX_TOKENS)
+    response = call_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="analyze",
+        tool=ANALYSIS_TOOL if structured else None,
+    )
+    return parse_analysis(response)
+
+
+async def aanalyze(
+    accepted_ideas: list[str],
+    client: anthropic.AsyncAnthropic | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+) -> dict:
+    """Async analyze."""
+    structured = _use_structured(structured)
+    prefix, prompt, system = analysis_request(accepted_ideas, summary, structured)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, ANALYSIS_MAX_TOKENS)
+    response = await acall_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="analyze",
+        tool=ANALYSIS_TOOL if structured else None,
+    )
+    return parse_analysis(response)
+
+
+def delta_analysis_request(previous: dict, new_ideas: list[str], structured: bool = False) -> tuple[str, str]:
+    """Build the (prompt, system) pair for re-evaluating a verdict after ideas were added."""
+    gaps = ", ".join(previous.get("gaps", [])) or "none"
+    new_list = "\n".join(f"- {idea}" for idea in new_ideas)
+    prompt = f"""A project was previously evaluated for readiness to proceed to implementation planning.
+
+Previous verdict:
+READY: {"true" if previous.get("ready") else "false"}
+GAPS: {gaps}
+SUMMARY: {previous.get("summary", "")}
+
+Since then these ideas have been accepted:
+{new_list}
+
+Update the verdict: drop gaps the new ideas cover, add any new gaps or contradictions they introduce.""" \
+        + _analysis_format(structured)
+
     system = "You are a project analysis assistant. Evaluate project readiness objectively."
-    response = call_claude(prompt, system=system, client=client)
+    return prompt, system
+
+
+def analyze_delta(
+    previous: dict,
+    new_ideas: list[str],
+    client: anthropic.Anthropic | None = None,
+    structured: bool | None = None,
+) -> dict:
+    """Update a previous analysis with newly accepted ideas."""
+    structured = _use_structured(structured)
+    prompt, system = delta_analysis_request(previous, new_ideas, structured)
+    max_tokens = max_tokens_for(prompt, system, ANALYSIS_MAX_TOKENS)
+    response = call_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, operation="analyze",
+        tool=ANALYSIS_TOOL if structured else None,
+    )
+    return parse_analysis(response)
+
+
+async def aanalyze_delta(
+    previous: dict,
+    new_ideas: list[str],
+    client: anthropic.AsyncAnthropic | None = None,
+    structured: bool | None = None,
+) -> dict:
+    """Async analyze_delta."""
+    structured = _use_structured(structured)
+    prompt, system = delta_analysis_request(previous, new_ideas, structured)
+    max_tokens = max_tokens_for(prompt, system, ANALYSIS_MAX_TOKENS)
+    response = await acall_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, operation="analyze",
+        tool=ANALYSIS_TOOL if structured else None,
+    )
     return parse_analysis(response)
 
 
 def parse_analysis(response: str) -> dict:
-    """Parse analysis response into structured data."""
+    """Parse an analysis response into {"ready", "gaps", "summary"}.
+
+    Structured (ANALYSIS_TOOL) responses are decoded directly; anything else
+    goes through the READY:/GAPS:/SUMMARY: line parser.
+    """
+    decoded = decode_analysis(response)
+    if decoded is not None:
+        return decoded
+
     ready = False
     gaps = []
     summary = ""
@@ -99,13 +922,24 @@ def parse_analysis(response: str) -> dict:
     return {"ready": ready, "gaps": gaps, "summary": summary}
 
 
-def generate_plan(accepted_ideas: list[str], project_name: str, client: anthropic.Anthropic | None = None) -> str:
-    """Generate an implementation plan from accepted ideas."""
-    ideas_list = "\n".join(f"- {idea}" for idea in accepted_ideas)
+def plan_request(
+    accepted_ideas: list[str], project_name: str, summary: str = "", structured: bool = False
+) -> tuple[list[str], str, str]:
+    """Build the (prefix, prompt, system) triple for an implementation plan.
 
-    prompt = f"""Create an implementation plan for the project "{project_name}" based on these accepted ideas:
+    With ``structured`` the plan is requested through PLAN_TOOL, one
+    markdown string per PLAN_SECTIONS entry.
+    """
+    prefix = idea_blocks(accepted_ideas, summary, heading="Accepted ideas:")
+    if structured:
+        prompt = f"""
+Create an implementation plan for the project "{project_name}" based on the accepted ideas above.
 
-{ideas_list}
+Record it with the {PLAN_TOOL["name"]} tool: one markdown string per section,
+starting directly with the content, without repeating the section heading."""
+    else:
+        prompt = f"""
+Create an implementation plan for the project "{project_name}" based on the accepted ideas above.
 
 Provide a structured plan with:
 1. Project overview
@@ -115,4 +949,133 @@ Provide a structured plan with:
 5. Key milestones"""
 
     system = "You are a software architect. Create clear, actionable implementation plans."
-    return call_claude(prompt, system=system, client=client)
+    return prefix, prompt, system
+
+
+def generate_plan(
+    accepted_ideas: list[str],
+    project_name: str,
+    client: anthropic.Anthropic | None = None,
+    on_text: Callable[[str], None] | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+) -> str:
+    """Generate an implementation plan from accepted ideas. Streams chunks to ``on_text`` if given.
+
+    With ``structured`` (default: structured_output_enabled()) the sections
+    come back as PLAN_TOOL JSON and are assembled into markdown; streamed
+    requests always use markdown.
+    """
+    if on_text is not None:
+        prefix, prompt, system = plan_request(accepted_ideas, project_name, summary)
+        max_tokens = max_tokens_for("".join(prefix) + prompt, system, PLAN_MAX_TOKENS)
+        return stream_claude(
+            prompt, system=system, client=client, on_text=on_text, max_tokens=max_tokens,
+            prefix=prefix, operation="plan"
+        )
+    structured = _use_structured(structured)
+    prefix, prompt, system = plan_request(accepted_ideas, project_name, summary, structured)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, PLAN_MAX_TOKENS)
+    response = call_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="plan",
+        tool=PLAN_TOOL if structured else None,
+    )
+    return parse_plan(response, project_name)
+
+
+async def agenerate_plan(
+    accepted_ideas: list[str],
+    project_name: str,
+    client: anthropic.AsyncAnthropic | None = None,
+    summary: str = "",
+    structured: bool | None = None,
+) -> str:
+    """Async generate_plan."""
+    structured = _use_structured(structured)
+    prefix, prompt, system = plan_request(accepted_ideas, project_name, summary, structured)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, PLAN_MAX_TOKENS)
+    response = await acall_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="plan",
+        tool=PLAN_TOOL if structured else None,
+    )
+    return parse_plan(response, project_name)
+
+
+def parse_plan(response: str, project_name: str) -> str:
+    """Markdown plan text: structured (PLAN_TOOL) responses are assembled, markdown passes through."""
+    sections = decode(response, PLAN_TOOL)
+    if sections is None:
+        return response
+    return assemble_plan(project_name, sections)
+
+
+def plan_section_request(
+    accepted_ideas: list[str], project_name: str, section: str, summary: str = ""
+) -> tuple[list[str], str, str]:
+    """Build the (prefix, prompt, system) triple for one PLAN_SECTIONS entry.
+
+    The prefix is the same as plan_request's, so all sections share one
+    prompt-cache entry.
+    """
+    headings = {key: (heading, brief) for key, heading, brief in PLAN_SECTIONS}
+    if section not in headings:
+        raise ValueError(f"Unknown plan section '{section}'. Available: {', '.join(headings)}")
+    heading, brief = headings[section]
+    prefix = idea_blocks(accepted_ideas, summary, heading="Accepted ideas:")
+    prompt = f"""
+You are writing one section of the implementation plan for the project "{project_name}",
+based on the accepted ideas above. Other sections are written separately.
+
+Write only the "{heading}" section: {brief}.
+Use markdown, start directly with the content and do not repeat the section heading."""
+
+    system = "You are a software architect. Create clear, actionable implementation plans."
+    return prefix, prompt, system
+
+
+async def agenerate_plan_section(
+    accepted_ideas: list[str],
+    project_name: str,
+    section: str,
+    client: anthropic.AsyncAnthropic | None = None,
+    summary: str = "",
+) -> str:
+    """Generate a single plan section."""
+    prefix, prompt, system = plan_section_request(accepted_ideas, project_name, section, summary)
+    max_tokens = max_tokens_for("".join(prefix) + prompt, system, SECTION_MAX_TOKENS)
+    return await acall_claude(
+        prompt, system=system, client=client, max_tokens=max_tokens, prefix=prefix, operation="plan"
+    )
+
+
+async def agenerate_plan_sections(
+    accepted_ideas: list[str],
+    project_name: str,
+    sections: Iterable[str] | None = None,
+    client: anthropic.AsyncAnthropic | None = None,
+    summary: str = "",
+    limit: int = MAX_CONCURRENCY,
+) -> dict:
+    """Generate plan sections concurrently.
+
+    Returns {section: text or the exception that request failed with},
+    so one failed section doesn't lose the others.
+    """
+    sections = list(sections) if sections is not None else [key for key, _, _ in PLAN_SECTIONS]
+    if client is None:
+        client = create_async_client()
+    calls = (
+        agenerate_plan_section(accepted_ideas, project_name, s, client=client, summary=summary)
+        for s in sections
+    )
+    results = await gather_limited(calls, limit=limit, return_exceptions=True)
+    return dict(zip(sections, results))
+
+
+def assemble_plan(project_name: str, sections: dict) -> str:
+    """Join section texts into one markdown plan, in PLAN_SECTIONS order."""
+    parts = [f"# Implementation Plan: {project_name}"]
+    for key, heading, _ in PLAN_SECTIONS:
+        if key in sections:
+            parts.append(f"## {heading}\n\n{sections[key].strip()}")
+    return "\n\n".join(parts) + "\n"
@@ -1,39 +1,256 @@
 """Sufficiency analysis logic."""
 
+import asyncio
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from . import ai_client
+from . import ai_client, context
+from .model import Analysis, Project
 
+SPECULATION_KEY = "speculation"
+SECTIONS_KEY = "plan_sections"
 
-def run_analysis(project: dict, client=None) -> dict:
-    """Run analysis on project's accepted ideas and update project state."""
-    accepted = project.get("accepted_ideas", [])
+
+@dataclass(slots=True)
+class Speculation:
+    """Outcome of one speculative plan run.
+
+    ``saved_seconds`` is the serial cost (analysis + plan latency) minus the
+    wall-clock time actually spent; ``wasted_tokens`` estimates the tokens
+    spent on a plan that was discarded because the project wasn't ready.
+    """
+
+    used: bool
+    wall_seconds: float
+    saved_seconds: float = 0.0
+    wasted_tokens: int = 0
+
+
+def idea_context(project: Project, query: str = "", client=None) -> context.IdeaContext:
+    """Accepted ideas trimmed to the context budget, summarizing older ones via the API."""
+    def summarize(ideas, previous):
+        return ai_client.summarize_ideas(ideas, previous, client=client)
+
+    return context.build_context(project, query, summarize=summarize)
+
+
+def _no_ideas_analysis() -> Analysis:
+    return Analysis(
+        last_run=datetime.now(timezone.utc).isoformat(),
+        ready=False,
+        gaps=["No ideas accepted yet. Run brainstorm and select commands first."],
+        summary="No accepted ideas to analyze.",
+    )
+
+
+def _reusable(project: Project, accepted: list[str], force: bool) -> tuple[Analysis | None, list[str] | None]:
+    """(stored verdict if still current, new ideas if a delta update suffices)."""
+    previous = project.analysis
+    if force or previous is None or previous.fingerprint is None:
+        return None, None
+    if previous.fingerprint == context.fingerprint(accepted):
+        return previous, None
+    count = previous.idea_count
+    new_ideas = accepted[count:]
+    if 0 < len(new_ideas) <= count and context.fingerprint(accepted[:count]) == previous.fingerprint:
+        return None, new_ideas
+    return None, None
+
+
+def is_current(project: Project) -> bool:
+    """True if the stored analysis covers exactly the current accepted ideas."""
+    accepted = list(project.accepted_ideas)
+    return bool(accepted) and _reusable(project, accepted, False)[0] is not None
+
+
+def run_analysis(project: Project, client=None, force: bool = False) -> Analysis:
+    """Run analysis on project's accepted ideas and update project state.
+
+    The stored verdict is returned as-is (no API call) while its
+    fingerprint still matches the accepted ideas. If ideas were only
+    appended since, and no more of them than were already analyzed, the
+    previous verdict is updated from the new ideas alone. ``force`` always
+    re-evaluates the full idea set.
+    """
+    accepted = list(project.accepted_ideas)
     if not accepted:
-        return {
-            "last_run": datetime.now(timezone.utc).isoformat(),
-            "ready": False,
-            "gaps": ["No ideas accepted yet. Run brainstorm and select commands first."],
-            "summary": "No accepted ideas to analyze.",
-        }
-
-    result = ai_client.analyze(accepted, client=client)
-    analysis = {
-        "last_run": datetime.now(timezone.utc).isoformat(),
-        "ready": result["ready"],
-        "gaps": result["gaps"],
-        "summary": result.get("summary", ""),
-    }
-    project["analysis"] = analysis
+        return _no_ideas_analysis()
+
+    current, new_ideas = _reusable(project, accepted, force)
+    if current is not None:
+        return current
+    if new_ideas is not None:
+        result = ai_client.analyze_delta(project.analysis.to_dict(), new_ideas, client=client)
+    else:
+        ctx = idea_context(project, client=client)
+        result = ai_client.analyze(ctx.ideas, client=client, summary=ctx.summary)
+    return store_analysis(project, result, accepted)
+
+
+async def arun_analysis(project: Project, client=None, force: bool = False) -> Analysis:
+    """Async run_analysis. ``client`` is an AsyncAnthropic; idea summaries still use the sync API."""
+    accepted = list(project.accepted_ideas)
+    if not accepted:
+        return _no_ideas_analysis()
+
+    current, new_ideas = _reusable(project, accepted, force)
+    if current is not None:
+        return current
+    if new_ideas is not None:
+        result = await ai_client.aanalyze_delta(project.analysis.to_dict(), new_ideas, client=client)
+    else:
+        ctx = idea_context(project)
+        result = await ai_client.aanalyze(ctx.ideas, client=client, summary=ctx.summary)
+    return store_analysis(project, result, accepted)
+
+
+def store_analysis(project: Project, result: dict, accepted: list[str]) -> Analysis:
+    """Set project.analysis from a parsed verdict on ``accepted`` (the ideas it evaluated)."""
+    analysis = Analysis(
+        last_run=datetime.now(timezone.utc).isoformat(),
+        ready=result["ready"],
+        gaps=result["gaps"],
+        summary=result.get("summary", ""),
+        fingerprint=context.fingerprint(accepted),
+        idea_count=len(accepted),
+    )
+    project.analysis = analysis
     return analysis
 
 
-def generate_plan(project: dict, client=None) -> str:
-    """Generate implementation plan. Runs analysis first."""
+def generate_plan(project: Project, client=None, on_text=None, speculative: bool = False) -> str:
+    """Generate implementation plan. Runs analysis first (reusing a current verdict).
+
+    If ``on_text`` is given the plan is streamed to it chunk by chunk.
+    With ``speculative`` (and no current verdict) the plan is requested
+    alongside the analysis instead of after it; see agenerate_plan_speculative.
+    ``client`` and ``on_text`` are not used in that case.
+    """
+    if speculative and not is_current(project):
+        plan, _ = asyncio.run(agenerate_plan_speculative(project))
+        return plan
+
     analysis = run_analysis(project, client=client)
-    if not analysis["ready"]:
+    if not analysis.ready:
         return None
+    ctx = idea_context(project, client=client)
     plan = ai_client.generate_plan(
-        project["accepted_ideas"], project["name"], client=client
+        ctx.ideas, project.name, client=client, on_text=on_text, summary=ctx.summary
     )
-    project["plan"] = plan
+    project.plan = plan
     return plan
+
+
+def generate_plan_sections(
+    project: Project, sections: list[str] | None = None, client=None
+) -> tuple[str | None, dict]:
+    """Generate the plan as independent, concurrent section requests.
+
+    Sections are kept under project.extra[SECTIONS_KEY] together with the
+    idea fingerprint they were written for. Sections named in ``sections``
+    are regenerated; by default only those missing or written for a
+    different idea set are. Returns (plan, failures): the assembled plan once
+    every section is present (None if not ready or incomplete) and
+    {section: exception} for requests that failed. ``client`` is an
+    AsyncAnthropic.
+    """
+    analysis = run_analysis(project)
+    if not analysis.ready:
+        return None, {}
+
+    fingerprint = context.fingerprint(list(project.accepted_ideas))
+    stored = project.extra.get(SECTIONS_KEY) or {}
+    done = dict(stored.get("sections", {})) if stored.get("fingerprint") == fingerprint else {}
+    if sections is None:
+        sections = [key for key, _, _ in ai_client.PLAN_SECTIONS if key not in done]
+
+    failures = {}
+    if sections:
+        ctx = idea_context(project)
+        results = asyncio.run(
+            ai_client.agenerate_plan_sections(ctx.ideas, project.name, sections, client=client, summary=ctx.summary)
+        )
+        for key, result in results.items():
+            if isinstance(result, Exception):
+                failures[key] = result
+            else:
+                done[key] = result
+        project.set_extra(SECTIONS_KEY, {"fingerprint": fingerprint, "sections": done})
+
+    if any(key not in done for key, _, _ in ai_client.PLAN_SECTIONS):
+        return None, failures
+    plan = ai_client.assemble_plan(project.name, done)
+    if plan != project.plan:
+        project.plan = plan
+    return plan, failures
+
+
+async def agenerate_plan_speculative(project: Project, client=None) -> tuple[str | None, Speculation]:
+    """Run the analysis and the plan request concurrently.
+
+    The plan is kept if the analysis says ready; otherwise it is cancelled
+    (or discarded, if it already finished). The outcome is returned and
+    added to the running totals under project.extra[SPECULATION_KEY].
+    """
+    ctx = idea_context(project)
+    prefix, prompt, system = ai_client.plan_request(
+        ctx.ideas, project.name, ctx.summary, ai_client.structured_output_enabled()
+    )
+    start = time.perf_counter()
+    plan_finished = None
+
+    async def speculate():
+        nonlocal plan_finished
+        text = await ai_client.agenerate_plan(ctx.ideas, project.name, client=client, summary=ctx.summary)
+        plan_finished = time.perf_counter()
+        return text
+
+    plan_task = asyncio.create_task(speculate())
+    try:
+        analysis = await arun_analysis(project, client=client)
+    except BaseException:
+        plan_task.cancel()
+        await asyncio.gather(plan_task, return_exceptions=True)
+        raise
+    analysis_finished = time.perf_counter()
+
+    if not analysis.ready:
+        wasted = context.estimate_tokens("".join(prefix) + prompt + system)
+        if plan_task.done():
+            (result,) = await asyncio.gather(plan_task, return_exceptions=True)
+            if isinstance(result, str):
+                wasted += context.estimate_tokens(result)
+        else:
+            plan_task.cancel()
+            await asyncio.gather(plan_task, return_exceptions=True)
+        outcome = Speculation(False, analysis_finished - start, wasted_tokens=wasted)
+        _record_speculation(project, outcome)
+        return None, outcome
+
+    plan = await plan_task
+    end = time.perf_counter()
+    serial = (analysis_finished - start) + (plan_finished - start)
+    outcome = Speculation(True, end - start, saved_seconds=max(0.0, serial - (end - start)))
+    project.plan = plan
+    _record_speculation(project, outcome)
+    return plan, outcome
+
+
+def _record_speculation(project: Project, outcome: Speculation) -> None:
+    totals = dict(project.extra.get(SPECULATION_KEY) or {})
+    totals.setdefault("runs", 0)
+    totals.setdefault("used", 0)
+    totals.setdefault("saved_seconds", 0.0)
+    totals.setdefault("wasted_tokens", 0)
+    totals["runs"] += 1
+    totals["used"] += int(outcome.used)
+    totals["saved_seconds"] = round(totals["saved_seconds"] + outcome.saved_seconds, 3)
+    totals["wasted_tokens"] += outcome.wasted_tokens
+    totals["last"] = {
+        "used": outcome.used,
+        "wall_seconds": round(outcome.wall_seconds, 3),
+        "saved_seconds": round(outcome.saved_seconds, 3),
+        "wasted_tokens": outcome.wasted_tokens,
+    }
+    project.set_extra(SPECULATION_KEY, totals)
@@ -0,0 +1,304 @@
+"""Bulk analysis, planning and brainstorming through the Message Batches API.
+
+A job is a JSON manifest listing one entry per request: the project it
+belongs to, the messages.create params, and its status. Requests already in
+the response cache are answered when the job is created. The rest are
+submitted in batches of at most MAX_BATCH_REQUESTS. Once a batch has ended,
+its results are downloaded into the manifest and then applied to their
+projects. The manifest is saved after every step, so run_job() can resume
+a job that was interrupted at any point.
+
+Entry statuses: queued -> submitted -> done | errored, then done -> applied
+| discarded (through "applying" while the project is being saved).
+An analysis or plan is discarded if the project's accepted ideas changed
+after the request was built, and a plan is also discarded if the project
+was not ready.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import anthropic
+
+from . import ai_client, analyzer, context, project, storage
+from .cache import request_key
+from .structured import ANALYSIS_TOOL, IDEAS_TOOL
+
+MANIFEST_FILE = "projectmaker-batch.json"
+MAX_BATCH_REQUESTS = 10_000
+POLL_INTERVAL = 60.0
+
+QUEUED = "queued"
+SUBMITTED = "submitted"
+DONE = "done"
+ERRORED = "errored"
+APPLIED = "applied"
+DISCARDED = "discarded"
+APPLYING = "applying"
+
+
+def _project_requests(
+    directory: Path, analyze: bool, plan: bool, prompts: list[str], force: bool, structured: bool
+) -> list[dict]:
+    """Entries for one project. Saves it, since building the context may refresh its idea summary."""
+    store = storage.FileStore(directory)
+    proj = project.load_project(lazy=True, store=store)
+    accepted = list(proj.accepted_ideas)
+    base = {
+        "project": str(directory),
+        "name": proj.name,
+        "fingerprint": context.fingerprint(accepted),
+        "status": QUEUED,
+    }
+    entries = []
+
+    analyze = analyze and bool(accepted) and (force or not analyzer.is_current(proj))
+    if analyze:
+        ctx = analyzer.idea_context(proj)
+        prefix, prompt, system = ai_client.analysis_request(ctx.ideas, ctx.summary, structured)
+        params = ai_client.batch_params(
+            prefix, prompt, system, ai_client.ANALYSIS_MAX_TOKENS, ANALYSIS_TOOL if structured else None
+        )
+        entries.append(dict(base, kind="analyze", ideas=accepted, params=params))
+
+    ready = analyzer.is_current(proj) and proj.analysis.ready
+    if plan and accepted and (analyze or ready):
+        ctx = analyzer.idea_context(proj)
+        prefix, prompt, system = ai_client.plan_request(ctx.ideas, proj.name, ctx.summary, structured)
+        params = ai_client.batch_params(
+            prefix, prompt, system, ai_client.PLAN_MAX_TOKENS, ai_client.PLAN_TOOL if structured else None
+        )
+        entries.append(dict(base, kind="plan", params=params))
+
+    for user_prompt in prompts:
+        ctx = analyzer.idea_context(proj, user_prompt)
+        prefix, prompt, system = ai_client.brainstorm_request(user_prompt, ctx.ideas, ctx.summary, structured)
+        params = ai_client.batch_params(
+            prefix, prompt, system, ai_client.BRAINSTORM_MAX_TOKENS, IDEAS_TOOL if structured else None
+        )
+        entries.append(dict(base, kind="brainstorm", prompt=user_prompt, params=params))
+
+    project.save_project(proj, store=store)
+    return entries
+
+
+class BatchJob:
+    """A bulk job persisted as a JSON manifest at ``path`` (see the module docstring)."""
+
+    def __init__(self, path: Path, data: dict):
+        self.path = Path(path)
+        self.data = data
+
+    @classmethod
+    def create(
+        cls,
+        path: Path,
+        directories: list[Path],
+        analyze: bool = True,
+        plan: bool = False,
+        prompts: list[str] = (),
+        force: bool = False,
+        structured: bool | None = None,
+    ) -> "BatchJob":
+        """Build the requests for every project in ``directories`` and save the manifest.
+
+        Analyses are only requested where the stored one is out of date
+        (unless ``force``); plans where the project is ready or is analyzed
+        in the same job. ``prompts`` are brainstormed in every project.
+        Projects that fail to load are listed under "skipped".
+        """
+        if structured is None:
+            structured = ai_client.structured_output_enabled()
+        entries, skipped = [], []
+        for directory in directories:
+            try:
+                entries.extend(_project_requests(Path(directory), analyze, plan, list(prompts), force, structured))
+            except (FileNotFoundError, ValueError) as e:
+                skipped.append({"project": str(directory), "error": str(e)})
+
+        cache = ai_client.get_response_cache()
+        for i, entry in enumerate(entries):
+            entry["id"] = f"req-{i}"
+            text = cache.get(request_key(**entry["params"])) if cache is not None else None
+            if text is not None:
+                entry.update(status=DONE, text=text)
+
+        job = cls(path, {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "batches": [],
+            "entries": entries,
+            "skipped": skipped,
+        })
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, path: Path) -> "BatchJob":
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No batch job found at {path}.")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Corrupted batch manifest {path}: {e}")
+        return cls(path, data)
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.data, indent=2))
+        tmp_path.replace(self.path)
+
+    @property
+    def entries(self) -> list[dict]:
+        return self.data["entries"]
+
+    def counts(self) -> Counter:
+        """Number of entries in each status."""
+        return Counter(entry["status"] for entry in self.entries)
+
+    def finished(self) -> bool:
+        return all(entry["status"] in (APPLIED, DISCARDED, ERRORED) for entry in self.entries)
+
+    def submit(self, client) -> int:
+        """Submit every queued entry; returns how many were submitted."""
+        queued = [entry for entry in self.entries if entry["status"] == QUEUED]
+        for start in range(0, len(queued), MAX_BATCH_REQUESTS):
+            chunk = queued[start:start + MAX_BATCH_REQUESTS]
+            batch = client.messages.batches.create(
+                requests=[{"custom_id": entry["id"], "params": entry["params"]} for entry in chunk]
+            )
+            self.data["batches"].append({
+                "id": batch.id,
+                "status": batch.processing_status,
+                "submitted_at": time.time(),
+                "collected": False,
+            })
+            for entry in chunk:
+                entry.update(status=SUBMITTED, batch=batch.id)
+            self.save()
+        return len(queued)
+
+    def poll(self, client) -> bool:
+        """Refresh the status of unfinished batches. True once all have ended."""
+        for batch in self.data["batches"]:
+            if batch["status"] != "ended":
+                batch["status"] = client.messages.batches.retrieve(batch["id"]).processing_status
+        self.save()
+        return all(batch["status"] == "ended" for batch in self.data["batches"])
+
+    def collect(self, client) -> int:
+        """Download the results of ended batches into the manifest; returns how many arrived."""
+        by_id = {entry["id"]: entry for entry in self.entries}
+        collected = 0
+        for batch in self.data["batches"]:
+            if batch["status"] != "ended" or batch["collected"]:
+                continue
+            latency = time.time() - batch["submitted_at"]
+            for item in client.messages.batches.results(batch["id"]):
+                entry = by_id.get(item.custom_id)
+                if entry is None or entry["status"] != SUBMITTED:
+                    continue
+                result = item.result
+                if result.type == "succeeded":
+                    text = ai_client.record_batch_result(f"batch_{entry['kind']}", entry["params"],
+                                                         result.message, latency)
+                    entry.update(status=DONE, text=text)
+                else:
+                    error = getattr(result, "error", None)
+                    entry.update(status=ERRORED, error=f"{result.type}: {error}" if error else result.type)
+                collected += 1
+            # Anything the batch didn't report on is lost; don't wait for it forever.
+            for entry in self.entries:
+                if entry.get("batch") == batch["id"] and entry["status"] == SUBMITTED:
+                    entry.update(status=ERRORED, error="missing from batch results")
+            batch["collected"] = True
+            self.save()
+        return collected
+
+    def apply(self) -> int:
+        """Write finished results into their projects; returns how many were applied.
+
+        Entries are marked "applying" before their project is saved, so a
+        brainstorm round saved just before a crash isn't added twice. If a
+        project can't be loaded or saved (e.g. its directory was moved since
+        the job was submitted), its entries are marked errored and the other
+        projects are still applied.
+        """
+        by_project = {}
+        for entry in self.entries:
+            if entry["status"] in (DONE, APPLYING):
+                by_project.setdefault(entry["project"], []).append(entry)
+
+        applied = 0
+        for directory, entries in by_project.items():
+            store = storage.FileStore(Path(directory))
+            try:
+                proj = project.load_project(lazy=True, store=store)
+                for entry in entries:
+                    entry["status"] = _apply(proj, entry, len(entries))
+                for entry in entries:
+                    if entry["status"] == APPLIED:
+                        entry["status"] = APPLYING
+                self.save()
+                project.save_project(proj, store=store)
+            except (OSError, ValueError, storage.ConflictError) as e:
+                for entry in entries:
+                    entry.update(status=ERRORED, error=f"{type(e).__name__}: {e}")
+                    entry.pop("text", None)
+                self.save()
+                continue
+            for entry in entries:
+                if entry["status"] == APPLYING:
+                    entry["status"] = APPLIED
+                    applied += 1
+                entry.pop("text", None)
+            self.save()
+        return applied
+
+
+def _apply(proj, entry: dict, tail: int) -> str:
+    """Apply one result to ``proj``; returns the entry's new status.
+
+    A resumed brainstorm is skipped if one of the last ``tail`` rounds
+    already holds its response.
+    """
+    text = entry["text"]
+    current = context.fingerprint(list(proj.accepted_ideas)) == entry["fingerprint"]
+    if entry["kind"] == "analyze":
+        if not current:
+            return DISCARDED
+        analyzer.store_analysis(proj, ai_client.parse_analysis(text), entry["ideas"])
+    elif entry["kind"] == "plan":
+        if not (current and analyzer.is_current(proj) and proj.analysis.ready):
+            return DISCARDED
+        proj.plan = ai_client.parse_plan(text, entry["name"])
+    else:
+        resumed = entry["status"] == APPLYING
+        if not (resumed and any(r.raw_response == text for r in proj.rounds[-tail:])):
+            project.add_round(proj, entry["prompt"], text)
+    return APPLIED
+
+
+def run_job(job: BatchJob, client=None, wait: bool = False, interval: float = POLL_INTERVAL, sleep=time.sleep) -> bool:
+    """Advance ``job`` as far as it can go; True once every entry is finished.
+
+    Submits queued entries, polls the batches (until they end, with
+    ``wait``), then collects and applies whatever results are available.
+    API errors are raised as RuntimeError; the manifest keeps everything
+    done so far.
+    """
+    client = client or ai_client.create_client()
+    try:
+        job.submit(client)
+        while not job.poll(client) and wait:
+            sleep(interval)
+        job.collect(client)
+    except anthropic.APIError as e:
+        raise RuntimeError(f"Batch request failed: {e}")
+    job.apply()
+    return job.finished()
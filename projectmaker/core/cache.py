@@ -0,0 +1,238 @@
+"""Content-addressed response cache with an in-process LRU and an on-disk store."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, concurrent stats updates may be lost.
+    fcntl = None
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_TTL = 7 * 24 * 3600.0
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+STATS_FILE = "stats.json"
+
+
+def default_cache_dir() -> Path:
+    """Cache directory (PROJECTMAKER_CACHE_DIR or ~/.cache/projectmaker/responses)."""
+    env = os.environ.get("PROJECTMAKER_CACHE_DIR")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "projectmaker" / "responses"
+
+
+def request_key(**request) -> str:
+    """Hash the full request (model, system, messages, max_tokens, ...) into a cache key."""
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache keyed by request_key().
+
+    Lookups hit the in-memory LRU first, then the on-disk store (if a
+    directory is given). Entries expire after ``ttl`` seconds; the disk tier
+    evicts least recently used files once it grows past ``max_bytes``.
+    The cache is only an optimization: if the directory can't be written,
+    the disk tier is dropped and the cache keeps working in memory.
+
+    Hit/miss counts are kept in memory; flush() adds them to the totals in
+    stats.json under an exclusive flock, once per command rather than per
+    lookup, so concurrent processes don't lose each other's counts.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float | None = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._unflushed = {"hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached text for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry):
+                self._memory.move_to_end(key)
+            else:
+                self._memory.pop(key, None)
+                entry = None
+        if entry is not None:
+            self._record(hit=True)
+            return entry["text"]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+            self._record(hit=True)
+            return entry["text"]
+
+        self._record(hit=False)
+        return None
+
+    def put(self, key: str, text: str, ttl: float | None = None) -> None:
+        """Store ``text`` under ``key``; ``ttl`` overrides the cache default."""
+        ttl = self.ttl if ttl is None else ttl
+        entry = {"expires_at": time.time() + ttl if ttl is not None else None, "text": text}
+        self._remember(key, entry)
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(entry))
+            tmp_path.replace(path)
+            self._evict_disk()
+        except OSError:
+            self.directory = None
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        self._memory.clear()
+        if self.directory is None or not self.directory.exists():
+            return
+        for path in self.directory.glob("*.json"):
+            if path.name != STATS_FILE:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus all-time totals and disk usage."""
+        totals = self._read_stats()
+        files = self._disk_entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0) + self._unflushed["hits"],
+            "total_misses": totals.get("misses", 0) + self._unflushed["misses"],
+            "memory_entries": len(self._memory),
+            "disk_entries": len(files),
+            "disk_bytes": sum(size for _, size, _ in files),
+        }
+
+    def _expired(self, entry: dict) -> bool:
+        return entry["expires_at"] is not None and entry["expires_at"] <= time.time()
+
+    def _remember(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read_disk(self, key: str) -> dict | None:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        try:
+            if self._expired(entry):
+                path.unlink(missing_ok=True)
+                return None
+            os.utime(path)
+        except OSError:
+            pass  # Read-only cache directory: the entry is still good, it just can't be refreshed.
+        return entry
+
+    def _disk_entries(self) -> list[tuple[float, int, Path]]:
+        if self.directory is None or not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.glob("*.json"):
+            if path.name == STATS_FILE:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_disk(self) -> None:
+        entries = sorted(self._disk_entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def flush(self) -> None:
+        """Add the counts recorded since the last flush to the totals in stats.json."""
+        if self.directory is None:
+            return
+        with self._lock:
+            counts, self._unflushed = self._unflushed, {"hits": 0, "misses": 0}
+        if not any(counts.values()):
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._stats_file(exclusive=True) as f:
+                totals = self._parse_stats(f)
+                for name, count in counts.items():
+                    totals[name] = totals.get(name, 0) + count
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(totals))
+                f.flush()
+        except OSError:
+            self.directory = None
+
+    @contextmanager
+    def _stats_file(self, exclusive: bool):
+        with (self.directory / STATS_FILE).open("a+" if exclusive else "r") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield f
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse_stats(f) -> dict:
+        f.seek(0)
+        try:
+            return json.loads(f.read() or "{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def _read_stats(self) -> dict:
+        if self.directory is not None:
+            try:
+                with self._stats_file(exclusive=False) as f:
+                    return self._parse_stats(f)
+            except OSError:
+                pass
+        return {}
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._unflushed["hits" if hit else "misses"] += 1
@@ -0,0 +1,110 @@
+"""Token budgeting for the accepted-ideas context sent with each prompt."""
+
+import hashlib
+import math
+import re
+from dataclasses import dataclass
+
+CHARS_PER_TOKEN = 4
+# Prompt plus completion. A prompt carrying a full IDEA_TOKEN_BUDGET of ideas is about
+# 3.2k tokens, which leaves the answer roughly 3.8k; smaller projects get each operation's ceiling.
+REQUEST_TOKEN_BUDGET = 7_000
+IDEA_TOKEN_BUDGET = 3_000
+MIN_OUTPUT_TOKENS = 512
+FOLD_BATCH = 10
+SUMMARY_KEY = "idea_summary"
+
+
+@dataclass(slots=True)
+class IdeaContext:
+    """Ideas to quote verbatim plus a summary standing in for the rest."""
+
+    ideas: list[str]
+    summary: str = ""
+    folded: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count (about four characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def max_tokens_for(prompt: str, system: str = "", ceiling: int = 4096) -> int:
+    """Completion budget left in REQUEST_TOKEN_BUDGET after the prompt, capped at ``ceiling``."""
+    remaining = REQUEST_TOKEN_BUDGET - estimate_tokens(prompt) - estimate_tokens(system)
+    return max(MIN_OUTPUT_TOKENS, min(ceiling, remaining))
+
+
+def fingerprint(ideas: list[str]) -> str:
+    """Stable hash of an ordered idea list."""
+    digest = hashlib.sha256()
+    for idea in ideas:
+        digest.update(idea.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _idea_tokens(idea: str) -> int:
+    return estimate_tokens(f"- {idea}\n")
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9]{3,}", text.lower()))
+
+
+def build_context(project, query: str = "", summarize=None, budget: int = IDEA_TOKEN_BUDGET) -> IdeaContext:
+    """Fit the project's accepted ideas into ``budget`` tokens.
+
+    Everything is quoted verbatim while it fits. Beyond that the newest
+    ideas (half the budget) stay verbatim and the older prefix is folded
+    into a rolling summary kept in the project under SUMMARY_KEY.
+    ``summarize(ideas, previous)`` is only called when that prefix has
+    grown by FOLD_BATCH ideas or more, and then only for the new ones.
+    Older ideas most relevant to ``query`` fill whatever budget is left.
+    """
+    ideas = list(project.accepted_ideas)
+    if sum(_idea_tokens(i) for i in ideas) <= budget:
+        return IdeaContext(ideas)
+
+    recent_tokens = 0
+    cutoff = len(ideas)
+    while cutoff > 0 and recent_tokens + _idea_tokens(ideas[cutoff - 1]) <= budget // 2:
+        cutoff -= 1
+        recent_tokens += _idea_tokens(ideas[cutoff])
+
+    state = project.extra.get(SUMMARY_KEY)
+    if state and (state["count"] > len(ideas) or fingerprint(ideas[:state["count"]]) != state["fingerprint"]):
+        state = None
+    if state and cutoff - state["count"] < FOLD_BATCH:
+        cutoff = min(cutoff, state["count"])
+        summary = state["text"]
+    elif summarize is None:
+        summary = state["text"] if state else ""
+        cutoff = state["count"] if state else 0
+    else:
+        start = state["count"] if state else 0
+        summary = summarize(ideas[start:cutoff], state["text"] if state else "")
+        project.set_extra(SUMMARY_KEY, {
+            "count": cutoff,
+            "fingerprint": fingerprint(ideas[:cutoff]),
+            "text": summary,
+        })
+
+    remaining = budget - estimate_tokens(summary) - sum(_idea_tokens(i) for i in ideas[cutoff:])
+    picked = set()
+    query_words = _words(query)
+    if query_words and remaining > 0:
+        scored = sorted(
+            ((len(query_words & _words(idea)), i) for i, idea in enumerate(ideas[:cutoff])),
+            key=lambda s: (-s[0], -s[1]),
+        )
+        for score, i in scored:
+            if score == 0:
+                break
+            cost = _idea_tokens(ideas[i])
+            if cost <= remaining:
+                picked.add(i)
+                remaining -= cost
+
+    verbatim = [ideas[i] for i in sorted(picked)] + ideas[cutoff:]
+    return IdeaContext(verbatim, summary, cutoff)
@@ -0,0 +1,134 @@
+"""Per-call API metrics, appended to a local JSON-lines file."""
+
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+MAX_BYTES = 5 * 1024 * 1024
+PERCENTILES = (50, 95, 99)
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+def default_metrics_path() -> Path:
+    """Metrics file (PROJECTMAKER_METRICS or ~/.cache/projectmaker/metrics.jsonl)."""
+    env = os.environ.get("PROJECTMAKER_METRICS")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "projectmaker" / "metrics.jsonl"
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Nearest-rank percentile of ``values``; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MetricsStore:
+    """Append-only record of API calls.
+
+    One JSON object per line, so concurrent processes can append without
+    coordination. Once the file grows past ``max_bytes`` the older half is
+    dropped.
+    """
+
+    def __init__(self, path: Path | None = None, max_bytes: int = MAX_BYTES):
+        self.path = Path(path) if path is not None else default_metrics_path()
+        self.max_bytes = max_bytes
+
+    def record(
+        self,
+        operation: str,
+        model: str,
+        latency: float,
+        ttfb: float | None = None,
+        retries: int = 0,
+        error: str | None = None,
+        usage: dict | None = None,
+    ) -> None:
+        """Append one call. ``error`` is the exception class name of a failed call.
+
+        A metrics file that can't be written is skipped: the call it
+        describes has already finished.
+        """
+        entry = {
+            "ts": round(time.time(), 3),
+            "op": operation,
+            "model": model,
+            "latency": round(latency, 4),
+            "ttfb": round(ttfb, 4) if ttfb is not None else None,
+            "retries": retries,
+            "error": error,
+            **{k: v for k, v in (usage or {}).items() if v},
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            if self.path.stat().st_size > self.max_bytes:
+                self._trim()
+        except OSError:
+            pass
+
+    def read(self) -> list[dict]:
+        """All recorded calls, oldest first. Unreadable lines are skipped."""
+        try:
+            lines = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def summary(self) -> dict:
+        """Per-operation call counts, error rate, latency percentiles and token totals."""
+        return summarize(self.read())
+
+    def _trim(self) -> None:
+        lines = self.path.read_text().splitlines(keepends=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text("".join(lines[len(lines) // 2:]))
+        tmp_path.replace(self.path)
+
+
+def summarize(entries: list[dict]) -> dict:
+    """Aggregate metric entries by operation.
+
+    Latency percentiles cover successful calls only; failed calls count
+    towards ``errors`` and ``error_classes``.
+    """
+    grouped = {}
+    for entry in entries:
+        grouped.setdefault(entry.get("op", "call"), []).append(entry)
+
+    result = {}
+    for op, calls in sorted(grouped.items()):
+        ok = [c for c in calls if not c.get("error")]
+        latencies = [c["latency"] for c in ok]
+        ttfbs = [c["ttfb"] for c in ok if c.get("ttfb") is not None]
+        error_classes = {}
+        for c in calls:
+            if c.get("error"):
+                error_classes[c["error"]] = error_classes.get(c["error"], 0) + 1
+        result[op] = {
+            "calls": len(calls),
+            "errors": len(calls) - len(ok),
+            "error_rate": (len(calls) - len(ok)) / len(calls),
+            "error_classes": error_classes,
+            "retries": sum(c.get("retries", 0) for c in calls),
+            "latency": {f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+            "ttfb": {f"p{p}": percentile(ttfbs, p) for p in PERCENTILES},
+            "tokens": {k: sum(c.get(k, 0) for c in calls) for k in TOKEN_FIELDS},
+        }
+    return result
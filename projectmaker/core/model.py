@@ -0,0 +1,269 @@
+"""Typed in-memory project model.
+
+Records mirror the project.json schema and convert losslessly with
+to_dict()/from_dict(); keys this version doesn't know about are kept in
+``extra`` and written back unchanged.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Bullet:
+    id: int
+    text: str
+    selected: bool = False
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "text": self.text, "selected": self.selected}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Bullet":
+        return cls(data["id"], data["text"], data.get("selected", False))
+
+
+@dataclass(slots=True)
+class Round:
+    id: int
+    timestamp: str
+    prompt: str
+    bullets: list[Bullet]
+    raw_response: str
+    extra: dict = field(default_factory=dict)
+
+    def get_bullet(self, bullet_id: int) -> Bullet | None:
+        # Bullet ids are assigned sequentially, so the id is normally the position.
+        if 0 < bullet_id <= len(self.bullets) and self.bullets[bullet_id - 1].id == bullet_id:
+            return self.bullets[bullet_id - 1]
+        for bullet in self.bullets:
+            if bullet.id == bullet_id:
+                return bullet
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "prompt": self.prompt,
+            "bullets": [b.to_dict() for b in self.bullets],
+            "raw_response": self.raw_response,
+            **self.extra,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Round":
+        known = ("id", "timestamp", "prompt", "bullets", "raw_response")
+        return cls(
+            id=data["id"],
+            timestamp=data["timestamp"],
+            prompt=data["prompt"],
+            bullets=[Bullet.from_dict(b) for b in data["bullets"]],
+            raw_response=data["raw_response"],
+            extra={k: v for k, v in data.items() if k not in known},
+        )
+
+
+@dataclass(slots=True)
+class Analysis:
+    """A readiness verdict.
+
+    ``fingerprint`` is context.fingerprint() of the first ``idea_count``
+    accepted ideas the verdict covers; it is None for verdicts that don't
+    correspond to an idea set (or predate fingerprinting).
+    """
+
+    ready: bool
+    gaps: list[str]
+    summary: str = ""
+    last_run: str | None = None
+    fingerprint: str | None = None
+    idea_count: int = 0
+    extra: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        data = {
+            "last_run": self.last_run,
+            "ready": self.ready,
+            "gaps": list(self.gaps),
+            "summary": self.summary,
+        }
+        if self.fingerprint is not None:
+            data["fingerprint"] = self.fingerprint
+            data["idea_count"] = self.idea_count
+        return {**data, **self.extra}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Analysis":
+        known = ("last_run", "ready", "gaps", "summary", "fingerprint", "idea_count")
+        return cls(
+            ready=data["ready"],
+            gaps=list(data.get("gaps", [])),
+            summary=data.get("summary", ""),
+            last_run=data.get("last_run"),
+            fingerprint=data.get("fingerprint"),
+            idea_count=data.get("idea_count", 0),
+            extra={k: v for k, v in data.items() if k not in known},
+        )
+
+
+class IdeaSet:
+    """Insertion-ordered set of accepted idea texts with O(1) membership."""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items=()):
+        self._items = dict.fromkeys(items)
+
+    def add(self, text: str) -> bool:
+        """Add ``text``; returns False if it was already present."""
+        if text in self._items:
+            return False
+        self._items[text] = None
+        return True
+
+    def __contains__(self, text) -> bool:
+        return text in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IdeaSet):
+            return list(self._items) == list(other._items)
+        if isinstance(other, (list, tuple)):
+            return list(self._items) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"IdeaSet({list(self._items)!r})"
+
+
+class Project:
+    """Project state: rounds indexed by id, accepted ideas as an ordered set.
+
+    ``pending`` collects journal events from add_round/select_bullets,
+    from assigning ``analysis`` or ``plan`` and from set_extra; save_project hands them to the
+    store instead of rewriting the whole project. ``journal_length`` is the
+    number of events in the file journal, or None for a project that has
+    never been saved. ``version`` is the stored version it was loaded at
+    (see storage), None until it has been loaded or saved. ``ideas`` is the
+    near-duplicate index once project.load_idea_index attached one.
+    """
+
+    __slots__ = (
+        "name", "created_at", "rounds", "accepted_ideas", "extra",
+        "pending", "journal_length", "version", "ideas", "_analysis", "_plan", "_round_positions",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        created_at: str,
+        rounds: list[Round] | None = None,
+        accepted_ideas=(),
+        analysis: Analysis | None = None,
+        plan: str | None = None,
+        extra: dict | None = None,
+        round_ids: list[int] | None = None,
+    ):
+        self.name = name
+        self.created_at = created_at
+        self.rounds = rounds if rounds is not None else []
+        self.accepted_ideas = IdeaSet(accepted_ideas)
+        self.extra = extra or {}
+        self.pending = []
+        self.journal_length = None
+        self.version = None
+        self.ideas = None
+        self._analysis = analysis
+        self._plan = plan
+        if round_ids is None:
+            round_ids = [r.id for r in self.rounds]
+        self._round_positions = {rid: i for i, rid in enumerate(round_ids)}
+
+    @property
+    def analysis(self) -> Analysis | None:
+        return self._analysis
+
+    @analysis.setter
+    def analysis(self, value: Analysis | None) -> None:
+        self._analysis = value
+        self.pending.append({"op": "set_analysis", "value": value.to_dict() if value else None})
+
+    @property
+    def plan(self) -> str | None:
+        return self._plan
+
+    @plan.setter
+    def plan(self, value: str | None) -> None:
+        self._plan = value
+        self.pending.append({"op": "set_plan", "value": value})
+
+    def set_extra(self, key: str, value) -> None:
+        """Set a top-level key outside the core schema, recording a journal event."""
+        self.extra[key] = value
+        self.pending.append({"op": "set_extra", "key": key, "value": value})
+
+    def restore(self, analysis: Analysis | None = None, plan: str | None = None) -> None:
+        """Set analysis and plan without recording journal events (used on replay)."""
+        self._analysis = analysis
+        self._plan = plan
+
+    def round_ids(self) -> list[int]:
+        return list(self._round_positions)
+
+    def next_round_id(self) -> int:
+        return len(self.rounds) + 1
+
+    def append_round(self, round_data: Round) -> None:
+        self._round_positions[round_data.id] = len(self.rounds)
+        self.rounds.append(round_data)
+
+    def round_position(self, round_id: int) -> int | None:
+        return self._round_positions.get(round_id)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "created_at": self.created_at,
+            "rounds": [r.to_dict() for r in self.rounds],
+            "accepted_ideas": list(self.accepted_ideas),
+            "analysis": self._analysis.to_dict() if self._analysis else None,
+            "plan": self._plan,
+            **self.extra,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Project":
+        """Build a project from the project.json schema.
+
+        ``rounds`` may be a storage.LazyRounds of raw dicts; it is then
+        converted round by round on access instead of all at once.
+        """
+        known = ("name", "created_at", "rounds", "accepted_ideas", "analysis", "plan")
+        rounds = data.get("rounds", [])
+        round_ids = None
+        if hasattr(rounds, "map"):
+            rounds.map(Round.from_dict)
+            round_ids = rounds.ids
+        else:
+            rounds = [Round.from_dict(r) for r in rounds]
+        analysis = data.get("analysis")
+        return cls(
+            name=data["name"],
+            created_at=data["created_at"],
+            rounds=rounds,
+            accepted_ideas=data.get("accepted_ideas", []),
+            analysis=Analysis.from_dict(analysis) if analysis else None,
+            plan=data.get("plan"),
+            extra={k: v for k, v in data.items() if k not in known},
+            round_ids=round_ids,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Project):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
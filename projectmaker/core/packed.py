@@ -0,0 +1,135 @@
+"""Compact binary encoding of a project snapshot (project.pmk).
+
+The file is the MAGIC bytes followed by length-prefixed records:
+
+- ``H``: the top-level fields other than rounds, as compact JSON, plus
+  their key order.
+- ``B``: a block of up to BLOCK_ROUNDS consecutive rounds. A small table
+  of round ids and raw_response lengths is followed by one zlib blob
+  holding the rounds' JSON metadata (prompt, timestamp, bullets, ...)
+  and then their raw responses. Compressing them together means bullet
+  text repeated from a response costs almost nothing, and whole blocks
+  keep zlib's per-call setup off the hot path.
+- ``E``: end of file. A file without it was cut short and is rejected.
+
+Records are read one at a time (iter_records), so a lazy load only walks
+the record headers and round tables, and decompresses the blocks holding
+the rounds a command touches.
+"""
+
+import json
+import struct
+import zlib
+
+MAGIC = b"PMK\x01"
+HEADER = b"H"
+BLOCK = b"B"
+END = b"E"
+BLOCK_ROUNDS = 32
+# Fastest zlib level: still ~5x smaller than project.json, and saves stay faster than writing JSON.
+LEVEL = 1
+
+_RECORD = struct.Struct("<cI")
+_BLOCK = struct.Struct("<II")
+_ENTRY = struct.Struct("<II")
+
+
+def is_packed(prefix: bytes) -> bool:
+    """Whether data starting with ``prefix`` is in this format."""
+    return prefix.startswith(MAGIC)
+
+
+def _record(tag: bytes, payload: bytes) -> bytes:
+    return _RECORD.pack(tag, len(payload)) + payload
+
+
+def _block(rounds: list[dict]) -> bytes:
+    metas = json.dumps(
+        [{key: value for key, value in r.items() if key != "raw_response"} for r in rounds],
+        separators=(",", ":"),
+    ).encode("utf-8")
+    raws = [r.get("raw_response", "").encode("utf-8") for r in rounds]
+    table = b"".join(_ENTRY.pack(r["id"], len(raw)) for r, raw in zip(rounds, raws))
+    blob = zlib.compress(b"".join([metas, *raws]), LEVEL)
+    return _BLOCK.pack(len(rounds), len(metas)) + table + blob
+
+
+def encode(data: dict) -> bytes:
+    """Encode a project dict (the project.json schema)."""
+    fields = {key: value for key, value in data.items() if key != "rounds"}
+    header = {"order": list(data), "fields": fields}
+    parts = [MAGIC, _record(HEADER, json.dumps(header, separators=(",", ":")).encode("utf-8"))]
+    rounds = data.get("rounds", [])
+    for start in range(0, len(rounds), BLOCK_ROUNDS):
+        parts.append(_record(BLOCK, _block(rounds[start:start + BLOCK_ROUNDS])))
+    parts.append(_record(END, b""))
+    return b"".join(parts)
+
+
+def iter_records(buf):
+    """Yield (tag, start, end) for each record of an encoded project in ``buf``
+    (bytes or an mmap), ending with the END record. Only headers are read."""
+    if not is_packed(bytes(buf[:len(MAGIC)])):
+        raise ValueError("not a packed project file")
+    pos = len(MAGIC)
+    while True:
+        if pos + _RECORD.size > len(buf):
+            raise ValueError("packed project is truncated")
+        tag, length = _RECORD.unpack_from(buf, pos)
+        start = pos + _RECORD.size
+        end = start + length
+        if end > len(buf):
+            raise ValueError("packed project is truncated")
+        yield tag, start, end
+        if tag == END:
+            return
+        pos = end
+
+
+def block_ids(buf, start: int) -> list[int]:
+    """Round ids in the block record whose payload starts at ``start``, without decompressing it."""
+    count, _ = _BLOCK.unpack_from(buf, start)
+    offset = start + _BLOCK.size
+    return [_ENTRY.unpack_from(buf, offset + i * _ENTRY.size)[0] for i in range(count)]
+
+
+def decode_block(buf, start: int, end: int) -> list[dict]:
+    """Decode the rounds of the block record whose payload spans ``buf[start:end]``."""
+    count, metas_length = _BLOCK.unpack_from(buf, start)
+    table = start + _BLOCK.size
+    lengths = [_ENTRY.unpack_from(buf, table + i * _ENTRY.size)[1] for i in range(count)]
+    try:
+        raw = zlib.decompress(buf[table + count * _ENTRY.size:end])
+    except zlib.error as e:
+        raise ValueError(f"corrupted round block: {e}")
+    rounds = json.loads(raw[:metas_length])
+    pos = metas_length
+    for round_data, length in zip(rounds, lengths):
+        round_data["raw_response"] = raw[pos:pos + length].decode("utf-8")
+        pos += length
+    return rounds
+
+
+def decode_header(buf, start: int, end: int) -> tuple[dict, list[str]]:
+    """The top-level fields and key order stored in a header record."""
+    header = json.loads(bytes(buf[start:end]))
+    return header["fields"], header["order"]
+
+
+def order_fields(fields: dict, rounds, order: list[str]) -> dict:
+    """Reassemble a project dict in its original key order."""
+    data = dict(fields, rounds=rounds)
+    return {key: data[key] for key in order if key in data}
+
+
+def decode(buf) -> dict:
+    """Decode a whole encoded project."""
+    fields, order, rounds = None, [], []
+    for tag, start, end in iter_records(buf):
+        if tag == HEADER:
+            fields, order = decode_header(buf, start, end)
+        elif tag == BLOCK:
+            rounds.extend(decode_block(buf, start, end))
+    if fields is None:
+        raise ValueError("packed project has no header")
+    return order_fields(fields, rounds, order)
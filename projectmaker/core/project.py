@@ -1,109 +1,355 @@
-"""Project state management - load/save project.json."""
+"""Project state management - in-memory project model and load/save via storage."""
 
-import json
 import re
+import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
 
-PROJECT_FILE = "project.json"
+from . import storage, structured
+from .model import Analysis, Bullet, Project, Round
+from .similarity import IdeaIndex
+
+PROJECT_FILE = storage.PROJECT_FILE
+SAVE_ATTEMPTS = 20
+# Round.extra key listing [bullet id, round id, earlier text] for bullets that repeat an earlier idea.
+DUPLICATES_KEY = "near_duplicates"
+
+# Loaded projects by store location, kept between commands when enabled (by the daemon).
+_loaded = None
 
 
 def get_project_path() -> Path:
     return Path.cwd() / PROJECT_FILE
 
 
-def create_project(name: str) -> dict:
+def create_project(name: str) -> Project:
     """Create a new project state."""
-    return {
-        "name": name,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "rounds": [],
-        "accepted_ideas": [],
-        "analysis": None,
-        "plan": None,
-    }
-
-
-def load_project() -> dict:
-    """Load project from project.json in current directory."""
-    path = get_project_path()
-    if not path.exists():
-        raise FileNotFoundError(
-            "No project found. Run 'projectmaker init <name>' first."
-        )
+    return Project(name=name, created_at=datetime.now(timezone.utc).isoformat())
+
+
+def load_project(lazy: bool = False, store: storage.Store | None = None) -> Project:
+    """Load the current project: stored snapshot plus any journal tail.
+
+    With ``lazy`` the rounds are decoded one at a time on first access, so
+    commands that only need accepted ideas or a single round stay cheap on
+    long histories.
+
+    With cache_projects() on, a project loaded earlier is returned again as
+    long as the store's version still matches it and it has no unsaved
+    changes. ``store`` defaults to the current project's (storage.get_store()).
+    """
+    store = store or storage.get_store()
+    if _loaded is not None:
+        cached = _loaded.get(store.location)
+        if cached is not None and not cached.pending and cached.version == store.version():
+            return cached
+    project = _load(store, lazy)
+    if _loaded is not None:
+        _loaded[store.location] = project
+    return project
+
+
+def cache_projects(enabled: bool = True) -> None:
+    """Keep loaded projects in memory between load_project calls, or stop and drop them."""
+    global _loaded
+    _loaded = {} if enabled else None
+
+
+def _load(store, lazy: bool) -> Project:
+    snapshot, events, version = store.load(lazy=lazy)
+    project = Project.from_dict(snapshot)
+    for event in events:
+        apply_event(project, event)
+    project.journal_length = len(events)
+    project.version = version
+    return project
+
+
+def save_project(project: Project, store: storage.Store | None = None) -> None:
+    """Save project state.
+
+    A loaded project only persists its pending events (appended to the
+    journal, or applied as row updates by the SQLite store); anything else
+    is written out in full. If another process saved in the meantime, the
+    pending events are rebased onto the latest stored state (see
+    rebase_project) and the save is retried, so concurrent writers don't
+    lose each other's rounds or selections. ``store`` defaults to
+    storage.get_store(), as for load_project.
+    """
+    store = store or storage.get_store()
+    for _ in range(SAVE_ATTEMPTS):
+        try:
+            store.save(project, project.pending)
+        except storage.StaleProjectError:
+            rebase_project(project, _load(store, lazy=True))
+            continue
+        project.pending = []
+        if project.ideas is not None:
+            _commit_idea_index(project.ideas)
+        return
+    raise storage.ConflictError(
+        f"Project kept changing while saving; gave up after {SAVE_ATTEMPTS} attempts."
+    )
+
+
+def load_idea_index(project: Project, store: storage.Store | None = None) -> IdeaIndex:
+    """Attach the project's near-duplicate index (see similarity) and return it.
+
+    The index stored next to the project (store.ideas_path()) is brought up
+    to date by indexing only the rounds added since; it is rebuilt if it
+    names rounds the project doesn't have, and kept in memory if the file
+    can't be used. From then on add_round updates it and flags repeated
+    ideas, and save_project commits it.
+    """
+    if project.ideas is not None:
+        return project.ideas
+    store = store or storage.get_store()
+    path = store.ideas_path()
+    try:
+        index = IdeaIndex(path)
+    except sqlite3.Error:
+        index = IdeaIndex()
+    if not index.round_ids() <= set(project.round_ids()):
+        index.clear()
+    index.sync(project)
+    if not project.pending:
+        _commit_idea_index(index)
+    project.ideas = index
+    return index
+
+
+def _commit_idea_index(index: IdeaIndex) -> None:
     try:
-        return json.loads(path.read_text())
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Corrupted project.json: {e}")
-
-
-def save_project(project: dict) -> None:
-    """Save project state to project.json."""
-    path = get_project_path()
-    tmp_path = path.with_suffix(".json.tmp")
-    tmp_path.write_text(json.dumps(project, indent=2) + "\n")
-    tmp_path.replace(path)
-
-
-def add_round(project: dict, prompt: str, ai_response: str) -> dict:
-    """Parse AI response into bullets and add as a new round."""
-    bullets = parse_bullets(ai_response)
-    round_id = len(project["rounds"]) + 1
-    new_round = {
-        "id": round_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "prompt": prompt,
-        "bullets": [
-            {"id": i + 1, "text": text, "selected": False}
-            for i, text in enumerate(bullets)
-        ],
-        "raw_response": ai_response,
-    }
-    project["rounds"].append(new_round)
+        index.commit()
+    except sqlite3.Error:
+        pass  # Only an optimization: the next load_idea_index re-indexes what's missing.
+
+
+def project_exists() -> bool:
+    """Whether a project is already stored for the current directory/key."""
+    return storage.get_store().exists()
+
+
+def compact_project(project: Project, packed: bool | None = None) -> None:
+    """Fold the journal into a fresh snapshot of the full project.
+
+    Pending events are saved first, so nothing is lost if another process
+    saved in the meantime. ``packed`` converts the snapshot to (True) or
+    from (False) the packed format; None keeps the current one.
+    """
+    store = storage.get_store(packed)
+    save_project(project)
+    for _ in range(SAVE_ATTEMPTS):
+        try:
+            store.compact(project)
+            return
+        except storage.StaleProjectError:
+            rebase_project(project, _load(store, lazy=False))
+    raise storage.ConflictError(
+        f"Project kept changing while compacting; gave up after {SAVE_ATTEMPTS} attempts."
+    )
+
+
+def rebase_project(project: Project, latest: Project) -> None:
+    """Re-apply ``project``'s pending events on top of ``latest`` and adopt the result.
+
+    Rounds added here are renumbered after the latest round (selections in
+    them follow), and selections are re-applied to the current bullets.
+    Analysis, plan and extra updates replace the stored value: they are
+    derived from the ideas and carry the fingerprint they were computed
+    for, so a value that another writer made stale is recomputed later.
+    The near-duplicate index is dropped too, as round ids may have moved.
+    Raises storage.ConflictError if a selection no longer applies.
+    """
+    renumbered = {}
+    pending = []
+    for event in project.pending:
+        if event["op"] == "add_round":
+            round_data = dict(event["round"], id=latest.next_round_id())
+            renumbered[event["round"]["id"]] = round_data["id"]
+            event = {"op": "add_round", "round": round_data}
+        elif event["op"] == "select":
+            event = dict(event, round_id=renumbered.get(event["round_id"], event["round_id"]))
+            try:
+                round_data = get_round(latest, event["round_id"])
+            except ValueError as e:
+                raise storage.ConflictError(f"Can't re-apply selection: {e}")
+            if any(round_data.get_bullet(b) is None for b in event["bullet_ids"]):
+                raise storage.ConflictError(
+                    f"Can't re-apply selection: bullets changed in round {event['round_id']}"
+                )
+        apply_event(latest, event)
+        pending.append(event)
+
+    if project.ideas is not None:
+        project.ideas.close()
+    for name in Project.__slots__:
+        setattr(project, name, getattr(latest, name))
+    project.pending = pending
+
+
+def export_project(project: Project, packed: bool = False) -> str | bytes:
+    """Serialize the full project in the readable project.json format, or
+    as packed bytes (the project.pmk format)."""
+    if packed:
+        return storage.export_packed(project.to_dict())
+    return storage.export_json(project.to_dict())
+
+
+def apply_event(project: Project, event: dict) -> None:
+    """Replay one journal event. Events are idempotent, so a journal that
+    overlaps its snapshot (crash during compaction) replays safely."""
+    op = event["op"]
+    if op == "add_round":
+        round_data = Round.from_dict(event["round"])
+        if project.round_position(round_data.id) is None:
+            project.append_round(round_data)
+    elif op == "select":
+        _mark_selected(project, get_round(project, event["round_id"]), event["bullet_ids"])
+    elif op == "set_analysis":
+        analysis = Analysis.from_dict(event["value"]) if event["value"] else None
+        project.restore(analysis=analysis, plan=project.plan)
+    elif op == "set_plan":
+        project.restore(analysis=project.analysis, plan=event["value"])
+    elif op == "set_extra":
+        project.extra[event["key"]] = event["value"]
+    else:
+        raise ValueError(f"Unknown project event {op!r}")
+
+
+def add_round(project: Project, prompt: str, ai_response: str, bullets: list[str] | None = None) -> Project:
+    """Parse AI response into bullets and add as a new round.
+
+    Pass ``bullets`` when they were already parsed (e.g. by a BulletParser
+    while streaming) to skip re-parsing the response. With a near-duplicate
+    index loaded (load_idea_index), bullets repeating an earlier idea, or
+    one earlier in the same round, are listed under DUPLICATES_KEY in the
+    round's extra (see near_duplicates) and the index is updated.
+    """
+    if bullets is None:
+        bullets = parse_bullets(ai_response)
+    new_round = Round(
+        id=project.next_round_id(),
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        prompt=prompt,
+        bullets=[Bullet(i + 1, text) for i, text in enumerate(bullets)],
+        raw_response=ai_response,
+    )
+    if project.ideas is not None:
+        duplicates = []
+        for bullet in new_round.bullets:
+            match = project.ideas.match(bullet.text)
+            if match is not None:
+                duplicates.append([bullet.id, match[1], match[0]])
+            project.ideas.add(bullet.text, new_round.id)
+        if duplicates:
+            new_round.extra[DUPLICATES_KEY] = duplicates
+        project.ideas.add_round(new_round)
+    project.append_round(new_round)
+    project.pending.append({"op": "add_round", "round": new_round.to_dict()})
     return project
 
 
-def parse_bullets(response: str) -> list[str]:
-    """Extract bullet items from AI markdown response."""
-    bullets = []
-    for line in response.splitlines():
-        line = line.strip()
-        match = re.match(r"^[-*]\s*\[[ x]\]\s*(.+)$", line)
-        if match:
-            bullets.append(match.group(1).strip())
-    if not bullets:
-        for line in response.splitlines():
+CHECKBOX_BULLET_RE = re.compile(r"^[-*]\s*\[[ x]\]\s*(.+)$")
+PLAIN_BULLET_RE = re.compile(r"^[-*]\s+(.+)$")
+
+
+class BulletParser:
+    """Incremental, chunk-aware bullet parser for streamed responses.
+
+    Feed text chunks as they arrive; each call returns the bullets completed
+    by that chunk. Checkbox bullets win over plain bullets, exactly as in
+    parse_bullets: plain bullets are only reported until the first checkbox
+    bullet shows up, and ``bullets`` gives the final list once closed.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._checkbox = []
+        self._plain = []
+
+    @property
+    def bullets(self) -> list[str]:
+        return list(self._checkbox or self._plain)
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume a chunk and return bullets from newly completed lines."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.splitlines(keepends=True) or [""]
+        if self._buffer.endswith(("\n", "\r")):
+            lines.append(self._buffer)
+            self._buffer = ""
+        return self._parse_lines(lines)
+
+    def close(self) -> list[str]:
+        """Flush the trailing partial line and return any final bullet."""
+        lines, self._buffer = [self._buffer], ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines: list[str]) -> list[str]:
+        new = []
+        for line in lines:
             line = line.strip()
-            match = re.match(r"^[-*]\s+(.+)$", line)
+            match = CHECKBOX_BULLET_RE.match(line)
+            if match:
+                self._checkbox.append(match.group(1).strip())
+                new.append(self._checkbox[-1])
+                continue
+            match = PLAIN_BULLET_RE.match(line)
             if match:
-                bullets.append(match.group(1).strip())
-    return bullets
+                self._plain.append(match.group(1).strip())
+                if not self._checkbox:
+                    new.append(self._plain[-1])
+        return new
+
 
+def parse_bullets(response: str) -> list[str]:
+    """Extract bullet items from an AI response.
+
+    Structured (tool-use) responses are decoded directly; anything else is
+    parsed as markdown bullets.
+    """
+    ideas = structured.decode_ideas(response)
+    if ideas is not None:
+        return ideas
+    parser = BulletParser()
+    parser.feed(response)
+    parser.close()
+    return parser.bullets
 
-def select_bullets(project: dict, round_id: int, bullet_ids: list[int]) -> dict:
+
+def select_bullets(project: Project, round_id: int, bullet_ids: list[int]) -> Project:
     """Mark bullets as selected and update accepted_ideas."""
     round_data = get_round(project, round_id)
-    valid_ids = {b["id"] for b in round_data["bullets"]}
-    invalid = set(bullet_ids) - valid_ids
+    invalid = {b for b in bullet_ids if round_data.get_bullet(b) is None}
     if invalid:
         raise ValueError(
             f"Bullets {sorted(invalid)} don't exist in round {round_id}. "
-            f"Valid: 1-{len(round_data['bullets'])}"
+            f"Valid: 1-{len(round_data.bullets)}"
         )
-    for bullet in round_data["bullets"]:
-        if bullet["id"] in bullet_ids:
-            bullet["selected"] = True
-            if bullet["text"] not in project["accepted_ideas"]:
-                project["accepted_ideas"].append(bullet["text"])
+    _mark_selected(project, round_data, bullet_ids)
+    project.pending.append({"op": "select", "round_id": round_id, "bullet_ids": list(bullet_ids)})
     return project
 
 
-def get_round(project: dict, round_id: int) -> dict:
+def near_duplicates(round_data: Round) -> dict[int, tuple[int, str]]:
+    """Bullet id -> (round id, text) of the earlier idea it repeats, as flagged by add_round."""
+    return {bullet_id: (round_id, text) for bullet_id, round_id, text in round_data.extra.get(DUPLICATES_KEY, [])}
+
+
+def _mark_selected(project: Project, round_data: Round, bullet_ids: list[int]) -> None:
+    for bullet_id in sorted(set(bullet_ids)):
+        bullet = round_data.get_bullet(bullet_id)
+        bullet.selected = True
+        project.accepted_ideas.add(bullet.text)
+
+
+def get_round(project: Project, round_id: int) -> Round:
     """Get a specific round by ID."""
-    for r in project["rounds"]:
-        if r["id"] == round_id:
-            return r
-    available = [r["id"] for r in project["rounds"]]
+    position = project.round_position(round_id)
+    if position is not None:
+        return project.rounds[position]
+    available = project.round_ids()
     raise ValueError(
         f"Round {round_id} not found. Available rounds: {available}"
     )
@@ -0,0 +1,144 @@
+"""Client-side rate limiting shared by every projectmaker process on the host.
+
+Two token buckets per model, one for requests and one for input tokens,
+refill continuously at their per-minute limit. Before sending, a caller
+reserves one request and its estimated prompt tokens. Buckets may go
+negative: the caller then waits until the deficit has refilled, so
+callers are served in the order they reserved instead of all retrying
+after 429s. Once the response arrives, settle() corrects the token
+bucket by the difference between the estimate and the reported usage.
+
+The bucket levels live in one small JSON file, read and rewritten under
+an exclusive flock so concurrent processes share them.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, limits are only shared within a process.
+    fcntl = None
+
+RPM_ENV = "PROJECTMAKER_RPM"
+TPM_ENV = "PROJECTMAKER_TPM"
+STATE_ENV = "PROJECTMAKER_RATE_STATE"
+
+
+def default_state_path() -> Path:
+    """Bucket state file (PROJECTMAKER_RATE_STATE or ~/.cache/projectmaker/ratelimit.json)."""
+    env = os.environ.get(STATE_ENV)
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "projectmaker" / "ratelimit.json"
+
+
+class RateLimiter:
+    """Request and input-token buckets, shared through the file at ``path``.
+
+    ``requests_per_minute`` or ``tokens_per_minute`` may be None to leave
+    that dimension unlimited. A reservation larger than a bucket's
+    capacity is clamped to it, so one huge prompt waits for a full bucket
+    rather than forever.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        path: Path | None = None,
+        clock=time.time,
+    ):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.path = Path(path) if path is not None else default_state_path()
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter | None":
+        """Limiter configured by PROJECTMAKER_RPM / PROJECTMAKER_TPM; None when neither is set."""
+        rpm = os.environ.get(RPM_ENV)
+        tpm = os.environ.get(TPM_ENV)
+        if not rpm and not tpm:
+            return None
+        return cls(int(rpm) if rpm else None, int(tpm) if tpm else None)
+
+    @contextmanager
+    def _state(self):
+        """Hold the state file lock; yields the bucket state, written back on exit."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self.path.open("a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state, separators=(",", ":")))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: dict, model: str, now: float) -> dict:
+        """Bring ``model``'s buckets up to ``now``; returns them. New buckets start full."""
+        buckets = state.setdefault(model, {})
+        for name, limit in self.limits.items():
+            if limit is None:
+                buckets.pop(name, None)
+                continue
+            level, updated = buckets.get(name, (limit, now))
+            buckets[name] = (min(limit, level + (now - updated) * limit / 60), now)
+        return buckets
+
+    def reserve(self, model: str, tokens: int, queue: bool = True) -> float | None:
+        """Reserve one request and ``tokens`` input tokens; returns how long to wait before sending.
+
+        With ``queue=False`` nothing is reserved if the caller would have to
+        wait, and None is returned instead.
+        """
+        cost = {"requests": 1, "tokens": tokens}
+        with self._state() as state:
+            now = self.clock()
+            buckets = self._refill(state, model, now)
+            delay = 0.0
+            for name, (level, _) in buckets.items():
+                limit = self.limits[name]
+                deficit = min(cost[name], limit) - level
+                if deficit > 0:
+                    delay = max(delay, deficit * 60 / limit)
+            if delay and not queue:
+                return None
+            for name, (level, _) in buckets.items():
+                buckets[name] = (level - min(cost[name], self.limits[name]), now)
+        return delay
+
+    def acquire(self, model: str, tokens: int) -> float:
+        """Reserve and wait until the request may be sent; returns the time waited."""
+        delay = self.reserve(model, tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def settle(self, model: str, estimated: int, actual: int) -> None:
+        """Charge (or refund) the token bucket for the difference between estimate and usage."""
+        if self.limits["tokens"] is None or actual == estimated:
+            return
+        with self._state() as state:
+            buckets = self._refill(state, model, self.clock())
+            level, updated = buckets["tokens"]
+            buckets["tokens"] = (min(self.limits["tokens"], level + estimated - actual), updated)
+
+    def levels(self, model: str) -> dict:
+        """Current bucket levels for ``model`` (negative while callers are queued)."""
+        with self._state() as state:
+            return {name: level for name, (level, _) in self._refill(state, model, self.clock()).items()}
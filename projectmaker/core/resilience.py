@@ -0,0 +1,125 @@
+"""Retry classification, backoff and circuit breaking for API calls."""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import anthropic
+
+MAX_DELAY = 30.0
+MAX_RETRY_AFTER = 60.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# 408 timeout, 409 conflict, 429 rate limited; every 5xx (incl. 529 overloaded) is retried too.
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+def retryable(error: Exception) -> bool:
+    """Whether repeating the request may succeed: connection problems, timeouts,
+    rate limits and server errors, but not other 4xx responses."""
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.InternalServerError)):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        status = error.status_code
+        return isinstance(status, int) and (status in RETRYABLE_STATUS or status >= 500)
+    return False
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds the server asked us to wait (retry-after-ms or Retry-After), if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, error: Exception | None = None) -> float:
+    """Delay before retrying after failed ``attempt`` (1-based).
+
+    Full jitter: uniform between 0 and base * 2**(attempt - 1), capped at
+    MAX_DELAY. A server Retry-After hint (up to MAX_RETRY_AFTER) is a lower
+    bound, plus a little jitter so waiting clients don't return together.
+    """
+    delay = random.uniform(0, min(MAX_DELAY, base * 2 ** (attempt - 1)))
+    hint = retry_after(error) if error is not None else None
+    if hint is not None:
+        delay = min(hint, MAX_RETRY_AFTER) + random.uniform(0, base)
+    return delay
+
+
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive retryable failures.
+
+    While open, check() raises CircuitOpenError until ``cooldown`` seconds
+    have passed; then one trial call is let through (half-open). Its success
+    closes the circuit, its failure opens it for another cooldown. A trial
+    that ends any other way (cancelled, or a local error) must be release()d
+    so the next check() can let another one through.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def check(self) -> bool:
+        """Raise CircuitOpenError unless a call may go ahead; True if it is the half-open trial."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            wait = max(0.0, self.cooldown - (self.clock() - self.opened_at))
+            raise CircuitOpenError(
+                f"AI API unavailable after {self.failures} consecutive failures; "
+                f"not retrying for another {wait:.0f}s."
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """End a trial call that neither succeeded nor failed, leaving the circuit as it was."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
@@ -0,0 +1,292 @@
+"""Near-duplicate detection for idea texts (MinHash with LSH banding).
+
+Each text is reduced to a set of shingles: the character 4-grams of its
+words, after lowercasing and dropping filler words such as "add",
+"based" or "with", so "Add OAuth login" and "Implement OAuth-based
+login" share every shingle. A MinHash signature of NUM_PERM values
+estimates the Jaccard similarity of two shingle sets. It is computed
+with one permutation: each shingle is hashed once into one of NUM_PERM
+bins, each bin keeps its smallest hash, and each empty bin borrows from
+the first non-empty bin in its own fixed random order, so a signature
+costs one hash per shingle rather than NUM_PERM. Signatures are split
+into BANDS bands, each hashed to a key, so a lookup only compares
+against texts sharing a key (likely matches) instead of every text seen
+so far. The MAX_CANDIDATES sharing the most keys are then
+scored exactly, as the estimate is noisy for texts this short: by the
+lower of the Jaccard similarities of the shingle sets and of the word
+sets (plurals folded). Shingles alone forgive a swapped word that is
+short next to the rest ("Add email notifications" vs "Add push
+notifications", "Phase 1" vs "Phase 2"); counting whole words does not.
+
+Everything is local and deterministic (crc32 plus a fixed permutation),
+so band keys can be persisted and compared across processes.
+"""
+
+import random
+import re
+import sqlite3
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from .storage import BUSY_TIMEOUT
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 4
+THRESHOLD = 0.7
+# Bounds a lookup when many ideas share vocabulary; a true near-duplicate shares the most bands.
+MAX_CANDIDATES = 64
+COVERED_LIMIT = 20
+COVERED_POOL = 200
+COVERED_WORDS = 8
+# Bump when shingles or signatures change: stored band keys are then rebuilt.
+SCHEME = 2
+
+STOPWORDS = frozenset(
+    "a an and add as at based be build by create for from implement in into is it make of on or "
+    "set support that the to up use using via with".split()
+)
+
+_PRIME = (1 << 61) - 1
+# Fixed (a, b) of the universal hash a * x + b mod _PRIME that spreads crc32 values over the bins.
+_A, _B = 0x1F3D5B79A2C4E687 % _PRIME, 0x0B1C2D3E4F506172 % _PRIME
+_EMPTY = 0xFFFFFFFF
+# Per-bin probe order for empty bins. Borrowing from a neighbour instead would fill bands
+# with repeated values, and texts sharing a single shingle would collide far more often.
+_rng = random.Random(0x5EED)
+_PROBES = [_rng.sample(range(NUM_PERM), NUM_PERM) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+_BAND = struct.Struct(f"<{_ROWS}I")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ideas (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE,
+    round_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    key INTEGER NOT NULL,
+    idea_id INTEGER NOT NULL,
+    PRIMARY KEY (key, idea_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rounds (id INTEGER PRIMARY KEY);
+"""
+
+
+def words(text: str) -> list[str]:
+    """Lowercase content words of ``text``, numbers included."""
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+
+
+def stems(text: str) -> set[str]:
+    """Content words of ``text`` with a plural "s" dropped, so "emails" and "email" count as one word."""
+    return {w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words(text)}
+
+
+def shingles(text: str) -> set[str]:
+    """Character SHINGLE-grams of each content word, padded so short words still count,
+    plus the words themselves so one differing short word ("csv" vs "pdf") weighs enough."""
+    result = set()
+    for word in words(text):
+        padded = f" {word} "
+        result.update(padded[i:i + SHINGLE] for i in range(max(1, len(padded) - SHINGLE + 1)))
+        result.add(padded)
+    return result
+
+
+def signature(text: str) -> tuple[int, ...]:
+    """MinHash signature of ``text`` (all-max for a text without content words)."""
+    bins = [_EMPTY] * NUM_PERM
+    for shingle in shingles(text):
+        h = (_A * zlib.crc32(shingle.encode("utf-8")) + _B) % _PRIME
+        index, value = h % NUM_PERM, (h // NUM_PERM) & _EMPTY
+        if value < bins[index]:
+            bins[index] = value
+    if all(value == _EMPTY for value in bins):
+        return tuple(bins)
+    return tuple(
+        value if value != _EMPTY else next(bins[j] for j in _PROBES[i] if bins[j] != _EMPTY)
+        for i, value in enumerate(bins)
+    )
+
+
+def band_keys(text: str) -> list[int]:
+    """One key per band of ``text``'s signature; texts sharing a key are match candidates."""
+    sig = signature(text)
+    return [band << 32 | zlib.crc32(_BAND.pack(*sig[band * _ROWS:(band + 1) * _ROWS])) for band in range(BANDS)]
+
+
+def similarity(first: str, second: str) -> float:
+    """The lower of the Jaccard similarities of two texts' shingle sets and word sets."""
+    return _score(_features(first), _features(second))
+
+
+def _features(text: str) -> tuple[set, set]:
+    return shingles(text), stems(text)
+
+
+def _score(first: tuple[set, set], second: tuple[set, set]) -> float:
+    return min(_jaccard(first[0], second[0]), _jaccard(first[1], second[1]))
+
+
+def _jaccard(first: set, second: set) -> float:
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+class IdeaIndex:
+    """Every idea text seen in a project, with its band keys, in a SQLite file.
+
+    ``path`` None keeps the index in memory. Texts and rounds added are
+    only held in memory (and already matched against) until commit()
+    writes them in one short transaction, so a round that is never saved
+    never reaches the file. The file also records which rounds are
+    indexed, so a stale index only needs the rounds added since (see sync).
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._conn = sqlite3.connect(
+            ":memory:" if path is None else path, timeout=BUSY_TIMEOUT, isolation_level=None
+        )
+        self._conn.executescript(SCHEMA)
+        self._pending = {}
+        self._pending_keys = {}
+        self._pending_rounds = set()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEME:
+            self.clear()
+            self._conn.execute(f"PRAGMA user_version = {SCHEME}")
+
+    def close(self) -> None:
+        """Close the file, dropping anything not committed."""
+        self._conn.close()
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are texts or rounds not committed yet."""
+        return bool(self._pending or self._pending_rounds)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM ideas").fetchone()[0] + len(self._pending)
+
+    def round_ids(self) -> set[int]:
+        """Ids of the rounds already indexed."""
+        return {rid for (rid,) in self._conn.execute("SELECT id FROM rounds")} | self._pending_rounds
+
+    def _round_of(self, text: str) -> int | None:
+        if text in self._pending:
+            return self._pending[text][0]
+        row = self._conn.execute("SELECT round_id FROM ideas WHERE text = ?", (text,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, text: str, round_id: int) -> None:
+        """Index ``text``, first seen in round ``round_id``. Known texts keep their first round."""
+        if self._round_of(text) is not None:
+            return
+        keys = band_keys(text)
+        self._pending[text] = (round_id, keys)
+        for key in keys:
+            self._pending_keys.setdefault(key, []).append(text)
+
+    def add_round(self, round_data) -> None:
+        for bullet in round_data.bullets:
+            self.add(bullet.text, round_data.id)
+        self._pending_rounds.add(round_data.id)
+
+    def match(self, text: str) -> tuple[str, int, float] | None:
+        """Most similar indexed text at or above THRESHOLD, as (text, round id,
+        similarity); None if there is none. An indexed copy of ``text`` wins."""
+        round_id = self._round_of(text)
+        if round_id is not None:
+            return text, round_id, 1.0
+        keys = band_keys(text)
+        hits = {}
+        for candidate, candidate_round, count in self._conn.execute(
+            "SELECT i.text, i.round_id, COUNT(*) AS hits FROM bands b JOIN ideas i ON i.id = b.idea_id "
+            f"WHERE b.key IN ({','.join('?' * len(keys))}) GROUP BY b.idea_id ORDER BY hits DESC LIMIT ?",
+            [*keys, MAX_CANDIDATES],
+        ):
+            hits[candidate] = (count, candidate_round)
+        for key in keys:
+            for candidate in self._pending_keys.get(key, ()):
+                count, _ = hits.get(candidate, (0, None))
+                hits[candidate] = (count + 1, self._pending[candidate][0])
+        candidates = sorted(hits.items(), key=lambda item: -item[1][0])[:MAX_CANDIDATES]
+        query = _features(text)
+        best = None
+        for candidate, (_, candidate_round) in candidates:
+            score = _score(query, _features(candidate))
+            if score >= THRESHOLD and (best is None or score > best[2]):
+                best = (candidate, candidate_round, score)
+        return best
+
+    def sync(self, project) -> int:
+        """Index the project's rounds that aren't indexed yet; returns how many were added."""
+        indexed = self.round_ids()
+        missing = [rid for rid in project.round_ids() if rid not in indexed]
+        for rid in missing:
+            self.add_round(project.rounds[project.round_position(rid)])
+        return len(missing)
+
+    def covered(self, accepted, query: str = "", limit: int = COVERED_LIMIT) -> list[str]:
+        """Compact list of recent ideas already proposed but not accepted
+        (accepted ones are in the prompt already): of the newest COVERED_POOL,
+        those sharing words with ``query`` first, then the newest, each cut
+        to COVERED_WORDS words."""
+        recent = [(text, round_id) for text, (round_id, _) in reversed(self._pending.items())]
+        recent += self._conn.execute(
+            "SELECT text, round_id FROM ideas ORDER BY id DESC LIMIT ?", (COVERED_POOL,)
+        ).fetchall()
+        query_words = set(words(query))
+        candidates = [
+            (len(query_words & set(words(text))), round_id, -n, text)
+            for n, (text, round_id) in enumerate(recent[:COVERED_POOL])
+            if text not in accepted
+        ]
+        candidates.sort(reverse=True)
+        result = []
+        for *_, text in candidates[:limit]:
+            parts = text.split()
+            result.append(" ".join(parts[:COVERED_WORDS]) + (" ..." if len(parts) > COVERED_WORDS else ""))
+        return result
+
+    def clear(self) -> None:
+        """Forget everything, stored or not."""
+        with self._transaction():
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM ideas")
+            self._conn.execute("DELETE FROM rounds")
+        self._pending, self._pending_keys, self._pending_rounds = {}, {}, set()
+
+    def commit(self) -> None:
+        """Write the texts and rounds added since the last commit."""
+        if not self.dirty:
+            return
+        with self._transaction():
+            bands = []
+            for text, (round_id, keys) in self._pending.items():
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO ideas (text, round_id) VALUES (?, ?)", (text, round_id)
+                )
+                if cursor.rowcount:
+                    bands.extend((key, cursor.lastrowid) for key in keys)
+            # In key order, so a large first sync appends to the B-tree instead of splitting it at random.
+            bands.sort()
+            self._conn.executemany("INSERT OR IGNORE INTO bands (key, idea_id) VALUES (?, ?)", bands)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO rounds (id) VALUES (?)", [(rid,) for rid in self._pending_rounds]
+            )
+        self._pending, self._pending_keys, self._pending_rounds = {}, {}, set()
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, rolled back on error (the connection is in autocommit mode)."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
@@ -0,0 +1,779 @@
+"""Storage backends for project state.
+
+A store persists one project. ``load`` returns a snapshot dict (the
+project.json schema) plus any journal events still to be replayed on top of
+it, and the stored version; ``save`` persists the pending events produced by
+add_round, select_bullets and analysis/plan updates (see model.Project), or
+the whole project via its to_dict() when it is new.
+
+Every save bumps the version by the number of events written (a full write
+by one). Saving a project loaded at an older version raises
+StaleProjectError instead of overwriting the other writer's changes;
+project.save_project then re-applies its pending events on top of the
+latest state and tries again.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import packed as packed_format
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, saves are only version-checked.
+    fcntl = None
+
+PROJECT_FILE = "project.json"
+PACKED_FILE = "project.pmk"
+SNAPSHOT_FILES = (PROJECT_FILE, PACKED_FILE)
+JOURNAL_FILE = "project.journal"
+INDEX_FILE = "project.index"
+LOCK_FILE = "project.lock"
+IDEAS_FILE = "project.ideas"
+COMPACT_EVERY = 100
+DB_ENV = "PROJECTMAKER_DB"
+PROJECT_ENV = "PROJECTMAKER_PROJECT"
+FORMAT_ENV = "PROJECTMAKER_FORMAT"
+
+
+class StaleProjectError(Exception):
+    """The stored project changed since it was loaded."""
+
+
+class ConflictError(RuntimeError):
+    """Pending changes could not be re-applied on top of a concurrent update."""
+
+
+def check_version(project, stored: int) -> None:
+    """Raise StaleProjectError if a loaded project no longer matches the stored version."""
+    if project.version is not None and project.version != stored:
+        raise StaleProjectError(f"project is at version {stored}, not {project.version}")
+
+
+def get_store(packed: bool | None = None):
+    """Store for the current project.
+
+    Uses SQLite when PROJECTMAKER_DB points at a database file (the project
+    is keyed by PROJECTMAKER_PROJECT, defaulting to the current directory),
+    and project.json (or project.pmk) in the current directory otherwise.
+    ``packed`` picks the file format for the next snapshot (see FileStore).
+    """
+    db_path = os.environ.get(DB_ENV)
+    if db_path:
+        return SQLiteStore(Path(db_path), os.environ.get(PROJECT_ENV) or str(Path.cwd()))
+    return FileStore(Path.cwd(), packed)
+
+
+def export_json(data: dict) -> str:
+    """Serialize a project dict in the readable project.json format."""
+    return json.dumps(data, indent=2) + "\n"
+
+
+def export_packed(data: dict) -> bytes:
+    """Serialize a project dict in the packed project.pmk format."""
+    return packed_format.encode(data)
+
+
+def export_json_indexed(data: dict) -> tuple[str, dict]:
+    """Serialize like export_json, also returning the byte span of every
+    top-level value and of each round so they can be decoded on their own."""
+    parts = ["{"]
+    pos = 1
+    fields = {}
+    rounds = []
+
+    def emit(text):
+        nonlocal pos
+        parts.append(text)
+        pos += len(text)
+
+    def nested(value, level):
+        return json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
+
+    items = list(data.items())
+    for n, (key, value) in enumerate(items):
+        emit(f"\n  {json.dumps(key)}: ")
+        if key == "rounds" and value:
+            emit("[")
+            for i, round_data in enumerate(value):
+                emit("\n    ")
+                start = pos
+                emit(nested(round_data, 2))
+                rounds.append([start, pos, round_data["id"]])
+                if i < len(value) - 1:
+                    emit(",")
+            emit("\n  ]")
+        elif key == "rounds":
+            emit("[]")
+        else:
+            start = pos
+            emit(nested(value, 1))
+            fields[key] = [start, pos]
+        if n < len(items) - 1:
+            emit(",")
+    emit("\n}\n")
+    return "".join(parts), {"fields": fields, "rounds": rounds}
+
+
+class LazyRounds(list):
+    """List of rounds whose entries are only decoded on first access.
+
+    Unloaded slots hold a sentinel and ``loader(i)`` fetches round ``i``;
+    ``ids`` lists the round ids up front so callers can index them without
+    loading anything. Indexing, iteration, ``in`` and comparisons load what
+    they touch; ``len`` and ``append`` never load anything.
+    """
+
+    _UNLOADED = object()
+
+    def __init__(self, ids: list[int], loader):
+        super().__init__([self._UNLOADED] * len(ids))
+        self.ids = list(ids)
+        self._loader = loader
+
+    def map(self, fn) -> None:
+        """Apply ``fn`` to every round as it is loaded (e.g. to build records)."""
+        loader = self._loader
+        self._loader = lambda i: fn(loader(i))
+        for i in range(len(self)):
+            item = list.__getitem__(self, i)
+            if item is not self._UNLOADED:
+                list.__setitem__(self, i, fn(item))
+
+    def _load(self, i: int):
+        item = list.__getitem__(self, i)
+        if item is self._UNLOADED:
+            item = self._loader(i)
+            list.__setitem__(self, i, item)
+        return item
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._load(j) for j in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("list index out of range")
+        return self._load(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._load(i)
+
+    def __reversed__(self):
+        for i in reversed(range(len(self))):
+            yield self._load(i)
+
+    def __contains__(self, item):
+        return any(r == item for r in self)
+
+    def __eq__(self, other):
+        return list(iter(self)) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(iter(self)))
+
+    def loaded_count(self) -> int:
+        return sum(1 for item in list.__iter__(self) if item is not self._UNLOADED)
+
+    def materialize(self) -> None:
+        for i in range(len(self)):
+            self._load(i)
+
+
+class Store:
+    """Interface implemented by every storage backend."""
+
+    location = ""
+
+    def exists(self) -> bool:
+        raise NotImplementedError
+
+    def version(self) -> int | None:
+        """The stored version, without loading the project (None if none is stored)."""
+        raise NotImplementedError
+
+    def load(self, lazy: bool = False) -> tuple[dict, list[dict], int]:
+        """Return (snapshot, events to replay, version). With ``lazy`` the
+        snapshot's rounds are a LazyRounds list fetched on demand."""
+        raise NotImplementedError
+
+    def save(self, project, events: list[dict]) -> None:
+        """Persist ``events`` (or the whole project if it was never saved) and
+        set project.version to the new version. Raises StaleProjectError if
+        the stored version is no longer project.version."""
+        raise NotImplementedError
+
+    def compact(self, project) -> None:
+        """Fold any incremental history into the stored snapshot (version-checked like save)."""
+
+    def ideas_path(self) -> Path | None:
+        """Where the project's near-duplicate index (see similarity) is kept; None if nowhere."""
+        return None
+
+
+class FileStore(Store):
+    """project.json snapshot plus an append-only project.journal tail.
+
+    Pending events are appended to the journal; every COMPACT_EVERY events
+    the full project is rewritten as a fresh snapshot and the journal removed.
+    Each snapshot gets a project.index of byte offsets so a lazy load can
+    memory-map it and decode only the parts a command touches.
+
+    The snapshot can instead be kept packed in project.pmk (see packed),
+    which is read lazily without an index. Loads detect the format from
+    the file itself. Snapshots keep the current format unless ``packed``
+    says otherwise; new projects use packed when PROJECTMAKER_FORMAT is
+    "packed".
+
+    project.lock holds the version. Saves take an exclusive flock on it and
+    loads a shared one, so readers never see a half-written update.
+    """
+
+    def __init__(self, directory: Path, packed: bool | None = None):
+        self.json_path = Path(directory) / PROJECT_FILE
+        self.packed_path = Path(directory) / PACKED_FILE
+        self.journal_path = Path(directory) / JOURNAL_FILE
+        self.index_path = Path(directory) / INDEX_FILE
+        self.lock_path = Path(directory) / LOCK_FILE
+        self.packed = packed
+
+    def ideas_path(self) -> Path:
+        return self.lock_path.with_name(IDEAS_FILE)
+
+    @property
+    def path(self) -> Path:
+        """The snapshot file: the stored one, or where a new project would be written."""
+        if self.packed_path.exists():
+            return self.packed_path
+        if self.json_path.exists():
+            return self.json_path
+        return self.packed_path if self._write_packed() else self.json_path
+
+    @property
+    def location(self) -> str:
+        return str(self.path)
+
+    def _write_packed(self) -> bool:
+        """Whether the next snapshot is written packed."""
+        if self.packed is not None:
+            return self.packed
+        if self.packed_path.exists() or self.json_path.exists():
+            return self.packed_path.exists()
+        return os.environ.get(FORMAT_ENV, "").lower() == "packed"
+
+    def exists(self) -> bool:
+        return self.packed_path.exists() or self.json_path.exists()
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the project lock; yields the lock file, which stores the version.
+
+        A shared lock only reads the file. If it is missing and can't be created
+        (a read-only project), None is yielded and readers go ahead unlocked.
+        """
+        f = self._open_lock(exclusive)
+        if f is None:
+            yield None
+            return
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield f
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open_lock(self, exclusive: bool):
+        if not exclusive:
+            try:
+                return self.lock_path.open("r")
+            except FileNotFoundError:
+                pass
+        try:
+            return self.lock_path.open("a+")
+        except OSError:
+            if exclusive:
+                raise
+            return None
+
+    @staticmethod
+    def _read_version(lock) -> int:
+        if lock is None:
+            return 0
+        lock.seek(0)
+        text = lock.read().strip()
+        return int(text) if text.isdigit() else 0
+
+    @staticmethod
+    def _write_version(lock, version: int) -> None:
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(version))
+        lock.flush()
+
+    def version(self) -> int | None:
+        if not self.exists():
+            return None
+        with self._locked(exclusive=False) as lock:
+            return self._read_version(lock)
+
+    def load(self, lazy: bool = False) -> tuple[dict, list[dict], int]:
+        if not self.exists():
+            raise FileNotFoundError(
+                "No project found. Run 'projectmaker init <name>' first."
+            )
+        with self._locked(exclusive=False) as lock:
+            version = self._read_version(lock)
+            path = self.path
+            with path.open("rb") as f:
+                is_packed = packed_format.is_packed(f.read(len(packed_format.MAGIC)))
+            if is_packed:
+                snapshot = self._load_packed(path, lazy)
+            else:
+                snapshot = self._load_lazy() if lazy and path == self.json_path else None
+                if snapshot is None:
+                    try:
+                        snapshot = json.loads(path.read_text())
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Corrupted {path.name}: {e}")
+            return snapshot, self.read_journal(), version
+
+    def _load_lazy(self) -> dict | None:
+        """Decode the snapshot through its offset index; None if the index is
+        missing or stale (e.g. project.json edited by hand)."""
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        st = self.json_path.stat()
+        if index.get("size") != st.st_size or index.get("mtime_ns") != st.st_mtime_ns:
+            return None
+
+        with self.json_path.open("rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snapshot = {
+                key: json.loads(data[start:end]) for key, (start, end) in index["fields"].items()
+            }
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Corrupted project.json: {e}")
+        spans = index["rounds"]
+        if any(len(span) != 3 for span in spans):
+            return None
+        snapshot["rounds"] = LazyRounds(
+            [span[2] for span in spans], lambda i: json.loads(data[spans[i][0]:spans[i][1]])
+        )
+        order = index.get("order", list(snapshot))
+        return {key: snapshot[key] for key in order if key in snapshot}
+
+    @staticmethod
+    def _load_packed(path: Path, lazy: bool) -> dict:
+        """Decode a packed snapshot; with ``lazy`` only round ids are read up
+        front, and a round's block is decompressed when it is first touched."""
+        with path.open("rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if not lazy:
+                return packed_format.decode(data)
+            fields, order, ids, slots = None, [], [], []
+            for tag, start, end in packed_format.iter_records(data):
+                if tag == packed_format.HEADER:
+                    fields, order = packed_format.decode_header(data, start, end)
+                elif tag == packed_format.BLOCK:
+                    block_ids = packed_format.block_ids(data, start)
+                    ids.extend(block_ids)
+                    slots.extend(((start, end), n) for n in range(len(block_ids)))
+            if fields is None:
+                raise ValueError("packed project has no header")
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"Corrupted {path.name}: {e}")
+
+        last = {}
+
+        def load_round(i):
+            span, n = slots[i]
+            if last.get("span") != span:
+                last.update(span=span, rounds=packed_format.decode_block(data, *span))
+            return last["rounds"][n]
+
+        return packed_format.order_fields(fields, LazyRounds(ids, load_round), order)
+
+    def save(self, project, events: list[dict]) -> None:
+        journal_length = getattr(project, "journal_length", None)
+        if journal_length is not None and not events:
+            return
+        with self._locked(exclusive=True) as lock:
+            stored = self._read_version(lock)
+            if journal_length is None:
+                self._compact(project)
+                version = stored + 1
+            else:
+                check_version(project, stored)
+                if journal_length + len(events) >= COMPACT_EVERY:
+                    self._compact(project)
+                else:
+                    with self.journal_path.open("a") as f:
+                        f.write("".join(json.dumps(event) + "\n" for event in events))
+                    project.journal_length += len(events)
+                version = stored + len(events)
+            self._write_version(lock, version)
+        project.version = version
+
+    def compact(self, project) -> None:
+        with self._locked(exclusive=True) as lock:
+            stored = self._read_version(lock)
+            check_version(project, stored)
+            self._compact(project)
+            if project.version is None:
+                stored += 1
+                self._write_version(lock, stored)
+        project.version = stored
+
+    def _compact(self, project) -> None:
+        data = project.to_dict()
+        if self._write_packed():
+            tmp_path = self.packed_path.with_suffix(f".pmk.{os.getpid()}.tmp")
+            tmp_path.write_bytes(packed_format.encode(data))
+            tmp_path.replace(self.packed_path)
+            self.journal_path.unlink(missing_ok=True)
+            self.json_path.unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
+        else:
+            text, index = export_json_indexed(data)
+            tmp_path = self.json_path.with_suffix(f".json.{os.getpid()}.tmp")
+            tmp_path.write_text(text)
+            tmp_path.replace(self.json_path)
+            # The stale .pmk goes first: path prefers it, so it must never outlive the journal.
+            self.packed_path.unlink(missing_ok=True)
+            self.journal_path.unlink(missing_ok=True)
+            st = self.json_path.stat()
+            index.update(size=st.st_size, mtime_ns=st.st_mtime_ns, order=list(data))
+            tmp_index = self.index_path.with_suffix(f".index.{os.getpid()}.tmp")
+            tmp_index.write_text(json.dumps(index, separators=(",", ":")))
+            tmp_index.replace(self.index_path)
+        if hasattr(project, "journal_length"):
+            project.journal_length = 0
+
+    def read_journal(self) -> list[dict]:
+        """Read journal events. A torn final line from an interrupted write is ignored."""
+        if not self.journal_path.exists():
+            return []
+        lines = self.journal_path.read_text().splitlines()
+        events = []
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                if i == len(lines) - 1:
+                    break
+                raise ValueError(f"Corrupted project.journal: {e}")
+        return events
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    plan TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    round_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    raw_response TEXT NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (project_id, round_id)
+);
+CREATE TABLE IF NOT EXISTS bullets (
+    project_id INTEGER NOT NULL,
+    round_id INTEGER NOT NULL,
+    bullet_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    selected INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, round_id, bullet_id),
+    FOREIGN KEY (project_id, round_id) REFERENCES rounds(project_id, round_id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS accepted_ideas (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (project_id, position),
+    UNIQUE (project_id, text)
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    ready INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bullets_selected ON bullets(project_id, selected);
+"""
+
+KNOWN_KEYS = ("name", "created_at", "rounds", "accepted_ideas", "analysis", "plan")
+ROUND_KEYS = ("id", "timestamp", "prompt", "bullets", "raw_response")
+BUSY_TIMEOUT = 30.0
+
+
+class SQLiteStore(Store):
+    """One project, identified by ``key``, inside a shared SQLite database.
+
+    Saving a loaded project turns its pending events into row-level inserts
+    and updates inside a single transaction; only a new project is written
+    in full. The transaction takes SQLite's write lock before checking the
+    version, so concurrent saves are serialized.
+    """
+
+    def __init__(self, db_path: Path, key: str):
+        self.db_path = Path(db_path)
+        self.key = key
+        self.location = f"{self.db_path} [{key}]"
+
+    def ideas_path(self) -> Path:
+        digest = hashlib.sha256(self.key.encode("utf-8")).hexdigest()[:16]
+        return self.db_path.with_name(f"{self.db_path.name}.{digest}.ideas")
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(projects)")}
+        if "version" not in columns:
+            conn.execute("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.commit()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(rounds)")}
+        if "extra" not in columns:
+            conn.execute("ALTER TABLE rounds ADD COLUMN extra TEXT NOT NULL DEFAULT '{}'")
+            conn.commit()
+        return conn
+
+    def exists(self) -> bool:
+        conn = self.connect()
+        try:
+            return self._project_id(conn) is not None
+        finally:
+            conn.close()
+
+    def version(self) -> int | None:
+        conn = self.connect()
+        try:
+            project_id, version = self._project_row(conn)
+            return None if project_id is None else version
+        finally:
+            conn.close()
+
+    def load(self, lazy: bool = False) -> tuple[dict, list[dict], int]:
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN")
+            row = conn.execute(
+                "SELECT id, name, created_at, plan, extra, version FROM projects WHERE key = ?", (self.key,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(
+                    "No project found. Run 'projectmaker init <name>' first."
+                )
+            project_id, name, created_at, plan, extra, version = row
+
+            if lazy:
+                round_ids = [
+                    round_id for (round_id,) in conn.execute(
+                        "SELECT round_id FROM rounds WHERE project_id = ? ORDER BY round_id",
+                        (project_id,),
+                    )
+                ]
+                rounds = LazyRounds(round_ids, lambda i: self._load_round(project_id, round_ids[i]))
+            else:
+                rounds = self._load_rounds(conn, project_id)
+            accepted = [
+                text for (text,) in conn.execute(
+                    "SELECT text FROM accepted_ideas WHERE project_id = ? ORDER BY position",
+                    (project_id,),
+                )
+            ]
+            analysis_row = conn.execute(
+                "SELECT data FROM analyses WHERE project_id = ?", (project_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        project = {
+            "name": name,
+            "created_at": created_at,
+            "rounds": rounds,
+            "accepted_ideas": accepted,
+            "analysis": json.loads(analysis_row[0]) if analysis_row else None,
+            "plan": plan,
+        }
+        project.update(json.loads(extra))
+        return project, [], version
+
+    def _load_rounds(self, conn: sqlite3.Connection, project_id: int, round_id: int | None = None) -> list[dict]:
+        where = "project_id = ?" if round_id is None else "project_id = ? AND round_id = ?"
+        params = (project_id,) if round_id is None else (project_id, round_id)
+        bullets = {}
+        for rid, bullet_id, text, selected in conn.execute(
+            f"SELECT round_id, bullet_id, text, selected FROM bullets WHERE {where} "
+            "ORDER BY round_id, bullet_id",
+            params,
+        ):
+            bullets.setdefault(rid, []).append(
+                {"id": bullet_id, "text": text, "selected": bool(selected)}
+            )
+        return [
+            {
+                "id": rid,
+                "timestamp": timestamp,
+                "prompt": prompt,
+                "bullets": bullets.get(rid, []),
+                "raw_response": raw_response,
+                **json.loads(extra),
+            }
+            for rid, timestamp, prompt, raw_response, extra in conn.execute(
+                f"SELECT round_id, timestamp, prompt, raw_response, extra FROM rounds WHERE {where} "
+                "ORDER BY round_id",
+                params,
+            )
+        ]
+
+    def _load_round(self, project_id: int, round_id: int) -> dict:
+        conn = self.connect()
+        try:
+            return self._load_rounds(conn, project_id, round_id)[0]
+        finally:
+            conn.close()
+
+    def save(self, project, events: list[dict]) -> None:
+        if project.journal_length is not None and not events:
+            return
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                project_id, stored = self._project_row(conn)
+                if project_id is None or project.journal_length is None:
+                    version = stored + 1
+                    self._write_full(conn, project, version)
+                else:
+                    check_version(project, stored)
+                    for event in events:
+                        self._apply(conn, project_id, event)
+                    version = stored + len(events)
+                    conn.execute("UPDATE projects SET version = ? WHERE id = ?", (version, project_id))
+        finally:
+            conn.close()
+        project.journal_length = 0
+        project.version = version
+
+    def compact(self, project) -> None:
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                _, stored = self._project_row(conn)
+                check_version(project, stored)
+                version = stored if project.version is not None else stored + 1
+                self._write_full(conn, project, version)
+        finally:
+            conn.close()
+        project.version = version
+
+    def _project_id(self, conn: sqlite3.Connection) -> int | None:
+        return self._project_row(conn)[0]
+
+    def _project_row(self, conn: sqlite3.Connection) -> tuple[int | None, int]:
+        """(row id, version) of this project; (None, 0) if it isn't stored."""
+        row = conn.execute("SELECT id, version FROM projects WHERE key = ?", (self.key,)).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def _write_full(self, conn: sqlite3.Connection, project, version: int) -> None:
+        project = project.to_dict()
+        conn.execute("DELETE FROM projects WHERE key = ?", (self.key,))
+        extra = {k: v for k, v in project.items() if k not in KNOWN_KEYS}
+        project_id = conn.execute(
+            "INSERT INTO projects (key, name, created_at, plan, extra, version) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key, project["name"], project["created_at"], project.get("plan"), json.dumps(extra), version),
+        ).lastrowid
+        for round_data in project.get("rounds", []):
+            self._insert_round(conn, project_id, round_data)
+        conn.executemany(
+            "INSERT INTO accepted_ideas (project_id, position, text) VALUES (?, ?, ?)",
+            [(project_id, i, text) for i, text in enumerate(project.get("accepted_ideas", []), 1)],
+        )
+        self._set_analysis(conn, project_id, project.get("analysis"))
+
+    def _insert_round(self, conn: sqlite3.Connection, project_id: int, round_data: dict) -> None:
+        extra = {k: v for k, v in round_data.items() if k not in ROUND_KEYS}
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO rounds (project_id, round_id, timestamp, prompt, raw_response, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (project_id, round_data["id"], round_data["timestamp"], round_data["prompt"],
+             round_data["raw_response"], json.dumps(extra)),
+        )
+        if cursor.rowcount == 0:
+            return
+        conn.executemany(
+            "INSERT INTO bullets (project_id, round_id, bullet_id, text, selected) VALUES (?, ?, ?, ?, ?)",
+            [(project_id, round_data["id"], b["id"], b["text"], int(b["selected"]))
+             for b in round_data["bullets"]],
+        )
+
+    def _set_analysis(self, conn: sqlite3.Connection, project_id: int, analysis: dict | None) -> None:
+        if analysis is None:
+            conn.execute("DELETE FROM analyses WHERE project_id = ?", (project_id,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO analyses (project_id, ready, data) VALUES (?, ?, ?)",
+            (project_id, int(bool(analysis.get("ready"))), json.dumps(analysis)),
+        )
+
+    def _apply(self, conn: sqlite3.Connection, project_id: int, event: dict) -> None:
+        op = event["op"]
+        if op == "add_round":
+            self._insert_round(conn, project_id, event["round"])
+        elif op == "select":
+            ids = list(event["bullet_ids"])
+            marks = ",".join("?" * len(ids))
+            conn.execute(
+                f"UPDATE bullets SET selected = 1 WHERE project_id = ? AND round_id = ? "
+                f"AND bullet_id IN ({marks})",
+                (project_id, event["round_id"], *ids),
+            )
+            texts = conn.execute(
+                f"SELECT text FROM bullets WHERE project_id = ? AND round_id = ? "
+                f"AND bullet_id IN ({marks}) ORDER BY bullet_id",
+                (project_id, event["round_id"], *ids),
+            ).fetchall()
+            for (text,) in texts:
+                conn.execute(
+                    "INSERT OR IGNORE INTO accepted_ideas (project_id, position, text) "
+                    "SELECT ?, COALESCE(MAX(position), 0) + 1, ? FROM accepted_ideas WHERE project_id = ?",
+                    (project_id, text, project_id),
+                )
+        elif op == "set_analysis":
+            self._set_analysis(conn, project_id, event["value"])
+        elif op == "set_plan":
+            conn.execute("UPDATE projects SET plan = ? WHERE id = ?", (event["value"], project_id))
+        elif op == "set_extra":
+            (extra,) = conn.execute("SELECT extra FROM projects WHERE id = ?", (project_id,)).fetchone()
+            extra = json.loads(extra)
+            extra[event["key"]] = event["value"]
+            conn.execute("UPDATE projects SET extra = ? WHERE id = ?", (json.dumps(extra), project_id))
+        else:
+            raise ValueError(f"Unknown project event {op!r}")
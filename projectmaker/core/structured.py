@@ -0,0 +1,120 @@
+"""Tool-use schemas for structured responses, and their validation.
+
+In structured mode the model answers through a forced tool call instead of
+markdown. ai_client stores the tool input as compact JSON text (so the
+response cache and raw_response work unchanged); decode() turns that text
+back into data, returning None for anything else so callers can fall back
+to the markdown parsers.
+"""
+
+import json
+
+IDEAS_TOOL = {
+    "name": "record_ideas",
+    "description": "Record the brainstormed project ideas.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "ideas": {
+                "type": "array",
+                "items": {"type": "string", "minLength": 1},
+                "minItems": 1,
+                "description": "Specific, actionable ideas, one sentence each.",
+            },
+        },
+        "required": ["ideas"],
+    },
+}
+
+ANALYSIS_TOOL = {
+    "name": "record_analysis",
+    "description": "Record the readiness verdict for the project ideas.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "ready": {"type": "boolean", "description": "Whether the ideas are ready for implementation planning."},
+            "gaps": {
+                "type": "array",
+                "items": {"type": "string", "minLength": 1},
+                "description": "Missing areas; empty if none.",
+            },
+            "summary": {"type": "string", "description": "1-2 sentence assessment."},
+        },
+        "required": ["ready", "gaps", "summary"],
+    },
+}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+}
+
+
+def validate(data, schema: dict, path: str = "$") -> list[str]:
+    """Check ``data`` against the subset of JSON Schema used by the tools above.
+
+    Returns a list of problems, empty if ``data`` is valid.
+    """
+    expected = schema.get("type")
+    if expected is not None:
+        kind = _TYPES[expected]
+        if not isinstance(data, kind) or (kind is int and isinstance(data, bool)):
+            return [f"{path}: expected {expected}"]
+    errors = []
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing {key!r}")
+        for key, sub in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], sub, f"{path}.{key}"))
+    elif isinstance(data, list):
+        if len(data) < schema.get("minItems", 0):
+            errors.append(f"{path}: expected at least {schema['minItems']} item(s)")
+        items = schema.get("items")
+        if items is not None:
+            for i, item in enumerate(data):
+                errors.extend(validate(item, items, f"{path}[{i}]"))
+    elif isinstance(data, str):
+        if len(data.strip()) < schema.get("minLength", 0):
+            errors.append(f"{path}: empty string")
+    return errors
+
+
+def encode(data: dict) -> str:
+    """Compact JSON text for a tool input."""
+    return json.dumps(data, separators=(",", ":"))
+
+
+def decode(text: str, tool: dict) -> dict | None:
+    """The tool input encoded in ``text``, or None if it isn't valid JSON for ``tool``."""
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if validate(data, tool["input_schema"]):
+        return None
+    return data
+
+
+def decode_ideas(text: str) -> list[str] | None:
+    """Idea texts from a structured brainstorm response, or None if it isn't one."""
+    data = decode(text, IDEAS_TOOL)
+    return [idea.strip() for idea in data["ideas"]] if data is not None else None
+
+
+def decode_analysis(text: str) -> dict | None:
+    """{"ready", "gaps", "summary"} from a structured analysis response, or None."""
+    data = decode(text, ANALYSIS_TOOL)
+    if data is None:
+        return None
+    return {
+        "ready": data["ready"],
+        "gaps": [gap.strip() for gap in data["gaps"]],
+        "summary": data["summary"].strip(),
+    }
@@ -0,0 +1,123 @@
+"""Run analysis (and planning) across every project under a workspace root."""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from . import ai_client, analyzer, project, storage
+
+# Directories never searched for projects.
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "site-packages"}
+
+
+@dataclass(slots=True)
+class ProjectResult:
+    """Outcome of sweeping one project directory.
+
+    ``reused`` means the stored analysis was still current and no API call
+    was made for it; ``error`` is set (and the rest left empty) if the
+    project couldn't be loaded or analyzed.
+    """
+
+    path: str
+    name: str = ""
+    ready: bool = False
+    gaps: list[str] = field(default_factory=list)
+    summary: str = ""
+    reused: bool = False
+    planned: bool = False
+    error: str | None = None
+
+
+def discover_projects(root: Path) -> list[Path]:
+    """Directories under ``root`` (itself included) that hold a project (project.json or .pmk), sorted.
+
+    Hidden directories and SKIP_DIRS are not searched.
+    """
+    found = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS)
+        if any(name in files for name in storage.SNAPSHOT_FILES):
+            found.append(Path(directory))
+    return sorted(found)
+
+
+def sweep_project(directory: Path, plan: bool = False, force: bool = False) -> ProjectResult:
+    """Analyze (and with ``plan``, plan if ready) the project in ``directory`` and save it.
+
+    Errors are returned in the result rather than raised, so one broken
+    project doesn't stop a sweep.
+    """
+    store = storage.FileStore(Path(directory))
+    try:
+        proj = project.load_project(lazy=True, store=store)
+        previous = proj.analysis
+        analysis = analyzer.run_analysis(proj, force=force)
+        planned = False
+        if plan and analysis.ready:
+            planned = analyzer.generate_plan(proj) is not None
+        project.save_project(proj, store=store)
+    except Exception as e:
+        return ProjectResult(str(directory), error=f"{type(e).__name__}: {e}")
+    finally:
+        # A worker process never reaches the CLI's end-of-command flush.
+        response_cache = ai_client.get_response_cache()
+        if response_cache is not None:
+            response_cache.flush()
+    return ProjectResult(
+        str(directory),
+        name=proj.name,
+        ready=analysis.ready,
+        gaps=list(analysis.gaps),
+        summary=analysis.summary,
+        reused=previous is not None and analysis is previous,
+        planned=planned,
+    )
+
+
+def run_workspace(
+    directories: list[Path],
+    plan: bool = False,
+    force: bool = False,
+    workers: int | None = None,
+    processes: bool = False,
+    on_result=None,
+) -> list[ProjectResult]:
+    """Sweep ``directories`` with at most ``workers`` projects in progress at once.
+
+    Each project makes its API calls one after another, so ``workers``
+    (default ai_client.MAX_CONCURRENCY) also caps the requests in flight.
+    Threads share this process's API client and response cache; with
+    ``processes`` each worker is a separate process. ``on_result`` is called
+    with each ProjectResult as it completes. Results are returned in
+    ``directories`` order.
+    """
+    workers = workers or ai_client.MAX_CONCURRENCY
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    results = {}
+    with executor(max_workers=workers) as pool:
+        futures = {pool.submit(sweep_project, d, plan, force): d for d in directories}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result is not None:
+                on_result(result)
+    return [results[d] for d in directories]
+
+
+def readiness_report(results: list[ProjectResult], top_gaps: int = 10) -> dict:
+    """Aggregate sweep results: counts, the most common gaps and every project's result."""
+    analyzed = [r for r in results if r.error is None]
+    gaps = Counter(gap for r in analyzed if not r.ready for gap in r.gaps)
+    return {
+        "projects": len(results),
+        "ready": sum(r.ready for r in analyzed),
+        "not_ready": sum(not r.ready for r in analyzed),
+        "failed": len(results) - len(analyzed),
+        "reused": sum(r.reused for r in analyzed),
+        "planned": sum(r.planned for r in analyzed),
+        "common_gaps": gaps.most_common(top_gaps),
+        "results": [asdict(r) for r in results],
+    }
@@ -0,0 +1,213 @@
+"""Long-running command server behind ``projectmaker serve``.
+
+The daemon imports the CLI and the anthropic SDK once and then executes the
+commands that projectmaker.client forwards over a Unix socket, one at a
+time. Between commands it keeps the sync API client (and its connection
+pool), the response cache's memory tier and every loaded project, so a
+scripted sequence of commands skips interpreter start-up, imports and
+re-parsing project files. A cached project is reused only while the store's
+version matches it; edits made to project.json by hand are picked up on the
+next save or by restarting the daemon.
+
+Each command runs with the client's working directory, environment and
+stdin, and its stdout/stderr are streamed back as JSON lines
+(``{"out": ...}``, ``{"err": ...}``) followed by ``{"exit": code}``.
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+from rich.console import Console
+
+from . import cli
+from .client import ENV_NAMES, ENV_PREFIXES, default_socket_path
+from .core import ai_client, project
+from .core.cache import ResponseCache, default_cache_dir
+from .core.metrics import MetricsStore
+from .core.ratelimit import RateLimiter
+
+
+class _Channel(io.RawIOBase):
+    """Binary sink that sends each write to the client as one message."""
+
+    def __init__(self, send, stream: str):
+        self._send = send
+        self._stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._send({self._stream: bytes(data).decode("utf-8", "replace")})
+        return len(data)
+
+
+class _Output(io.TextIOWrapper):
+    """Text stream to the client that reports the client's terminal status."""
+
+    def __init__(self, send, stream: str, tty: bool):
+        super().__init__(_Channel(send, stream), encoding="utf-8", write_through=True)
+        self._tty = tty
+
+    def isatty(self) -> bool:
+        return self._tty
+
+
+def _forwarded(name: str) -> bool:
+    return name.startswith(ENV_PREFIXES) or name in ENV_NAMES
+
+
+@contextmanager
+def _environment(env: dict):
+    """Replace the forwarded part of os.environ with the client's for one command."""
+    saved = {k: v for k, v in os.environ.items() if _forwarded(k)}
+    for name in saved:
+        del os.environ[name]
+    os.environ.update({k: v for k, v in env.items() if _forwarded(k)})
+    try:
+        yield
+    finally:
+        for name in [k for k in os.environ if _forwarded(k)]:
+            del os.environ[name]
+        os.environ.update(saved)
+
+
+@contextmanager
+def _session(request: dict, send):
+    """Working directory, environment, stdio and console of one forwarded command."""
+    tty = bool(request.get("tty"))
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_console = cli.console
+    cwd = os.getcwd()
+    with _environment(request.get("env", {})):
+        os.chdir(request.get("cwd") or cwd)
+        sys.stdin = io.StringIO(request.get("stdin") or "")
+        sys.stdout = _Output(send, "out", tty)
+        sys.stderr = _Output(send, "err", tty)
+        cli.console = Console()
+        try:
+            yield
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            cli.console = saved_console
+            os.chdir(cwd)
+
+
+def _listening(path: Path) -> bool:
+    """Whether a daemon accepts connections on ``path`` (a stale socket file doesn't)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
+
+
+def _exit_code(code) -> int:
+    if code is None:
+        return 0
+    return code if isinstance(code, int) else 1
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Serves forwarded commands on ``socket_path`` until shut down.
+
+    Creating the server turns on client and project caching; server_close()
+    turns it off again and removes the socket.
+    """
+
+    def __init__(self, socket_path: Path | None = None):
+        self.socket_path = Path(socket_path or default_socket_path())
+        if _listening(self.socket_path):
+            raise RuntimeError(f"A projectmaker daemon is already listening on {self.socket_path}.")
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        super().__init__(str(self.socket_path), _Handler)
+        os.chmod(self.socket_path, 0o600)
+        self.caches = {}
+        ai_client.keep_clients()
+        project.cache_projects()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+        ai_client.keep_clients(False)
+        project.cache_projects(False)
+
+    def configure(self) -> None:
+        """Reset per-command API state from the (client's) environment.
+
+        Response caches are kept per directory so their memory tier stays
+        warm; --no-cache, --structured and --hedge only last for one command.
+        The circuit breaker is shared, so an outage fails fast across commands.
+        """
+        for key in ai_client.usage_totals:
+            ai_client.usage_totals[key] = 0
+        if os.environ.get("PROJECTMAKER_NO_CACHE"):
+            ai_client.set_response_cache(None)
+        else:
+            directory = default_cache_dir()
+            if directory not in self.caches:
+                self.caches[directory] = ResponseCache(directory)
+            ai_client.set_response_cache(self.caches[directory])
+        ai_client.set_metrics_store(None if os.environ.get("PROJECTMAKER_NO_METRICS") else MetricsStore())
+        ai_client.set_structured_output(bool(os.environ.get("PROJECTMAKER_STRUCTURED")))
+        ai_client.set_hedging(bool(os.environ.get("PROJECTMAKER_HEDGE")))
+        ai_client.set_rate_limiter(RateLimiter.from_env())
+
+    def run_command(self, request: dict, send) -> int:
+        """Run one forwarded command line; returns its exit code."""
+        with _session(request, send):
+            self.configure()
+            try:
+                result = cli.cli.main(args=request["argv"], prog_name="projectmaker", standalone_mode=False)
+                return result if isinstance(result, int) else 0
+            except SystemExit as e:
+                return _exit_code(e.code)
+            except click.ClickException as e:
+                e.show()
+                return e.exit_code
+            except click.Abort:
+                click.echo("Aborted!", err=True)
+                return 1
+            except Exception:
+                traceback.print_exc()
+                return 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        code = self.server.run_command(request, self._send)
+        self._send({"exit": code})
+
+    def _send(self, message: dict) -> None:
+        # A client that went away must not abort the command half-way.
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+
+
+def serve(socket_path: Path | None = None, on_ready=None) -> None:
+    """Run the daemon until interrupted (Ctrl-C or SIGTERM)."""
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with DaemonServer(socket_path) as server:
+        if on_ready is not None:
+            on_ready(server)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
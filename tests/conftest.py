@@ -0,0 +1,53 @@
+"""Shared fixtures."""
+
+import pytest
+
+from projectmaker.core import ai_client, storage
+from projectmaker.core.cache import ResponseCache
+from projectmaker.core.metrics import MetricsStore
+from projectmaker.core.project import add_round, create_project, save_project, select_bullets
+from projectmaker.core.resilience import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache(tmp_path_factory):
+    """Give every test its own response cache so nothing leaks into ~/.cache."""
+    ai_client.set_response_cache(ResponseCache(tmp_path_factory.mktemp("cache")))
+
+
+@pytest.fixture(autouse=True)
+def isolated_metrics(tmp_path_factory):
+    """Record API call metrics to a per-test file instead of ~/.cache."""
+    store = MetricsStore(tmp_path_factory.mktemp("metrics") / "metrics.jsonl")
+    ai_client.set_metrics_store(store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def markdown_output():
+    """Reset structured output, which the --structured flag turns on process-wide."""
+    ai_client.set_structured_output(False)
+
+
+@pytest.fixture(autouse=True)
+def fresh_resilience():
+    """Give every test a closed circuit breaker, no hedging and no rate limits, so nothing carries over."""
+    ai_client.set_circuit_breaker(CircuitBreaker())
+    ai_client.set_hedging(False)
+    ai_client.set_rate_limiter(None)
+
+
+@pytest.fixture
+def make_project():
+    """Factory saving a project named ``name`` in ``directory``, with ``ideas`` accepted in one round."""
+
+    def make(directory, name, ideas=()):
+        directory.mkdir(parents=True, exist_ok=True)
+        proj = create_project(name)
+        if ideas:
+            add_round(proj, "p", "\n".join(f"- [ ] {idea}" for idea in ideas))
+            select_bullets(proj, 1, list(range(1, len(ideas) + 1)))
+        save_project(proj, store=storage.FileStore(directory))
+        return directory
+
+    return make
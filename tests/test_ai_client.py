@@ -0,0 +1,327 @@
+"""Tests for the Claude API wrapper with a fake client."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import anthropic
+import pytest
+
+from projectmaker.core import ai_client, context, structured
+from projectmaker.core.context import estimate_tokens
+from projectmaker.core.resilience import CircuitBreaker, CircuitOpenError
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None, usage=None):
+        self.text_stream = self._iter(chunks, error)
+        self.usage = usage
+
+    def get_final_message(self):
+        return MagicMock(usage=self.usage)
+
+    @staticmethod
+    def _iter(chunks, error):
+        yield from chunks
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def connection_error():
+    return anthropic.APIConnectionError(request=MagicMock())
+
+
+def test_stream_claude_forwards_chunks():
+    client = MagicMock()
+    client.messages.stream.return_value = FakeStream(["- [ ] A", "\n- [ ] B"])
+    seen = []
+    text = ai_client.stream_claude("hi", system="sys", client=client, on_text=seen.append)
+    assert text == "- [ ] A\n- [ ] B"
+    assert seen == ["- [ ] A", "\n- [ ] B"]
+    assert client.messages.stream.call_args.kwargs["system"] == "sys"
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_stream_claude_retries_before_first_chunk(mock_sleep):
+    client = MagicMock()
+    client.messages.stream.side_effect = [connection_error(), FakeStream(["ok"])]
+    assert ai_client.stream_claude("hi", client=client) == "ok"
+    assert mock_sleep.call_count == 1
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_stream_claude_does_not_retry_after_output(mock_sleep):
+    client = MagicMock()
+    client.messages.stream.return_value = FakeStream(["partial"], error=connection_error())
+    with pytest.raises(RuntimeError, match="interrupted"):
+        ai_client.stream_claude("hi", client=client)
+    assert client.messages.stream.call_count == 1
+
+
+def test_brainstorm_streams_when_on_text_given():
+    client = MagicMock()
+    client.messages.stream.return_value = FakeStream(["- [ ] A"])
+    seen = []
+    assert ai_client.brainstorm("p", [], client=client, on_text=seen.append) == "- [ ] A"
+    assert seen == ["- [ ] A"]
+    client.messages.create.assert_not_called()
+
+
+def test_brainstorm_lists_covered_ideas_after_the_cached_prefix():
+    prefix, prompt, _ = ai_client.brainstorm_request("more", ["Use SQLite"], covered=["Ship a CLI", "Add dark mode"])
+    assert "Ship a CLI" not in "".join(prefix)
+    assert "don't repeat or rephrase these): Ship a CLI; Add dark mode" in prompt
+    assert "Already proposed" not in ai_client.brainstorm_request("more", ["Use SQLite"])[1]
+
+
+def test_brainstorm_output_budget_shrinks_as_the_idea_context_grows():
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text="- [ ] A")])
+    ai_client.brainstorm("more", ["Use SQLite"], client=client, structured=False)
+    assert client.messages.create.call_args.kwargs["max_tokens"] == ai_client.BRAINSTORM_MAX_TOKENS
+
+    ideas = [f"Idea number {i:03d} about feature area {i % 7}" for i in range(300)]
+    assert sum(estimate_tokens(f"- {idea}\n") for idea in ideas) == context.IDEA_TOKEN_BUDGET
+    ai_client.brainstorm("more", ideas, client=client, structured=False)
+    max_tokens = client.messages.create.call_args.kwargs["max_tokens"]
+    assert 3000 < max_tokens < ai_client.BRAINSTORM_MAX_TOKENS
+
+
+def test_idea_prefix_is_append_only_and_marked_for_caching():
+    ideas = [f"idea {i}" for i in range(ai_client.IDEA_CHUNK + 3)]
+    before, _, _ = ai_client.analysis_request(ideas[:ai_client.IDEA_CHUNK + 1])
+    after, prompt, system = ai_client.analysis_request(ideas)
+    assert after[:-1] == before[:-1]
+    assert "READY:" in prompt
+
+    kwargs = ai_client._request_kwargs(prompt, system, prefix=after)
+    content = kwargs["messages"][0]["content"]
+    assert [b["text"] for b in content] == after + [prompt]
+    assert [("cache_control" in b) for b in content] == [True, True, False]
+    assert kwargs["system"] == system
+
+
+def test_request_without_prefix_sends_plain_prompt():
+    kwargs = ai_client._request_kwargs("hi", "")
+    assert kwargs["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_usage_totals_include_cache_tokens():
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(
+        content=[MagicMock(text="ok")],
+        usage=MagicMock(input_tokens=10, output_tokens=5,
+                        cache_creation_input_tokens=0, cache_read_input_tokens=900),
+    )
+    before = dict(ai_client.usage_totals)
+    ai_client.call_claude("hi", client=client, prefix=["- idea\n"])
+    assert ai_client.usage_totals["cache_read_input_tokens"] == before["cache_read_input_tokens"] + 900
+    assert ai_client.usage_totals["output_tokens"] == before["output_tokens"] + 5
+
+
+def fake_async_client(*results):
+    client = MagicMock()
+    client.messages.create = AsyncMock(side_effect=[
+        r if isinstance(r, Exception) else MagicMock(content=[MagicMock(text=r)]) for r in results
+    ])
+    return client
+
+
+@patch("projectmaker.core.ai_client.asyncio.sleep", new_callable=AsyncMock)
+def test_acall_claude_retries_without_blocking(mock_sleep):
+    client = fake_async_client(connection_error(), "hello")
+    assert asyncio.run(ai_client.acall_claude("hi", client=client)) == "hello"
+    mock_sleep.assert_awaited_once()
+    assert 0 <= mock_sleep.await_args.args[0] <= ai_client.BASE_DELAY
+
+
+def test_aanalyze_parses_response():
+    client = fake_async_client("READY: true\nGAPS: none\nSUMMARY: Fine.")
+    result = asyncio.run(ai_client.aanalyze(["idea"], client=client))
+    assert result == {"ready": True, "gaps": [], "summary": "Fine."}
+
+
+def test_gather_limited_bounds_concurrency_and_keeps_order():
+    active = 0
+    peak = 0
+
+    async def work(i):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01 * (5 - i))
+        active -= 1
+        return i
+
+    results = asyncio.run(ai_client.gather_limited((work(i) for i in range(5)), limit=2))
+    assert results == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+
+def test_gather_limited_return_exceptions():
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    results = asyncio.run(ai_client.gather_limited([ok(), fail()], return_exceptions=True))
+    assert results[0] == "ok"
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_abrainstorm_many_reports_failures_in_place():
+    client = fake_async_client("- [ ] A", anthropic.BadRequestError("bad", response=MagicMock(), body=None))
+    with patch("projectmaker.core.ai_client.MAX_RETRIES", 1):
+        results = asyncio.run(ai_client.abrainstorm_many(["p1", "p2"], [], client=client, limit=1))
+    assert results[0] == "- [ ] A"
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_plan_sections_share_prefix_and_assemble_in_order():
+    ideas = ["Use SQLite", "CLI first"]
+    prefixes = {ai_client.plan_section_request(ideas, "demo", key)[0] == ai_client.plan_request(ideas, "demo")[0]
+                for key, _, _ in ai_client.PLAN_SECTIONS}
+    assert prefixes == {True}
+    with pytest.raises(ValueError, match="Unknown plan section"):
+        ai_client.plan_section_request(ideas, "demo", "budget")
+
+    plan = ai_client.assemble_plan("demo", {"milestones": "M1", "overview": "O"})
+    assert plan.index("## Project Overview") < plan.index("## Milestones")
+    assert "## Architecture" not in plan
+
+
+def test_agenerate_plan_sections_keeps_failures_per_section():
+    client = fake_async_client("overview text", connection_error(), connection_error(), connection_error())
+    with patch("projectmaker.core.ai_client.asyncio.sleep", new_callable=AsyncMock):
+        results = asyncio.run(ai_client.agenerate_plan_sections(
+            ["idea"], "demo", ["overview", "phases"], client=client, limit=1,
+        ))
+    assert results["overview"] == "overview text"
+    assert isinstance(results["phases"], RuntimeError)
+
+
+def tool_use(data):
+    block = MagicMock(type="tool_use", input=data)
+    return MagicMock(content=[block])
+
+
+def test_structured_brainstorm_forces_tool_and_returns_json():
+    client = MagicMock()
+    client.messages.create.return_value = tool_use({"ideas": ["A", "B"]})
+    text = ai_client.brainstorm("p", ["idea"], client=client, structured=True)
+    assert json.loads(text) == {"ideas": ["A", "B"]}
+    kwargs = client.messages.create.call_args.kwargs
+    assert kwargs["tools"] == [structured.IDEAS_TOOL]
+    assert kwargs["tool_choice"] == {"type": "tool", "name": "record_ideas"}
+    assert "markdown" not in kwargs["messages"][0]["content"][-1]["text"]
+
+
+def test_structured_analysis_decodes_tool_input():
+    client = MagicMock()
+    client.messages.create.return_value = tool_use({"ready": False, "gaps": ["Auth"], "summary": "No auth."})
+    ai_client.set_structured_output(True)
+    assert ai_client.analyze(["idea"], client=client) == {"ready": False, "gaps": ["Auth"], "summary": "No auth."}
+    assert client.messages.create.call_args.kwargs["tools"] == [structured.ANALYSIS_TOOL]
+
+
+def test_structured_analysis_falls_back_to_text_reply():
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text="READY: true\nGAPS: none\nSUMMARY: ok")])
+    result = ai_client.analyze(["idea"], client=client, structured=True)
+    assert result == {"ready": True, "gaps": [], "summary": "ok"}
+
+
+def test_structured_plan_is_assembled_from_sections():
+    sections = {key: f"{key} text" for key, _, _ in ai_client.PLAN_SECTIONS}
+    client = MagicMock()
+    client.messages.create.return_value = tool_use(sections)
+    plan = ai_client.generate_plan(["idea"], "demo", client=client, structured=True)
+    assert plan == ai_client.assemble_plan("demo", sections)
+
+
+def test_structured_requests_are_not_cached_with_markdown_ones():
+    client = MagicMock()
+    client.messages.create.side_effect = [
+        MagicMock(content=[MagicMock(text="- [ ] A")]),
+        tool_use({"ideas": ["A"]}),
+    ]
+    ai_client.brainstorm("p", [], client=client)
+    assert ai_client.brainstorm("p", [], client=client, structured=True) == '{"ideas":["A"]}'
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_call_claude_does_not_retry_client_errors(mock_sleep):
+    client = MagicMock()
+    client.messages.create.side_effect = anthropic.BadRequestError(
+        "bad", response=MagicMock(status_code=400), body=None
+    )
+    with pytest.raises(RuntimeError, match="after 1 attempt"):
+        ai_client.call_claude("hi", client=client)
+    assert client.messages.create.call_count == 1
+    mock_sleep.assert_not_called()
+    assert client.messages.create.call_args.kwargs["timeout"] == ai_client.REQUEST_TIMEOUT
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_open_circuit_fails_fast(mock_sleep):
+    ai_client.set_circuit_breaker(ai_client.CircuitBreaker(threshold=2))
+    client = MagicMock()
+    client.messages.create.side_effect = connection_error()
+    with pytest.raises(CircuitOpenError):
+        ai_client.call_claude("hi", client=client)
+    assert client.messages.create.call_count == 2
+    with pytest.raises(CircuitOpenError):
+        ai_client.call_claude("again", client=client)
+    assert client.messages.create.call_count == 2
+
+
+def test_interrupted_trial_call_does_not_keep_the_circuit_open():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, cooldown=10, clock=lambda: now[0])
+    breaker.record_failure()
+    ai_client.set_circuit_breaker(breaker)
+    now[0] = 10.0
+    client = MagicMock()
+    client.messages.create = AsyncMock(
+        side_effect=[asyncio.CancelledError(), MagicMock(content=[MagicMock(text="hello")])]
+    )
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(ai_client.acall_claude("hi", client=client))
+    assert breaker.state == "half-open"
+    assert asyncio.run(ai_client.acall_claude("again", client=client)) == "hello"
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_returns_the_faster_response(isolated_metrics):
+    import threading
+
+    for _ in range(ai_client.HEDGE_MIN_SAMPLES):
+        isolated_metrics.record("brainstorm", "m", latency=0.01, ttfb=0.01)
+    ai_client.set_hedging(True)
+    with patch("projectmaker.core.ai_client.HEDGE_MIN_DELAY", 0.05):
+        assert ai_client.hedge_delay("brainstorm") == 0.05
+
+    release = threading.Event()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            release.wait(5)
+            return MagicMock(content=[MagicMock(text="- [ ] slow")])
+        return MagicMock(content=[MagicMock(text="- [ ] fast")])
+
+    client = MagicMock()
+    client.messages.create.side_effect = create
+    try:
+        assert ai_client.brainstorm("p", [], client=client) == "- [ ] fast"
+    finally:
+        release.set()
+    assert len(calls) == 2
@@ -1,23 +1,33 @@
 """Tests for analyzer with mocked AI responses."""
 
-from unittest.mock import patch
+import asyncio
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from projectmaker.core.ai_client import parse_analysis
-from projectmaker.core.analyzer import generate_plan, run_analysis
+from projectmaker.core.analyzer import (
+    SECTIONS_KEY,
+    SPECULATION_KEY,
+    agenerate_plan_speculative,
+    generate_plan,
+    generate_plan_sections,
+    run_analysis,
+)
+from projectmaker.core.model import Analysis
 from projectmaker.core.project import create_project
 
 
 @pytest.fixture
 def project_with_ideas():
     proj = create_project("test-project")
-    proj["accepted_ideas"] = [
+    for idea in [
         "Build a REST API with Flask",
         "Use PostgreSQL for data storage",
         "Add JWT authentication",
         "Deploy on AWS",
-    ]
+    ]:
+        proj.accepted_ideas.add(idea)
     return proj
 
 
@@ -44,8 +54,8 @@ SUMMARY: Missing key areas."""
 def test_run_analysis_no_ideas():
     proj = create_project("empty")
     analysis = run_analysis(proj)
-    assert analysis["ready"] is False
-    assert len(analysis["gaps"]) > 0
+    assert analysis.ready is False
+    assert len(analysis.gaps) > 0
 
 
 @patch("projectmaker.core.analyzer.ai_client.analyze")
@@ -56,8 +66,8 @@ def test_run_analysis_ready(mock_analyze, project_with_ideas):
         "summary": "Ready to proceed.",
     }
     analysis = run_analysis(project_with_ideas)
-    assert analysis["ready"] is True
-    assert project_with_ideas["analysis"]["ready"] is True
+    assert analysis.ready is True
+    assert project_with_ideas.analysis.ready is True
 
 
 @patch("projectmaker.core.analyzer.ai_client.analyze")
@@ -68,8 +78,8 @@ def test_run_analysis_not_ready(mock_analyze, project_with_ideas):
         "summary": "Missing testing.",
     }
     analysis = run_analysis(project_with_ideas)
-    assert analysis["ready"] is False
-    assert "testing strategy" in analysis["gaps"]
+    assert analysis.ready is False
+    assert "testing strategy" in analysis.gaps
 
 
 @patch("projectmaker.core.analyzer.ai_client.generate_plan")
@@ -80,7 +90,7 @@ def test_generate_plan_ready(mock_analyze, mock_plan, project_with_ideas):
     result = generate_plan(project_with_ideas)
     assert result is not None
     assert "Implementation Plan" in result
-    assert project_with_ideas["plan"] is not None
+    assert project_with_ideas.plan is not None
 
 
 @patch("projectmaker.core.analyzer.ai_client.analyze")
@@ -92,4 +102,140 @@ def test_generate_plan_not_ready(mock_analyze, project_with_ideas):
     }
     result = generate_plan(project_with_ideas)
     assert result is None
-    assert project_with_ideas["plan"] is None
+    assert project_with_ideas.plan is None
+
+
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_run_analysis_reuses_unchanged_verdict(mock_analyze, project_with_ideas):
+    mock_analyze.return_value = {"ready": True, "gaps": [], "summary": "Ready."}
+    first = run_analysis(project_with_ideas)
+    project_with_ideas.pending.clear()
+    assert run_analysis(project_with_ideas) is first
+    assert mock_analyze.call_count == 1
+    assert project_with_ideas.pending == []
+
+    run_analysis(project_with_ideas, force=True)
+    assert mock_analyze.call_count == 2
+
+
+@patch("projectmaker.core.analyzer.ai_client.generate_plan")
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_generate_plan_reuses_fresh_analysis(mock_analyze, mock_plan, project_with_ideas):
+    mock_analyze.return_value = {"ready": True, "gaps": [], "summary": "Ready."}
+    mock_plan.return_value = "# Plan"
+    run_analysis(project_with_ideas)
+    generate_plan(project_with_ideas)
+    assert mock_analyze.call_count == 1
+
+
+@patch("projectmaker.core.analyzer.ai_client.analyze_delta")
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_run_analysis_sends_only_new_ideas(mock_analyze, mock_delta, project_with_ideas):
+    mock_analyze.return_value = {"ready": False, "gaps": ["testing"], "summary": "Missing testing."}
+    mock_delta.return_value = {"ready": True, "gaps": [], "summary": "Covered."}
+    run_analysis(project_with_ideas)
+    project_with_ideas.accepted_ideas.add("Write pytest suites")
+
+    analysis = run_analysis(project_with_ideas)
+    previous, new_ideas = mock_delta.call_args.args
+    assert previous["gaps"] == ["testing"]
+    assert new_ideas == ["Write pytest suites"]
+    assert analysis.ready is True
+    assert analysis.idea_count == 5
+    assert mock_analyze.call_count == 1
+
+
+@patch("projectmaker.core.analyzer.ai_client.analyze_delta")
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_run_analysis_without_fingerprint_runs_full(mock_analyze, mock_delta, project_with_ideas):
+    project_with_ideas.restore(Analysis(ready=True, gaps=[]))
+    mock_analyze.return_value = {"ready": False, "gaps": ["x"], "summary": ""}
+    assert run_analysis(project_with_ideas).ready is False
+    mock_delta.assert_not_called()
+
+
+@patch("projectmaker.core.analyzer.ai_client.agenerate_plan", new_callable=AsyncMock)
+@patch("projectmaker.core.analyzer.ai_client.aanalyze", new_callable=AsyncMock)
+def test_speculative_plan_overlaps_analysis(mock_analyze, mock_plan, project_with_ideas):
+    async def slow_analysis(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return {"ready": True, "gaps": [], "summary": "Ready."}
+
+    async def slow_plan(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return "# Plan"
+
+    mock_analyze.side_effect = slow_analysis
+    mock_plan.side_effect = slow_plan
+    plan, outcome = asyncio.run(agenerate_plan_speculative(project_with_ideas))
+    assert plan == "# Plan"
+    assert project_with_ideas.plan == "# Plan"
+    assert outcome.used is True
+    assert outcome.wall_seconds < 0.09
+    assert outcome.saved_seconds > 0.02
+    assert project_with_ideas.extra[SPECULATION_KEY]["used"] == 1
+
+
+@patch("projectmaker.core.analyzer.ai_client.agenerate_plan", new_callable=AsyncMock)
+@patch("projectmaker.core.analyzer.ai_client.aanalyze", new_callable=AsyncMock)
+def test_speculative_plan_cancelled_when_not_ready(mock_analyze, mock_plan, project_with_ideas):
+    cancelled = []
+
+    async def never_finishes(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def not_ready(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"ready": False, "gaps": ["testing"], "summary": "No."}
+
+    mock_analyze.side_effect = not_ready
+    mock_plan.side_effect = never_finishes
+    plan, outcome = asyncio.run(agenerate_plan_speculative(project_with_ideas))
+    assert plan is None
+    assert cancelled == [True]
+    assert project_with_ideas.plan is None
+    assert outcome.used is False
+    assert outcome.wasted_tokens > 0
+    assert project_with_ideas.extra[SPECULATION_KEY]["wasted_tokens"] == outcome.wasted_tokens
+
+
+@patch("projectmaker.core.analyzer.ai_client.generate_plan")
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_speculative_skipped_when_analysis_current(mock_analyze, mock_plan, project_with_ideas):
+    mock_analyze.return_value = {"ready": True, "gaps": [], "summary": "Ready."}
+    mock_plan.return_value = "# Plan"
+    run_analysis(project_with_ideas)
+    assert generate_plan(project_with_ideas, speculative=True) == "# Plan"
+    assert SPECULATION_KEY not in project_with_ideas.extra
+
+
+@patch("projectmaker.core.analyzer.ai_client.agenerate_plan_sections", new_callable=AsyncMock)
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_sectioned_plan_retries_only_failed_sections(mock_analyze, mock_sections, project_with_ideas):
+    mock_analyze.return_value = {"ready": True, "gaps": [], "summary": "Ready."}
+    mock_sections.side_effect = lambda ideas, name, sections, **kw: {
+        s: (RuntimeError("timeout") if s == "phases" else f"{s} text") for s in sections
+    }
+    plan, failures = generate_plan_sections(project_with_ideas)
+    assert plan is None
+    assert list(failures) == ["phases"]
+    assert "overview" in project_with_ideas.extra[SECTIONS_KEY]["sections"]
+
+    mock_sections.side_effect = lambda ideas, name, sections, **kw: {s: f"{s} text" for s in sections}
+    plan, failures = generate_plan_sections(project_with_ideas)
+    assert mock_sections.call_args.args[2] == ["phases"]
+    assert failures == {}
+    assert plan.index("overview text") < plan.index("phases text") < plan.index("milestones text")
+    assert project_with_ideas.plan == plan
+
+
+@patch("projectmaker.core.analyzer.ai_client.agenerate_plan_sections", new_callable=AsyncMock)
+@patch("projectmaker.core.analyzer.ai_client.analyze")
+def test_sectioned_plan_not_ready(mock_analyze, mock_sections, project_with_ideas):
+    mock_analyze.return_value = {"ready": False, "gaps": ["x"], "summary": ""}
+    assert generate_plan_sections(project_with_ideas) == (None, {})
+    mock_sections.assert_not_called()
@@ -0,0 +1,188 @@
+"""Tests for Message Batches jobs, against a local stand-in for the batch endpoint."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from click.testing import CliRunner
+
+from projectmaker.cli import cli
+from projectmaker.core import ai_client, storage
+from projectmaker.core.batch import APPLYING, BatchJob, run_job
+from projectmaker.core.project import add_round, load_project, save_project, select_bullets
+
+
+class LocalBatches:
+    """Stand-in for client.messages.batches. A batch ends after ``polls`` retrieve calls."""
+
+    def __init__(self, polls: int = 1, errored: tuple = ()):
+        self.polls = polls
+        self.errored = errored
+        self.batches = {}
+
+    def create(self, requests):
+        batch_id = f"msgbatch_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"requests": requests, "polls": self.polls}
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def retrieve(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] -= 1
+        return SimpleNamespace(id=batch_id, processing_status="ended" if batch["polls"] <= 0 else "in_progress")
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id]["requests"]:
+            if request["custom_id"] in self.errored:
+                result = SimpleNamespace(type="errored", error="overloaded")
+            else:
+                text = respond(request["params"]["system"])
+                message = SimpleNamespace(
+                    content=[SimpleNamespace(type="text", text=text)],
+                    usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+                )
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+
+def respond(system: str) -> str:
+    if "analysis" in system:
+        return "READY: true\nGAPS: none\nSUMMARY: Looks complete."
+    if "architect" in system:
+        return "# Batch plan"
+    return "- [ ] Batch idea A\n- [ ] Batch idea B"
+
+
+def local_client(**kwargs):
+    return SimpleNamespace(messages=SimpleNamespace(batches=LocalBatches(**kwargs)))
+
+
+def stored(directory):
+    return load_project(store=storage.FileStore(directory))
+
+
+@pytest.fixture
+def projects(tmp_path, make_project):
+    return [make_project(tmp_path / "alpha", "alpha", ["Auth", "API"]),
+            make_project(tmp_path / "beta", "beta", ["Queue"])]
+
+
+def test_job_analyzes_plans_and_brainstorms(projects, tmp_path):
+    manifest = tmp_path / "job.json"
+    job = BatchJob.create(manifest, projects, plan=True, prompts=["more ideas"])
+    assert [e["kind"] for e in job.entries] == ["analyze", "plan", "brainstorm"] * 2
+
+    client = local_client(polls=2)
+    slept = []
+    assert run_job(job, client, wait=True, interval=5, sleep=slept.append)
+    assert slept == [5]
+    assert job.counts() == {"applied": 6}
+
+    proj = stored(projects[0])
+    assert proj.analysis.ready and proj.analysis.summary == "Looks complete."
+    assert proj.plan == "# Batch plan"
+    assert proj.rounds[-1].prompt == "more ideas"
+    assert [b.text for b in proj.rounds[-1].bullets] == ["Batch idea A", "Batch idea B"]
+    assert ai_client.usage_totals["output_tokens"] >= 30
+    assert json.loads(manifest.read_text())["batches"][0]["collected"]
+
+
+def test_job_resumes_from_manifest(projects, tmp_path):
+    manifest = tmp_path / "job.json"
+    client = local_client(polls=2)
+    assert not run_job(BatchJob.create(manifest, projects), client)
+    assert BatchJob.load(manifest).counts() == {"submitted": 2}
+
+    # A new process picks the job up from the manifest without resubmitting.
+    job = BatchJob.load(manifest)
+    assert run_job(job, client)
+    assert len(client.messages.batches.batches) == 1
+    assert all(stored(p).analysis.ready for p in projects)
+
+
+def test_resumed_apply_does_not_duplicate_rounds(projects, tmp_path):
+    job = BatchJob.create(tmp_path / "job.json", projects[:1], analyze=False, prompts=["again"])
+    run_job(job, local_client())
+    rounds = len(stored(projects[0]).rounds)
+
+    # Crash after the project was saved but before the manifest said so.
+    job.entries[0].update(status=APPLYING, text=stored(projects[0]).rounds[-1].raw_response)
+    job.apply()
+    assert len(stored(projects[0]).rounds) == rounds
+    assert job.counts() == {"applied": 1}
+
+
+def test_results_for_changed_projects_are_discarded(projects, tmp_path):
+    job = BatchJob.create(tmp_path / "job.json", projects[:1], plan=True)
+    client = local_client()
+    job.submit(client)
+
+    proj = stored(projects[0])
+    add_round(proj, "later", "- [ ] New idea")
+    select_bullets(proj, 2, [1])
+    save_project(proj, store=storage.FileStore(projects[0]))
+
+    run_job(job, client)
+    assert job.counts() == {"discarded": 2}
+    assert stored(projects[0]).analysis is None
+
+
+def test_errored_requests_are_reported(projects, tmp_path):
+    job = BatchJob.create(tmp_path / "job.json", projects)
+    assert run_job(job, local_client(errored=("req-1",)))
+    assert job.counts() == {"applied": 1, "errored": 1}
+    assert "overloaded" in job.entries[1]["error"]
+
+
+def test_moved_projects_are_marked_errored(projects, tmp_path):
+    job = BatchJob.create(tmp_path / "job.json", projects)
+    client = local_client()
+    job.submit(client)
+    projects[0].rename(tmp_path / "moved")
+
+    assert run_job(job, client)
+    assert job.counts() == {"applied": 1, "errored": 1}
+    assert "FileNotFoundError" in job.entries[0]["error"]
+    assert stored(projects[1]).analysis.ready
+    assert BatchJob.load(tmp_path / "job.json").counts() == job.counts()
+
+
+def test_cached_requests_skip_the_batch(projects, tmp_path):
+    run_job(BatchJob.create(tmp_path / "first.json", projects, analyze=False, prompts=["same"]), local_client())
+
+    client = local_client()
+    job = BatchJob.create(tmp_path / "second.json", projects, analyze=False, prompts=["same"])
+    assert job.counts() == {"done": 2}
+    assert run_job(job, client)
+    assert client.messages.batches.batches == {}
+
+
+def test_up_to_date_projects_are_not_requested(projects, tmp_path):
+    run_job(BatchJob.create(tmp_path / "job.json", projects), local_client())
+    assert BatchJob.create(tmp_path / "again.json", projects).entries == []
+
+
+def test_unreadable_projects_are_skipped(tmp_path):
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "project.json").write_text("not json{{{")
+    job = BatchJob.create(tmp_path / "job.json", [tmp_path / "broken"])
+    assert job.entries == []
+    assert "Corrupted" in job.data["skipped"][0]["error"]
+
+
+def test_cli_submit_and_collect(projects, tmp_path, monkeypatch):
+    client = local_client(polls=2)
+    monkeypatch.setattr(ai_client, "create_client", lambda: client)
+    manifest = str(tmp_path / "job.json")
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["batch", "submit", str(tmp_path), "--manifest", manifest])
+    assert result.exit_code == 0
+    assert "2 submitted" in result.output
+    result = runner.invoke(cli, ["batch", "submit", str(tmp_path), "--manifest", manifest])
+    assert result.exit_code == 1
+    assert "unfinished job" in result.output
+
+    result = runner.invoke(cli, ["batch", "collect", "--manifest", manifest])
+    assert result.exit_code == 0
+    assert "2 applied" in result.output
+    assert stored(projects[1]).analysis.ready
@@ -0,0 +1,37 @@
+"""Smoke tests for the benchmark suite, so it doesn't rot between runs."""
+
+from benchmarks import run, stub
+from projectmaker.core import ai_client, project
+
+
+def test_synthetic_project_shape():
+    proj = run.synthetic_project(25, response_bytes=2000)
+    assert len(proj.rounds) == 25
+    assert len(proj.rounds[0].raw_response) >= 2000
+    assert len(proj.rounds[0].bullets) == run.BULLETS_PER_ROUND
+    assert len(proj.accepted_ideas) == 3
+
+
+def test_bench_project_covers_hot_paths():
+    results = run.bench_project(5, response_bytes=500, repeat=1)
+    names = {name.split("[")[0] for name in results}
+    assert {"load_project", "save_project.full", "add_round", "select_bullets", "get_round"} <= names
+    assert all(r["median"] >= 0 and r["runs"] == 1 for r in results.values())
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"a": {"median": 0.010}, "b": {"median": 0.010}, "c": {"median": 1e-6}}
+    results = {
+        "a": {"median": 0.020},
+        "b": {"median": 0.011},
+        "c": {"median": 5e-6},
+        "new": {"median": 1.0},
+    }
+    assert run.compare(results, baseline, threshold=0.25) == [("a", 0.010, 0.020)]
+
+
+def test_stub_client_answers_each_request_kind():
+    client = stub.StubClient()
+    bullets = ai_client.brainstorm("ideas", [], client=client)
+    assert len(project.parse_bullets(bullets)) == stub.BULLETS
+    assert ai_client.analyze(["idea"], client=client)["ready"] is True
@@ -0,0 +1,112 @@
+"""Tests for the response cache."""
+
+import json
+import time
+from unittest.mock import MagicMock
+
+from click.testing import CliRunner
+
+from projectmaker.cli import cli
+from projectmaker.core import ai_client
+from projectmaker.core.cache import ResponseCache, request_key
+
+
+def fake_client(text="READY: true"):
+    client = MagicMock()
+    client.messages.create.return_value.content = [MagicMock(text=text)]
+    return client
+
+
+def test_request_key_depends_on_full_request():
+    a = request_key(model="m", system="s", messages=[{"role": "user", "content": "p"}])
+    b = request_key(model="m", system="s2", messages=[{"role": "user", "content": "p"}])
+    assert a != b
+    assert a == request_key(messages=[{"role": "user", "content": "p"}], system="s", model="m")
+
+
+def test_memory_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    ResponseCache(tmp_path).put("k", "text")
+    fresh = ResponseCache(tmp_path)
+    assert fresh.get("k") == "text"
+    assert fresh.hits == 1
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("k", "text", ttl=-1)
+    assert cache.get("k") is None
+    assert not (tmp_path / "k.json").exists()
+
+
+def test_disk_size_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=200)
+    cache.put("old", "x" * 100)
+    time.sleep(0.01)
+    cache.put("new", "y" * 100)
+    assert not (tmp_path / "old.json").exists()
+    assert (tmp_path / "new.json").exists()
+
+
+def test_call_claude_uses_cache():
+    client = fake_client()
+    assert ai_client.call_claude("same", system="s", client=client) == "READY: true"
+    assert ai_client.call_claude("same", system="s", client=client) == "READY: true"
+    assert client.messages.create.call_count == 1
+    stats = ai_client.get_response_cache().stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_counts_are_flushed_once_and_add_up_across_processes(tmp_path):
+    first, second = ResponseCache(tmp_path), ResponseCache(tmp_path)
+    first.put("k", "text")
+    first.get("k")
+    first.get("other")
+    second.get("k")
+    assert not (tmp_path / "stats.json").exists()
+    assert first.stats()["total_hits"] == 1
+
+    first.flush()
+    second.flush()
+    second.flush()
+    assert json.loads((tmp_path / "stats.json").read_text()) == {"hits": 2, "misses": 1}
+    assert ResponseCache(tmp_path).stats()["total_hits"] == 2
+
+
+def test_cli_flushes_counts_when_the_command_ends(tmp_path):
+    cache = ResponseCache(tmp_path)
+    ai_client.set_response_cache(cache)
+    cache.get("missing")
+    result = CliRunner().invoke(cli, ["cache"])
+    assert "Misses: 1" in result.output
+    assert json.loads((tmp_path / "stats.json").read_text()) == {"hits": 0, "misses": 1}
+
+
+def test_unwritable_directory_falls_back_to_memory(tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    cache = ResponseCache(not_a_dir / "responses")
+    ai_client.set_response_cache(cache)
+    client = fake_client()
+    assert ai_client.call_claude("same", system="s", client=client) == "READY: true"
+    assert ai_client.call_claude("same", system="s", client=client) == "READY: true"
+    assert client.messages.create.call_count == 1
+    assert cache.directory is None
+
+
+def test_call_claude_bypass():
+    client = fake_client()
+    ai_client.call_claude("same", client=client)
+    ai_client.call_claude("same", client=client, use_cache=False)
+    assert client.messages.create.call_count == 2
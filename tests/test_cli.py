@@ -1,13 +1,20 @@
 """Tests for CLI commands using Click's test runner."""
 
+import errno
 import json
 import os
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 from click.testing import CliRunner
 
 from projectmaker.cli import cli
+from projectmaker.core import storage
+from projectmaker.core.model import Analysis
+from projectmaker.core.project import add_round, create_project, load_project, save_project, select_bullets
 
 
 @pytest.fixture
@@ -45,9 +52,77 @@ def test_brainstorm(mock_brainstorm, runner, project_dir):
     assert result.exit_code == 0
     assert "round 1" in result.output
 
-    proj = json.loads((project_dir / "project.json").read_text())
-    assert len(proj["rounds"]) == 1
-    assert len(proj["rounds"][0]["bullets"]) == 3
+    proj = load_project()
+    assert len(proj.rounds) == 1
+    assert len(proj.rounds[0].bullets) == 3
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_brainstorm_stream(mock_brainstorm, runner, project_dir):
+    response = "- [ ] Idea A\n- [ ] Idea B\n- [ ] Idea C"
+
+    def fake_brainstorm(prompt, ideas, on_text=None, summary="", covered=()):
+        for i in range(0, len(response), 4):
+            on_text(response[i:i + 4])
+        return response
+
+    mock_brainstorm.side_effect = fake_brainstorm
+    runner.invoke(cli, ["init", "test-proj"])
+    result = runner.invoke(cli, ["brainstorm", "--stream", "build something cool"])
+    assert result.exit_code == 0
+    assert "1. [ ] Idea A" in result.output
+    assert "3. [ ] Idea C" in result.output
+
+    proj = load_project()
+    assert [b.text for b in proj.rounds[0].bullets] == ["Idea A", "Idea B", "Idea C"]
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_brainstorm_flags_and_collapses_near_duplicates(mock_brainstorm, runner, project_dir):
+    runner.invoke(cli, ["init", "test-proj"])
+    mock_brainstorm.return_value = "- [ ] Add OAuth login with Google and GitHub\n- [ ] Use SQLite"
+    runner.invoke(cli, ["brainstorm", "auth"])
+    runner.invoke(cli, ["select", "1"], input="2\n")
+
+    mock_brainstorm.return_value = "- [ ] Implement OAuth-based login via Google and GitHub\n- [ ] Ship a CLI"
+    result = runner.invoke(cli, ["brainstorm", "login options"])
+    assert result.exit_code == 0, result.output
+    assert "1. [ ] Implement OAuth-based login" in result.output
+    assert "similar to round 1: Add OAuth login with Google and GitHub" in result.output
+    assert "Flagged 1 near-duplicate(s)" in result.output
+    # Unaccepted ideas from earlier rounds are sent as "already covered"; accepted ones are in the prefix.
+    assert mock_brainstorm.call_args.kwargs["covered"] == ["Add OAuth login with Google and GitHub"]
+
+    mock_brainstorm.return_value = "- [ ] OAuth login through Google and GitHub\n- [ ] Offer a dark theme"
+    result = runner.invoke(cli, ["brainstorm", "--collapse", "login options"])
+    assert result.exit_code == 0, result.output
+    assert "OAuth login through" not in result.output
+    assert "2. [ ] Offer a dark theme" in result.output
+    assert "Collapsed 1 near-duplicate(s)" in result.output
+
+    result = runner.invoke(cli, ["select", "2"], input="\n")
+    assert "similar to round 1: Add OAuth login with Google and GitHub" in result.output
+    assert (project_dir / "project.ideas").exists()
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_brainstorm_stream_renumbers_when_plain_bullets_are_dropped(mock_brainstorm, runner, project_dir):
+    response = "- Note\n- [ ] Idea A\n- [ ] Idea B"
+
+    def fake_brainstorm(prompt, ideas, on_text=None, summary="", covered=()):
+        for line in response.splitlines(keepends=True):
+            on_text(line)
+        return response
+
+    mock_brainstorm.side_effect = fake_brainstorm
+    runner.invoke(cli, ["init", "test-proj"])
+    result = runner.invoke(cli, ["brainstorm", "--stream", "build something cool"])
+    assert result.exit_code == 0, result.output
+    renumbered = result.output.split("Renumbered")[1]
+    assert "1. [ ] Idea A" in renumbered
+    assert "2. [ ] Idea B" in renumbered
+    assert "Note" not in renumbered
+    assert [b.text for b in load_project().rounds[0].bullets] == ["Idea A", "Idea B"]
 
 
 @patch("projectmaker.cli.ai_client.brainstorm")
@@ -66,8 +141,22 @@ def test_select(mock_brainstorm, runner, project_dir):
     assert result.exit_code == 0
     assert "Accepted 2 idea(s)" in result.output
 
-    proj = json.loads((project_dir / "project.json").read_text())
-    assert len(proj["accepted_ideas"]) == 2
+    proj = load_project()
+    assert len(proj.accepted_ideas) == 2
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_select_reports_a_conflicting_save(mock_brainstorm, runner, project_dir):
+    mock_brainstorm.return_value = "- [ ] Idea A"
+    runner.invoke(cli, ["init", "test-proj"])
+    runner.invoke(cli, ["brainstorm", "test"])
+    conflict = storage.ConflictError("Can't re-apply selection: round 1 not found")
+    with patch("projectmaker.cli.project.save_project", side_effect=conflict):
+        result = runner.invoke(cli, ["select", "1"], input="1\n")
+    assert result.exit_code == 1
+    assert "Error: Can't re-apply selection" in result.output
+    assert not isinstance(result.exception, storage.ConflictError)
+    assert not load_project().accepted_ideas
 
 
 def test_select_invalid_round(runner, project_dir):
@@ -79,11 +168,11 @@ def test_select_invalid_round(runner, project_dir):
 
 @patch("projectmaker.cli.analyzer.run_analysis")
 def test_analyze(mock_analysis, runner, project_dir):
-    mock_analysis.return_value = {
-        "ready": False,
-        "gaps": ["authentication", "deployment"],
-        "summary": "Missing key areas.",
-    }
+    mock_analysis.return_value = Analysis(
+        ready=False,
+        gaps=["authentication", "deployment"],
+        summary="Missing key areas.",
+    )
     runner.invoke(cli, ["init", "test-proj"])
     result = runner.invoke(cli, ["analyze"])
     assert result.exit_code == 0
@@ -93,11 +182,11 @@ def test_analyze(mock_analysis, runner, project_dir):
 
 @patch("projectmaker.cli.analyzer.run_analysis")
 def test_analyze_ready(mock_analysis, runner, project_dir):
-    mock_analysis.return_value = {
-        "ready": True,
-        "gaps": [],
-        "summary": "Good to go.",
-    }
+    mock_analysis.return_value = Analysis(
+        ready=True,
+        gaps=[],
+        summary="Good to go.",
+    )
     runner.invoke(cli, ["init", "test-proj"])
     result = runner.invoke(cli, ["analyze"])
     assert result.exit_code == 0
@@ -127,3 +216,176 @@ def test_plan_not_ready(mock_plan, runner, project_dir):
     result = runner.invoke(cli, ["plan"])
     assert result.exit_code != 0
     assert "not ready" in result.output.lower()
+
+
+@patch("projectmaker.cli.analyzer.generate_plan_sections")
+def test_plan_sectioned_reports_failed_sections(mock_sections, runner, project_dir):
+    mock_sections.return_value = (None, {"phases": RuntimeError("timed out")})
+    runner.invoke(cli, ["init", "test-proj"])
+    result = runner.invoke(cli, ["plan", "--section", "phases"])
+    assert result.exit_code == 1
+    assert "Section phases failed" in result.output
+    assert mock_sections.call_args.kwargs["sections"] == ["phases"]
+
+
+def test_plan_section_choices_match_ai_client():
+    from projectmaker.core import ai_client
+
+    option = next(p for p in cli.commands["plan"].params if p.name == "sections")
+    assert list(option.type.choices) == [key for key, _, _ in ai_client.PLAN_SECTIONS]
+
+
+def test_plan_rejects_conflicting_modes(runner, project_dir):
+    result = runner.invoke(cli, ["plan", "--stream", "--sectioned"])
+    assert result.exit_code == 2
+
+
+def test_cache_stats(runner, project_dir):
+    result = runner.invoke(cli, ["cache"])
+    assert result.exit_code == 0
+    assert "Hits: 0" in result.output
+
+
+def test_no_cache_flag(runner, project_dir):
+    result = runner.invoke(cli, ["--no-cache", "cache"])
+    assert result.exit_code == 0
+    assert "disabled" in result.output
+
+
+@patch("projectmaker.cli.ai_client.abrainstorm_many")
+def test_brainstorm_batch(mock_many, runner, project_dir):
+    async def fake_many(prompts, ideas, limit, summary="", covered=()):
+        return ["- [ ] A\n- [ ] B", RuntimeError("AI request failed"), "- [ ] C"]
+
+    mock_many.side_effect = fake_many
+    runner.invoke(cli, ["init", "test-proj"])
+    result = runner.invoke(cli, ["brainstorm-batch", "--workers", "2"], input="first\n\nsecond\nthird\n")
+    assert result.exit_code == 1
+    assert "Failed:" in result.output
+    assert mock_many.call_args.args[0] == ["first", "second", "third"]
+    assert mock_many.call_args.kwargs["limit"] == 2
+
+    proj = load_project()
+    assert [r.prompt for r in proj.rounds] == ["first", "third"]
+    assert [r.id for r in proj.rounds] == [1, 2]
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_export(mock_brainstorm, runner, project_dir):
+    mock_brainstorm.return_value = "- [ ] Idea A"
+    runner.invoke(cli, ["init", "test-proj"])
+    runner.invoke(cli, ["brainstorm", "test"])
+    result = runner.invoke(cli, ["export", "--compact"])
+    assert result.exit_code == 0
+    assert json.loads(result.output)["rounds"][0]["prompt"] == "test"
+    assert not (project_dir / "project.journal").exists()
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_export_packed_and_back(mock_brainstorm, runner, project_dir):
+    mock_brainstorm.return_value = "- [ ] Idea A"
+    runner.invoke(cli, ["init", "test-proj"])
+    runner.invoke(cli, ["brainstorm", "test"])
+    result = runner.invoke(cli, ["export", "--compact", "--packed", "-o", "copy.pmk"])
+    assert result.exit_code == 0
+    assert (project_dir / "project.pmk").exists()
+    assert (project_dir / "copy.pmk").read_bytes() == (project_dir / "project.pmk").read_bytes()
+
+    result = runner.invoke(cli, ["export", "--json"])
+    assert json.loads(result.output)["rounds"][0]["prompt"] == "test"
+    assert runner.invoke(cli, ["export", "--compact", "--json"]).exit_code == 0
+    assert not (project_dir / "project.pmk").exists()
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_read_only_project_loads_and_exports(mock_brainstorm, runner, project_dir, monkeypatch):
+    mock_brainstorm.return_value = "- [ ] Idea A"
+    runner.invoke(cli, ["init", "test-proj"])
+    runner.invoke(cli, ["brainstorm", "test"])
+    open_path = Path.open
+
+    def read_only(path, mode="r", *args, **kwargs):
+        if path.parent == project_dir and set(mode) & set("wax+"):
+            raise OSError(errno.EROFS, "Read-only file system", str(path))
+        return open_path(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", read_only)
+    for lock_exists in (True, False):
+        if not lock_exists:
+            (project_dir / "project.lock").unlink()
+        result = runner.invoke(cli, ["export"])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output)["rounds"][0]["prompt"] == "test"
+        assert load_project().rounds[0].bullets[0].text == "Idea A"
+
+
+@pytest.mark.parametrize("args", [["init", "my-app"], ["select", "1"]])
+def test_local_commands_do_not_import_sdk(args, project_dir):
+    if args[0] != "init":
+        proj = create_project("setup")
+        add_round(proj, "p", "- [ ] Idea A\n- [ ] Idea B")
+        save_project(proj)
+    code = (
+        "import sys\n"
+        "from projectmaker.cli import cli\n"
+        "cli(sys.argv[1:], standalone_mode=False)\n"
+        "heavy = [m for m in ('anthropic', 'rich.markdown') if m in sys.modules]\n"
+        "print('HEAVY:' + ','.join(heavy))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=project_dir, capture_output=True, text=True, input="1\n",
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "HEAVY:\n" in result.stdout, result.stdout + result.stderr
+    if args[0] == "select":
+        assert load_project().accepted_ideas == ["Idea A"]
+
+
+@patch("projectmaker.cli.analyzer.ai_client.analyze")
+def test_analyze_reuses_stored_result(mock_analyze, runner, project_dir):
+    mock_analyze.return_value = {"ready": True, "gaps": [], "summary": "Good to go."}
+    runner.invoke(cli, ["init", "test-proj"])
+    proj = load_project()
+    add_round(proj, "p", "- [ ] An idea")
+    select_bullets(proj, 1, [1])
+    save_project(proj)
+    assert runner.invoke(cli, ["analyze"]).exit_code == 0
+    result = runner.invoke(cli, ["analyze"])
+    assert "unchanged" in result.output
+    assert mock_analyze.call_count == 1
+
+
+def test_stats_reports_per_operation(runner, project_dir, isolated_metrics):
+    assert "No API calls" in runner.invoke(cli, ["stats"]).output
+    isolated_metrics.record("brainstorm", "m", latency=1.5, usage={"output_tokens": 40})
+    isolated_metrics.record("brainstorm", "m", latency=2.0, error="APIConnectionError")
+    result = runner.invoke(cli, ["stats"])
+    assert result.exit_code == 0
+    assert "brainstorm" in result.output
+    assert "1 failed (50%)" in result.output
+    assert "p50 1.50s" in result.output
+    assert "APIConnectionError x1" in result.output
+
+
+def test_brainstorm_structured_lists_decoded_ideas(runner, project_dir):
+    runner.invoke(cli, ["init", "test-proj"])
+    with patch("projectmaker.cli.ai_client.create_client") as mock_create:
+        block = type("Block", (), {"type": "tool_use", "input": {"ideas": ["Use SQLite", "Ship a CLI"]}})()
+        mock_create.return_value.messages.create.return_value.content = [block]
+        result = runner.invoke(cli, ["--structured", "brainstorm", "storage"])
+    assert result.exit_code == 0, result.output
+    assert "1. [ ] Use SQLite" in result.output
+    assert [b.text for b in load_project().rounds[0].bullets] == ["Use SQLite", "Ship a CLI"]
+
+
+def test_workspace_command(runner, tmp_path):
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        os.chdir(tmp_path / name)
+        runner.invoke(cli, ["init", name])
+    os.chdir(tmp_path)
+    report = tmp_path / "report.json"
+    result = runner.invoke(cli, ["workspace", ".", "--report", str(report)])
+    assert result.exit_code == 0
+    assert "0 ready, 2 not ready, 0 failed" in result.output
+    assert json.loads(report.read_text())["projects"] == 2
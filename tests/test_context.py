@@ -0,0 +1,85 @@
+"""Tests for the accepted-ideas context budget."""
+
+import os
+
+from projectmaker.core import context
+from projectmaker.core.context import build_context, estimate_tokens, max_tokens_for
+from projectmaker.core.project import create_project, load_project, save_project
+
+
+def project_with(n):
+    proj = create_project("ctx")
+    for i in range(n):
+        proj.accepted_ideas.add(f"Idea number {i:03d} about feature area {i % 7}")
+    return proj
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ideas, previous):
+        self.calls.append((list(ideas), previous))
+        return f"{previous}+{len(ideas)}"
+
+
+def test_estimate_and_max_tokens():
+    assert estimate_tokens("abcd" * 10) == 10
+    assert max_tokens_for("short", ceiling=2048) == 2048
+    huge = "x" * (context.REQUEST_TOKEN_BUDGET * context.CHARS_PER_TOKEN)
+    assert max_tokens_for(huge, ceiling=2048) == context.MIN_OUTPUT_TOKENS
+
+
+def test_small_project_is_verbatim():
+    proj = project_with(3)
+    ctx = build_context(proj, summarize=FakeSummarizer())
+    assert ctx.ideas == list(proj.accepted_ideas)
+    assert ctx.summary == ""
+
+
+def test_large_project_folds_old_ideas_once():
+    proj = project_with(60)
+    summarize = FakeSummarizer()
+    ctx = build_context(proj, budget=200, summarize=summarize)
+    assert len(summarize.calls) == 1
+    assert ctx.folded == len(summarize.calls[0][0])
+    assert ctx.ideas == list(proj.accepted_ideas)[ctx.folded:]
+    assert ctx.summary == "+" + str(ctx.folded)
+
+    again = build_context(proj, budget=200, summarize=summarize)
+    assert len(summarize.calls) == 1
+    assert again.summary == ctx.summary
+
+
+def test_summary_rolls_forward_with_only_new_ideas():
+    proj = project_with(60)
+    summarize = FakeSummarizer()
+    first = build_context(proj, budget=200, summarize=summarize)
+    for i in range(60, 60 + context.FOLD_BATCH + 5):
+        proj.accepted_ideas.add(f"Idea number {i:03d} about feature area {i % 7}")
+    second = build_context(proj, budget=200, summarize=summarize)
+    assert len(summarize.calls) == 2
+    new_ideas, previous = summarize.calls[1]
+    assert previous == first.summary
+    assert new_ideas == list(proj.accepted_ideas)[first.folded:second.folded]
+
+
+def test_relevant_old_ideas_stay_verbatim():
+    proj = project_with(60)
+    proj.accepted_ideas.add("Use PostgreSQL with read replicas")
+    for i in range(60, 80):
+        proj.accepted_ideas.add(f"Idea number {i:03d} about feature area {i % 7}")
+    ctx = build_context(proj, query="postgresql replicas", budget=250, summarize=FakeSummarizer())
+    assert "Use PostgreSQL with read replicas" in ctx.ideas
+
+
+def test_summary_survives_save_and_load(tmp_path):
+    os.chdir(tmp_path)
+    save_project(project_with(60))
+    proj = load_project()
+    summarize = FakeSummarizer()
+    build_context(proj, budget=200, summarize=summarize)
+    save_project(proj)
+
+    build_context(load_project(), budget=200, summarize=summarize)
+    assert len(summarize.calls) == 1
@@ -0,0 +1,130 @@
+"""Tests for the command daemon and the forwarding client."""
+
+import io
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from projectmaker import client, daemon
+from projectmaker.core import ai_client, project, storage
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    monkeypatch.setenv("PROJECTMAKER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("PROJECTMAKER_METRICS", str(tmp_path / "metrics.jsonl"))
+    server = daemon.DaemonServer(tmp_path / "daemon.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def run(server, *argv, stdin=None):
+    out, err = io.StringIO(), io.StringIO()
+    code = client.forward(list(argv), server.socket_path, stdin=stdin, stdout=out, stderr=err)
+    return code, out.getvalue() + err.getvalue()
+
+
+def test_forward_without_daemon(tmp_path):
+    assert client.forward(["analyze"], tmp_path / "missing.sock") is None
+
+
+def test_forwardable():
+    assert client.forwardable(["--no-cache", "brainstorm", "x"], stdin_tty=True)
+    assert not client.forwardable(["serve"], stdin_tty=False)
+    assert not client.forwardable(["select", "1"], stdin_tty=True)
+    assert client.forwardable(["select", "1"], stdin_tty=False)
+
+
+def test_reads_stdin():
+    assert client.reads_stdin(["select", "1"])
+    assert client.reads_stdin(["brainstorm-batch"])
+    assert client.reads_stdin(["brainstorm-batch", "-w", "2", "-"])
+    assert not client.reads_stdin(["brainstorm-batch", "--workers", "2", "prompts.txt"])
+    assert not client.reads_stdin(["--no-cache", "export"])
+
+
+def test_piped_stdin_is_left_for_the_local_cli(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    monkeypatch.setenv(client.SOCKET_ENV, str(tmp_path / "missing.sock"))
+    proj = project.create_project("demo")
+    project.add_round(proj, "p", "- [ ] Idea A\n- [ ] Idea B")
+    project.save_project(proj)
+
+    monkeypatch.setattr("sys.argv", ["projectmaker", "select", "1"])
+    monkeypatch.setattr("sys.stdin", io.StringIO("1,2\n"))
+    with pytest.raises(SystemExit) as exit_info:
+        client.main()
+    assert exit_info.value.code in (0, None)
+    assert project.load_project().accepted_ideas == ["Idea A", "Idea B"]
+
+    # Commands that don't read stdin leave it alone, e.g. for a `while read` loop around them.
+    monkeypatch.setattr("sys.argv", ["projectmaker", "export"])
+    monkeypatch.setattr("sys.stdin", io.StringIO("next\nlines\n"))
+    with pytest.raises(SystemExit):
+        client.main()
+    assert sys.stdin.read() == "next\nlines\n"
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_commands_run_in_daemon(mock_brainstorm, server, tmp_path):
+    mock_brainstorm.return_value = "- [ ] Idea A\n- [ ] Idea B"
+    assert run(server, "init", "demo")[0] == 0
+    code, output = run(server, "brainstorm", "something")
+    assert code == 0
+    assert "round 1" in output
+
+    code, output = run(server, "select", "1", stdin="2\n")
+    assert code == 0
+    assert "Accepted 1 idea(s)" in output
+    assert project.load_project().accepted_ideas == ["Idea B"]
+    assert os.getcwd() == str(tmp_path)
+
+
+def test_errors_return_exit_codes(server):
+    code, output = run(server, "analyze")
+    assert code == 1
+    assert "No project found" in output
+    code, output = run(server, "no-such-command")
+    assert code == 2
+    assert "No such command" in output
+
+
+@patch("projectmaker.cli.ai_client.brainstorm")
+def test_daemon_reuses_loaded_project(mock_brainstorm, server):
+    mock_brainstorm.return_value = "- [ ] Idea A"
+    run(server, "init", "demo")
+    with patch("projectmaker.core.project._load", wraps=project._load) as load:
+        run(server, "brainstorm", "one")
+        run(server, "brainstorm", "two")
+        run(server, "select", "2", stdin="1\n")
+        assert load.call_count == 1
+
+        # A save by another process bumps the version, so the project is re-read.
+        other = project._load(storage.get_store(), lazy=False)
+        project.add_round(other, "elsewhere", "- [ ] Idea X")
+        project.save_project(other)
+        loads = load.call_count
+        code, output = run(server, "select", "3", stdin="1\n")
+        assert code == 0
+        assert load.call_count == loads + 1
+
+
+def test_global_flags_last_one_command(server):
+    run(server, "--no-cache", "--structured", "cache")
+    assert ai_client.get_response_cache() is None
+    run(server, "cache")
+    assert ai_client.get_response_cache() is not None
+    assert not ai_client.structured_output_enabled()
+
+
+def test_second_daemon_refuses_socket(server):
+    with pytest.raises(RuntimeError, match="already listening"):
+        daemon.DaemonServer(server.socket_path)
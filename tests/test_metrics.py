@@ -0,0 +1,104 @@
+"""Tests for API call metrics."""
+
+from unittest.mock import MagicMock, patch
+
+import anthropic
+import pytest
+
+from projectmaker.core import ai_client
+from projectmaker.core.metrics import MetricsStore, percentile, summarize
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(tmp_path / "metrics.jsonl")
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_record_and_summarize(store):
+    store.record("analyze", "m", latency=1.0, ttfb=1.0, usage={"input_tokens": 100, "output_tokens": 20})
+    store.record("analyze", "m", latency=3.0, ttfb=3.0, retries=1, usage={"input_tokens": 50})
+    store.record("analyze", "m", latency=9.0, retries=2, error="RateLimitError")
+    store.record("plan", "m", latency=5.0)
+
+    summary = store.summary()
+    analyze = summary["analyze"]
+    assert analyze["calls"] == 3
+    assert analyze["errors"] == 1
+    assert analyze["error_classes"] == {"RateLimitError": 1}
+    assert analyze["retries"] == 3
+    assert analyze["latency"]["p50"] == 1.0
+    assert analyze["latency"]["p99"] == 3.0
+    assert analyze["tokens"]["input_tokens"] == 150
+    assert summary["plan"]["error_rate"] == 0
+
+
+def test_store_trims_oldest_half(tmp_path):
+    store = MetricsStore(tmp_path / "m.jsonl", max_bytes=2000)
+    for i in range(100):
+        store.record("plan", "m", latency=float(i))
+    entries = store.read()
+    assert len(entries) < 100
+    assert entries[-1]["latency"] == 99.0
+    assert store.path.stat().st_size <= 2000
+
+
+def test_read_skips_torn_lines(store):
+    store.record("plan", "m", latency=1.0)
+    with open(store.path, "a") as f:
+        f.write('{"op": "pl')
+    assert len(store.read()) == 1
+    assert summarize(store.read())["plan"]["calls"] == 1
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_call_claude_records_retries_and_usage(mock_sleep, isolated_metrics):
+    client = MagicMock()
+    client.messages.create.side_effect = [
+        anthropic.APIConnectionError(request=MagicMock()),
+        MagicMock(content=[MagicMock(text="ok")], usage=MagicMock(input_tokens=7, output_tokens=3,
+                                                                  cache_creation_input_tokens=0,
+                                                                  cache_read_input_tokens=0)),
+    ]
+    ai_client.analyze(["idea"], client=client)
+    (entry,) = isolated_metrics.read()
+    assert entry["op"] == "analyze"
+    assert entry["retries"] == 1
+    assert entry["error"] is None
+    assert entry["input_tokens"] == 7
+    assert entry["ttfb"] <= entry["latency"]
+
+
+@patch("projectmaker.core.ai_client.time.sleep")
+def test_failed_call_records_error_class(mock_sleep, isolated_metrics):
+    client = MagicMock()
+    client.messages.create.side_effect = anthropic.APIConnectionError(request=MagicMock())
+    with pytest.raises(RuntimeError):
+        ai_client.call_claude("hi", client=client, operation="plan")
+    (entry,) = isolated_metrics.read()
+    assert entry["error"] == "APIConnectionError"
+    assert entry["retries"] == ai_client.MAX_RETRIES - 1
+
+
+def test_cache_hits_are_not_recorded(isolated_metrics):
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text="ok")])
+    ai_client.call_claude("same", client=client)
+    ai_client.call_claude("same", client=client)
+    assert len(isolated_metrics.read()) == 1
+
+
+def test_unwritable_metrics_file_does_not_fail_the_call(tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    ai_client.set_metrics_store(MetricsStore(not_a_dir / "metrics.jsonl"))
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text="ok")])
+    assert ai_client.call_claude("prompt", client=client) == "ok"
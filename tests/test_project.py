@@ -5,9 +5,13 @@ import os
 
 import pytest
 
+from projectmaker.core import storage
+from projectmaker.core.model import Analysis, Project
 from projectmaker.core.project import (
+    BulletParser,
     add_round,
     create_project,
+    export_project,
     get_round,
     load_project,
     parse_bullets,
@@ -34,20 +38,75 @@ def project_with_round(sample_project):
 
 def test_create_project():
     proj = create_project("my-app")
-    assert proj["name"] == "my-app"
-    assert proj["rounds"] == []
-    assert proj["accepted_ideas"] == []
-    assert proj["analysis"] is None
-    assert proj["plan"] is None
-    assert "created_at" in proj
+    assert proj.name == "my-app"
+    assert proj.rounds == []
+    assert proj.accepted_ideas == []
+    assert proj.analysis is None
+    assert proj.plan is None
+    assert proj.created_at
 
 
 def test_save_and_load_project(tmp_path, sample_project):
     os.chdir(tmp_path)
     save_project(sample_project)
     loaded = load_project()
-    assert loaded["name"] == sample_project["name"]
-    assert loaded["rounds"] == []
+    assert loaded.name == sample_project.name
+    assert loaded.rounds == []
+
+
+def test_save_appends_journal_without_rewriting_snapshot(tmp_path, sample_project):
+    os.chdir(tmp_path)
+    save_project(sample_project)
+    snapshot = (tmp_path / "project.json").read_text()
+
+    proj = load_project()
+    add_round(proj, "p1", "- [ ] A\n- [ ] B")
+    select_bullets(proj, 1, [2])
+    proj.analysis = Analysis(ready=False, gaps=["x"])
+    save_project(proj)
+
+    assert (tmp_path / "project.json").read_text() == snapshot
+    assert len((tmp_path / "project.journal").read_text().splitlines()) == 3
+    loaded = load_project()
+    assert loaded.rounds[0].bullets[1].selected is True
+    assert loaded.accepted_ideas == ["B"]
+    assert loaded.analysis.gaps == ["x"]
+
+
+def test_journal_compacts_into_snapshot(tmp_path, sample_project, monkeypatch):
+    os.chdir(tmp_path)
+    monkeypatch.setattr(storage, "COMPACT_EVERY", 3)
+    save_project(sample_project)
+    for i in range(3):
+        proj = load_project()
+        add_round(proj, f"p{i}", "- [ ] A")
+        save_project(proj)
+
+    assert not (tmp_path / "project.journal").exists()
+    assert len(json.loads((tmp_path / "project.json").read_text())["rounds"]) == 3
+
+
+def test_journal_replay_is_idempotent(tmp_path, sample_project):
+    os.chdir(tmp_path)
+    add_round(sample_project, "p1", "- [ ] A")
+    select_bullets(sample_project, 1, [1])
+    journal = "".join(json.dumps(e) + "\n" for e in sample_project.pending)
+    save_project(sample_project)
+    # Simulate a crash between writing the snapshot and removing the journal.
+    (tmp_path / "project.journal").write_text(journal + '{"op": "add_ro')
+    loaded = load_project()
+    assert len(loaded.rounds) == 1
+    assert loaded.accepted_ideas == ["A"]
+
+
+def test_legacy_project_json_loads_and_exports(tmp_path):
+    os.chdir(tmp_path)
+    legacy = {"name": "old", "created_at": "2025-01-01T00:00:00+00:00", "rounds": [],
+              "accepted_ideas": ["x"], "analysis": None, "plan": None}
+    (tmp_path / "project.json").write_text(json.dumps(legacy, indent=2))
+    loaded = load_project()
+    assert loaded.to_dict() == legacy
+    assert json.loads(export_project(loaded)) == legacy
 
 
 def test_load_project_not_found(tmp_path):
@@ -79,6 +138,11 @@ def test_parse_bullets_fallback():
     assert bullets == ["Idea one", "Idea two", "Idea three"]
 
 
+def test_parse_bullets_structured_response():
+    assert parse_bullets('{"ideas":["Idea one","Idea two"]}') == ["Idea one", "Idea two"]
+    assert parse_bullets('{"ideas":[]}') == []
+
+
 def test_parse_bullets_mixed_content():
     response = """Here are some ideas:
 
@@ -92,34 +156,82 @@ Let me know what you think!"""
     assert bullets[0] == "Build a REST API"
 
 
+def test_bullet_parser_chunked_matches_parse_bullets():
+    response = "Ideas:\n- [ ] Build a REST API\n- [x] Use PostgreSQL\n- [ ] Add auth"
+    parser = BulletParser()
+    seen = []
+    for i in range(0, len(response), 3):
+        seen.extend(parser.feed(response[i:i + 3]))
+    seen.extend(parser.close())
+    assert seen == parse_bullets(response)
+    assert parser.bullets == parse_bullets(response)
+
+
+def test_bullet_parser_waits_for_complete_line():
+    parser = BulletParser()
+    assert parser.feed("- [ ] Partial id") == []
+    assert parser.feed("ea\n- [ ] Next") == ["Partial idea"]
+    assert parser.close() == ["Next"]
+
+
+def test_bullet_parser_checkbox_wins_over_plain():
+    parser = BulletParser()
+    parser.feed("- intro line\n- [ ] Real idea\n- trailing note\n")
+    parser.close()
+    assert parser.bullets == ["Real idea"]
+
+
+def test_add_round_with_preparsed_bullets(sample_project):
+    add_round(sample_project, "p", "- [ ] A\n- [ ] B", bullets=["A", "B"])
+    assert [b.text for b in sample_project.rounds[0].bullets] == ["A", "B"]
+
+
+def test_project_dict_round_trip(project_with_round):
+    select_bullets(project_with_round, 1, [2])
+    project_with_round.analysis = Analysis(ready=True, gaps=[], summary="ok", last_run="t",
+                                           extra={"custom": 1})
+    data = project_with_round.to_dict()
+    data["future_field"] = {"kept": True}
+    restored = Project.from_dict(json.loads(json.dumps(data)))
+    assert restored.to_dict() == data
+    assert restored.analysis.extra == {"custom": 1}
+
+
+def test_get_round_uses_id_index(sample_project):
+    for i in range(5):
+        add_round(sample_project, f"p{i}", "- [ ] A")
+    assert sample_project.round_position(4) == 3
+    assert get_round(sample_project, 4).prompt == "p3"
+
+
 def test_add_round(sample_project):
     response = "- [ ] Idea A\n- [ ] Idea B"
     add_round(sample_project, "test prompt", response)
-    assert len(sample_project["rounds"]) == 1
-    r = sample_project["rounds"][0]
-    assert r["id"] == 1
-    assert r["prompt"] == "test prompt"
-    assert len(r["bullets"]) == 2
-    assert r["bullets"][0]["text"] == "Idea A"
-    assert r["bullets"][0]["selected"] is False
+    assert len(sample_project.rounds) == 1
+    r = sample_project.rounds[0]
+    assert r.id == 1
+    assert r.prompt == "test prompt"
+    assert len(r.bullets) == 2
+    assert r.bullets[0].text == "Idea A"
+    assert r.bullets[0].selected is False
 
 
 def test_add_multiple_rounds(sample_project):
     add_round(sample_project, "p1", "- [ ] A")
     add_round(sample_project, "p2", "- [ ] B")
-    assert len(sample_project["rounds"]) == 2
-    assert sample_project["rounds"][1]["id"] == 2
+    assert len(sample_project.rounds) == 2
+    assert sample_project.rounds[1].id == 2
 
 
 def test_select_bullets(project_with_round):
     select_bullets(project_with_round, 1, [1, 3])
-    r = project_with_round["rounds"][0]
-    assert r["bullets"][0]["selected"] is True
-    assert r["bullets"][1]["selected"] is False
-    assert r["bullets"][2]["selected"] is True
-    assert "Use PostgreSQL database" in project_with_round["accepted_ideas"]
-    assert "Add user authentication" in project_with_round["accepted_ideas"]
-    assert len(project_with_round["accepted_ideas"]) == 2
+    r = project_with_round.rounds[0]
+    assert r.bullets[0].selected is True
+    assert r.bullets[1].selected is False
+    assert r.bullets[2].selected is True
+    assert "Use PostgreSQL database" in project_with_round.accepted_ideas
+    assert "Add user authentication" in project_with_round.accepted_ideas
+    assert len(project_with_round.accepted_ideas) == 2
 
 
 def test_select_bullets_invalid_id(project_with_round):
@@ -130,12 +242,12 @@ def test_select_bullets_invalid_id(project_with_round):
 def test_select_bullets_no_duplicates(project_with_round):
     select_bullets(project_with_round, 1, [1])
     select_bullets(project_with_round, 1, [1])
-    assert project_with_round["accepted_ideas"].count("Use PostgreSQL database") == 1
+    assert list(project_with_round.accepted_ideas).count("Use PostgreSQL database") == 1
 
 
 def test_get_round(project_with_round):
     r = get_round(project_with_round, 1)
-    assert r["id"] == 1
+    assert r.id == 1
 
 
 def test_get_round_not_found(project_with_round):
@@ -0,0 +1,77 @@
+"""Tests for the shared request/token rate limiter."""
+
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+from projectmaker.core import ai_client
+from projectmaker.core.ratelimit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_requests_queue_once_the_bucket_is_empty(tmp_path):
+    clock = Clock()
+    limiter = RateLimiter(requests_per_minute=2, path=tmp_path / "rl.json", clock=clock)
+    assert limiter.reserve("m", 10) == 0
+    assert limiter.reserve("m", 10) == 0
+    # Callers are scheduled in reservation order, 30s apart at 2 rpm.
+    assert limiter.reserve("m", 10) == 30
+    assert limiter.reserve("m", 10) == 60
+    clock.now += 60
+    assert limiter.levels("m")["requests"] == 0
+
+
+def test_token_bucket_schedules_by_estimate_and_settles(tmp_path):
+    clock = Clock()
+    limiter = RateLimiter(tokens_per_minute=600, path=tmp_path / "rl.json", clock=clock)
+    assert limiter.reserve("m", 500) == 0
+    assert limiter.reserve("m", 200) == 10
+    limiter.settle("m", 500, 200)
+    assert limiter.levels("m")["tokens"] == 200
+    # Larger than the whole bucket: waits for a full bucket, not forever.
+    assert limiter.reserve("m", 5000) == 40
+
+
+def test_reserve_without_queueing_takes_nothing(tmp_path):
+    limiter = RateLimiter(requests_per_minute=1, path=tmp_path / "rl.json", clock=Clock())
+    assert limiter.reserve("m", 1, queue=False) == 0
+    assert limiter.reserve("m", 1, queue=False) is None
+    assert limiter.levels("m")["requests"] == 0
+
+
+def test_state_is_shared_between_processes(tmp_path):
+    path = tmp_path / "rl.json"
+    code = (
+        "import sys\n"
+        "from projectmaker.core.ratelimit import RateLimiter\n"
+        "print(RateLimiter(requests_per_minute=3, path=sys.argv[1], clock=lambda: 0.0).reserve('m', 1))\n"
+    )
+    delays = [
+        float(subprocess.run([sys.executable, "-c", code, str(path)], capture_output=True, text=True).stdout)
+        for _ in range(4)
+    ]
+    assert delays == [0.0, 0.0, 0.0, 20.0]
+
+
+@patch("projectmaker.core.ratelimit.time.sleep")
+def test_call_claude_waits_for_its_turn(mock_sleep, tmp_path):
+    limiter = RateLimiter(requests_per_minute=1, path=tmp_path / "rl.json", clock=Clock())
+    limiter.reserve(ai_client.MODEL, 1)
+    ai_client.set_rate_limiter(limiter)
+
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text="ok")])
+    assert ai_client.call_claude("hi", client=client) == "ok"
+    mock_sleep.assert_called_once_with(60)
+
+
+def test_estimate_counts_system_prefix_and_prompt():
+    kwargs = ai_client._request_kwargs("p" * 40, "s" * 40, prefix=["x" * 40])
+    assert ai_client.estimate_request_tokens(kwargs) == 30
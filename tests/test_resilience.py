@@ -0,0 +1,81 @@
+"""Tests for retry classification, backoff and the circuit breaker."""
+
+from unittest.mock import MagicMock
+
+import anthropic
+import pytest
+
+from projectmaker.core import resilience
+from projectmaker.core.resilience import CircuitBreaker, CircuitOpenError, backoff_delay, retry_after, retryable
+
+
+def status_error(status, headers=None):
+    response = MagicMock(status_code=status, headers=headers or {})
+    return anthropic.APIStatusError("failed", response=response, body=None)
+
+
+def test_only_transient_errors_are_retryable():
+    assert retryable(anthropic.APIConnectionError(request=MagicMock()))
+    assert retryable(status_error(429))
+    assert retryable(status_error(529))
+    assert retryable(status_error(500))
+    assert not retryable(status_error(400))
+    assert not retryable(status_error(401))
+    assert not retryable(ValueError("nope"))
+
+
+def test_retry_after_headers():
+    assert retry_after(status_error(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(status_error(429, {"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert retry_after(status_error(429, {"retry-after": "soon"})) is None
+    assert retry_after(status_error(429)) is None
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(3, 1.0) for _ in range(50)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert backoff_delay(20, 1.0) <= resilience.MAX_DELAY
+
+
+def test_backoff_honors_retry_after():
+    delay = backoff_delay(1, 1.0, status_error(429, {"retry-after": "10"}))
+    assert 10.0 <= delay <= 11.0
+    delay = backoff_delay(1, 1.0, status_error(503, {"retry-after": "3600"}))
+    assert delay <= resilience.MAX_RETRY_AFTER + 1.0
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, cooldown=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError, match="10s"):
+        breaker.check()
+
+    now[0] = 10.0
+    assert breaker.state == "half-open"
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20.0
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_released_trial_lets_the_next_call_through():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, cooldown=10, clock=lambda: now[0])
+    assert breaker.check() is False
+    breaker.record_failure()
+    now[0] = 10.0
+    assert breaker.check() is True
+    breaker.release()
+    assert breaker.state == "half-open"
+    assert breaker.check() is True
@@ -0,0 +1,130 @@
+"""Tests for the near-duplicate idea index."""
+
+import os
+
+from projectmaker.core import project, similarity, storage
+from projectmaker.core.model import Bullet, Round
+from projectmaker.core.similarity import IdeaIndex
+
+
+def make_round(round_id, *texts):
+    return Round(round_id, "", "prompt", [Bullet(i + 1, t) for i, t in enumerate(texts)], "")
+
+
+def test_rephrasings_match_and_unrelated_ideas_do_not():
+    index = IdeaIndex()
+    index.add("Add OAuth login with Google and GitHub", 1)
+    index.add("Send a weekly email digest of activity", 1)
+    index.add("Export reports to CSV", 1)
+
+    assert index.match("Implement OAuth-based login via Google and GitHub")[:2] == (
+        "Add OAuth login with Google and GitHub", 1
+    )
+    text, round_id, score = index.match("Weekly activity digest emails")
+    assert (text, round_id) == ("Send a weekly email digest of activity", 1)
+    assert similarity.THRESHOLD <= score < 1
+    assert index.match("Export reports as PDF") is None
+    assert index.match("Cache API responses in Redis") is None
+
+
+def test_documented_rephrasing_matches():
+    assert similarity.similarity("Add OAuth login", "Implement OAuth-based login") >= similarity.THRESHOLD
+
+
+def test_one_swapped_word_is_a_different_idea():
+    assert similarity.similarity("Phase 1: MVP", "Phase 2: MVP") < similarity.THRESHOLD
+    assert similarity.similarity("Add email notifications", "Add push notifications") < similarity.THRESHOLD
+    index = IdeaIndex()
+    index.add_round(make_round(1, "Phase 1: MVP", "Add email notifications"))
+    assert index.match("Phase 2: MVP") is None
+    assert index.match("Add push notifications") is None
+
+
+def test_exact_text_keeps_its_first_round():
+    index = IdeaIndex()
+    index.add_round(make_round(1, "Use SQLite"))
+    index.add_round(make_round(3, "Use SQLite"))
+    assert index.match("Use SQLite") == ("Use SQLite", 1, 1.0)
+    assert len(index) == 1
+    assert index.round_ids() == {1, 3}
+
+
+def test_commit_persists_and_uncommitted_changes_are_dropped(tmp_path):
+    path = tmp_path / "project.ideas"
+    index = IdeaIndex(path)
+    index.add_round(make_round(1, "Send a weekly email digest of activity"))
+    assert index.dirty
+    index.commit()
+    assert not index.dirty
+    index.add_round(make_round(2, "Store uploads in S3"))
+    index.close()
+
+    reopened = IdeaIndex(path)
+    assert reopened.round_ids() == {1}
+    assert reopened.match("Weekly activity digest emails")[1] == 1
+    assert reopened.match("Store uploads in S3") is None
+
+
+def test_changed_scheme_rebuilds_the_index(tmp_path, monkeypatch):
+    path = tmp_path / "project.ideas"
+    index = IdeaIndex(path)
+    index.add_round(make_round(1, "Use SQLite"))
+    index.commit()
+    index.close()
+    monkeypatch.setattr(similarity, "SCHEME", similarity.SCHEME + 1)
+    assert len(IdeaIndex(path)) == 0
+
+
+def test_sync_indexes_only_missing_rounds():
+    proj = project.create_project("p")
+    project.add_round(proj, "a", "- [ ] Use SQLite")
+    project.add_round(proj, "b", "- [ ] Ship a CLI")
+    index = IdeaIndex()
+    index.add_round(proj.rounds[0])
+    assert index.sync(proj) == 1
+    assert index.sync(proj) == 0
+    assert index.match("Ship a CLI") == ("Ship a CLI", 2, 1.0)
+
+
+def test_covered_skips_accepted_and_ranks_related_ideas_first():
+    index = IdeaIndex()
+    index.add_round(make_round(1, "Use PostgreSQL for storage", "Add dark mode"))
+    index.add_round(make_round(2, "Rate limit the public API", "Write a very long idea that goes on and on past the limit"))
+    covered = index.covered({"Add dark mode"}, "storage engine")
+    assert covered[0] == "Use PostgreSQL for storage"
+    assert "Add dark mode" not in covered
+    assert "Write a very long idea that goes on ..." in covered
+
+
+def test_project_index_flags_repeats_and_is_saved_with_the_project(tmp_path):
+    os.chdir(tmp_path)
+    proj = project.create_project("p")
+    project.add_round(proj, "a", "- [ ] Add OAuth login with Google and GitHub")
+    project.save_project(proj)
+
+    loaded = project.load_project(lazy=True)
+    project.load_idea_index(loaded)
+    project.add_round(loaded, "b", "- [ ] Implement OAuth-based login via Google and GitHub\n- [ ] Ship a CLI")
+    round_data = loaded.rounds[-1]
+    assert project.near_duplicates(round_data) == {1: (1, "Add OAuth login with Google and GitHub")}
+    project.save_project(loaded)
+
+    assert project.load_project().rounds[-1].extra[project.DUPLICATES_KEY] == [
+        [1, 1, "Add OAuth login with Google and GitHub"]
+    ]
+    assert IdeaIndex(tmp_path / storage.IDEAS_FILE).round_ids() == {1, 2}
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    os.chdir(tmp_path)
+    stale = IdeaIndex(tmp_path / storage.IDEAS_FILE)
+    stale.add_round(make_round(7, "Ship a CLI"))
+    stale.commit()
+    stale.close()
+    proj = project.create_project("p")
+    project.add_round(proj, "a", "- [ ] Use SQLite")
+    project.save_project(proj)
+
+    index = project.load_idea_index(project.load_project(lazy=True))
+    assert index.round_ids() == {1}
+    assert index.match("Ship a CLI") is None
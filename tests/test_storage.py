@@ -0,0 +1,321 @@
+"""Tests for storage backends."""
+
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from projectmaker.core import packed, project
+from projectmaker.core.model import Analysis
+from projectmaker.core.project import (
+    add_round,
+    compact_project,
+    create_project,
+    get_round,
+    load_project,
+    project_exists,
+    save_project,
+    select_bullets,
+)
+from projectmaker.core.storage import LazyRounds, export_json, export_json_indexed
+
+
+@pytest.fixture
+def saved_project(tmp_path):
+    os.chdir(tmp_path)
+    proj = create_project("big")
+    for i in range(1, 21):
+        add_round(proj, f"prompt {i}", f"- [ ] Idea {i}a\n- [ ] Idea {i}b")
+    select_bullets(proj, 3, [1])
+    save_project(proj)
+    return proj
+
+
+def test_indexed_export_matches_plain_json(saved_project):
+    data = saved_project.to_dict()
+    text, index = export_json_indexed(data)
+    assert text == json.dumps(data, indent=2) + "\n"
+    start, end, round_id = index["rounds"][4]
+    assert round_id == 5
+    assert json.loads(text[start:end]) == data["rounds"][4]
+
+
+def test_lazy_load_only_decodes_touched_rounds(saved_project):
+    proj = load_project(lazy=True)
+    assert isinstance(proj.rounds, LazyRounds)
+    assert proj.accepted_ideas == ["Idea 3a"]
+    assert proj.rounds.loaded_count() == 0
+
+    assert get_round(proj, 7).prompt == "prompt 7"
+    assert proj.rounds.loaded_count() == 1
+    assert proj == saved_project
+
+
+def test_lazy_load_changes_persist(saved_project):
+    proj = load_project(lazy=True)
+    select_bullets(proj, 20, [2])
+    add_round(proj, "prompt 21", "- [ ] Idea 21a")
+    save_project(proj)
+
+    loaded = load_project()
+    assert loaded.accepted_ideas == ["Idea 3a", "Idea 20b"]
+    assert loaded.rounds[-1].id == 21
+
+
+def test_lazy_load_falls_back_on_stale_index(saved_project, tmp_path):
+    data = json.loads((tmp_path / "project.json").read_text())
+    data["name"] = "edited by hand"
+    (tmp_path / "project.json").write_text(json.dumps(data))
+    proj = load_project(lazy=True)
+    assert proj.name == "edited by hand"
+    assert not isinstance(proj.rounds, LazyRounds)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    db = tmp_path / "projects.db"
+    monkeypatch.setenv("PROJECTMAKER_DB", str(db))
+    monkeypatch.setenv("PROJECTMAKER_PROJECT", "alpha")
+    return db
+
+
+def test_sqlite_round_trip(sqlite_db):
+    proj = create_project("alpha")
+    add_round(proj, "p1", "- [ ] A\n- [ ] B")
+    select_bullets(proj, 1, [2])
+    proj.analysis = Analysis(ready=True, gaps=[], summary="ok", last_run="t")
+    proj.plan = "# Plan"
+    save_project(proj)
+
+    assert project_exists()
+    assert not (sqlite_db.parent / "project.json").exists()
+    assert load_project() == proj
+
+
+def test_sqlite_incremental_save(sqlite_db):
+    save_project(create_project("alpha"))
+    proj = load_project()
+    add_round(proj, "p1", "- [ ] A\n- [ ] B")
+    add_round(proj, "p2", "- [ ] C")
+    save_project(proj)
+
+    proj = load_project()
+    select_bullets(proj, 2, [1])
+    select_bullets(proj, 1, [2, 1])
+    proj.analysis = Analysis(ready=False, gaps=["x"])
+    save_project(proj)
+
+    loaded = load_project()
+    assert loaded.accepted_ideas == ["C", "A", "B"]
+    assert [b.selected for b in loaded.rounds[0].bullets] == [True, True]
+    assert loaded.analysis.gaps == ["x"]
+
+
+def test_sqlite_keeps_near_duplicate_flags(sqlite_db):
+    proj = create_project("alpha")
+    add_round(proj, "p1", "- [ ] Add OAuth login with Google and GitHub")
+    save_project(proj)
+
+    proj = load_project(lazy=True)
+    project.load_idea_index(proj)
+    add_round(proj, "p2", "- [ ] Implement OAuth-based login via Google and GitHub")
+    save_project(proj)
+
+    flags = {1: (1, "Add OAuth login with Google and GitHub")}
+    assert project.near_duplicates(load_project().rounds[1]) == flags
+    assert project.near_duplicates(load_project(lazy=True).rounds[1]) == flags
+    project.compact_project(load_project())
+    assert project.near_duplicates(load_project().rounds[1]) == flags
+
+
+def test_sqlite_adds_round_extra_to_old_databases(sqlite_db):
+    conn = sqlite3.connect(sqlite_db)
+    conn.execute(
+        "CREATE TABLE rounds (project_id INTEGER NOT NULL, round_id INTEGER NOT NULL, timestamp TEXT NOT NULL, "
+        "prompt TEXT NOT NULL, raw_response TEXT NOT NULL, PRIMARY KEY (project_id, round_id))"
+    )
+    conn.close()
+    proj = create_project("alpha")
+    add_round(proj, "p1", "- [ ] A")
+    proj.rounds[0].extra["note"] = "kept"
+    save_project(proj)
+    assert load_project().rounds[0].extra == {"note": "kept"}
+
+
+def test_sqlite_holds_many_projects(sqlite_db, monkeypatch):
+    for key in ("alpha", "beta"):
+        monkeypatch.setenv("PROJECTMAKER_PROJECT", key)
+        proj = create_project(key)
+        add_round(proj, f"prompt for {key}", "- [ ] A")
+        save_project(proj)
+
+    monkeypatch.setenv("PROJECTMAKER_PROJECT", "alpha")
+    assert load_project().rounds[0].prompt == "prompt for alpha"
+    conn = sqlite3.connect(sqlite_db)
+    assert conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM rounds").fetchone()[0] == 2
+    conn.close()
+
+
+def test_sqlite_missing_project(sqlite_db):
+    with pytest.raises(FileNotFoundError, match="No project found"):
+        load_project()
+
+
+def test_sqlite_lazy_load(sqlite_db):
+    proj = create_project("alpha")
+    for i in range(1, 6):
+        add_round(proj, f"p{i}", "- [ ] A")
+    save_project(proj)
+
+    lazy = load_project(lazy=True)
+    assert lazy.rounds.loaded_count() == 0
+    assert get_round(lazy, 4).prompt == "p4"
+    assert lazy.rounds.loaded_count() == 1
+    assert lazy == proj
+
+
+def test_stale_save_rebases_rounds_and_selections(saved_project):
+    first = load_project(lazy=True)
+    second = load_project(lazy=True)
+    add_round(first, "from first", "- [ ] First idea")
+    save_project(first)
+
+    add_round(second, "from second", "- [ ] Second idea\n- [ ] Other")
+    select_bullets(second, 21, [1])
+    save_project(second)
+    assert second.rounds[-1].id == 22
+    assert second.pending == []
+
+    loaded = load_project()
+    assert [r.prompt for r in loaded.rounds[-2:]] == ["from first", "from second"]
+    assert "Second idea" in loaded.accepted_ideas
+    assert "First idea" not in loaded.accepted_ideas
+    assert loaded.version == second.version
+
+
+def test_save_bumps_version_by_event_count(saved_project):
+    proj = load_project()
+    version = proj.version
+    add_round(proj, "p", "- [ ] A")
+    select_bullets(proj, 21, [1])
+    save_project(proj)
+    assert proj.version == version + 2
+    assert load_project().version == version + 2
+
+
+def test_compact_keeps_concurrent_changes(saved_project):
+    stale = load_project()
+    other = load_project(lazy=True)
+    add_round(other, "concurrent", "- [ ] X")
+    save_project(other)
+
+    compact_project(stale)
+    assert stale.rounds[-1].prompt == "concurrent"
+    assert load_project().rounds[-1].prompt == "concurrent"
+
+
+def add_rounds_in_worker(args):
+    directory, worker, count = args
+    os.chdir(directory)
+    for i in range(count):
+        proj = load_project(lazy=True)
+        add_round(proj, f"worker {worker} round {i}", f"- [ ] Idea {worker}-{i}")
+        select_bullets(proj, proj.rounds[-1].id, [1])
+        save_project(proj)
+
+
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+def test_concurrent_workers_lose_no_rounds(tmp_path, monkeypatch, backend):
+    os.chdir(tmp_path)
+    if backend == "sqlite":
+        monkeypatch.setenv("PROJECTMAKER_DB", str(tmp_path / "projects.db"))
+        monkeypatch.setenv("PROJECTMAKER_PROJECT", "shared")
+    save_project(create_project("shared"))
+
+    workers, count = 4, 15
+    with ProcessPoolExecutor(workers) as pool:
+        list(pool.map(add_rounds_in_worker, [(tmp_path, w, count) for w in range(workers)]))
+
+    loaded = load_project()
+    assert [r.id for r in loaded.rounds] == list(range(1, workers * count + 1))
+    prompts = {r.prompt for r in loaded.rounds}
+    assert prompts == {f"worker {w} round {i}" for w in range(workers) for i in range(count)}
+    assert len(loaded.accepted_ideas) == workers * count
+    assert all(r.bullets[0].selected for r in loaded.rounds)
+
+
+def test_packed_round_trip_is_smaller(saved_project, tmp_path):
+    compact_project(load_project(), packed=True)
+    assert not (tmp_path / "project.json").exists()
+    assert (tmp_path / "project.pmk").stat().st_size < len(export_json(saved_project.to_dict())) / 2
+    assert load_project() == saved_project
+    assert list(load_project().to_dict()) == list(saved_project.to_dict())
+
+
+def test_packed_lazy_load_and_journal(saved_project, tmp_path, monkeypatch):
+    monkeypatch.setattr(packed, "BLOCK_ROUNDS", 4)
+    compact_project(load_project(), packed=True)
+    proj = load_project(lazy=True)
+    assert isinstance(proj.rounds, LazyRounds)
+    assert get_round(proj, 7).raw_response == "- [ ] Idea 7a\n- [ ] Idea 7b"
+    assert get_round(proj, 18).prompt == "prompt 18"
+    assert proj.rounds.loaded_count() == 2
+    assert proj == saved_project
+
+    add_round(proj, "prompt 21", "- [ ] Idea 21a")
+    save_project(proj)
+    assert (tmp_path / "project.journal").exists()
+    assert load_project().rounds[-1].prompt == "prompt 21"
+
+
+def test_format_is_kept_until_converted_back(saved_project, tmp_path):
+    compact_project(load_project(), packed=True)
+    proj = load_project()
+    compact_project(proj)
+    assert (tmp_path / "project.pmk").exists()
+    compact_project(proj, packed=False)
+    assert not (tmp_path / "project.pmk").exists()
+    assert json.loads((tmp_path / "project.json").read_text()) == saved_project.to_dict()
+    assert isinstance(load_project(lazy=True).rounds, LazyRounds)
+
+
+def test_new_projects_follow_format_env(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    monkeypatch.setenv("PROJECTMAKER_FORMAT", "packed")
+    save_project(create_project("small"))
+    assert (tmp_path / "project.pmk").exists()
+    assert project_exists()
+    assert load_project().name == "small"
+
+
+def test_truncated_packed_file_is_rejected(saved_project, tmp_path):
+    compact_project(load_project(), packed=True)
+    path = tmp_path / "project.pmk"
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError, match="project.pmk"):
+        load_project()
+
+
+def test_interrupted_conversion_to_json_keeps_journaled_rounds(saved_project, tmp_path, monkeypatch):
+    compact_project(load_project(), packed=True)
+    proj = load_project()
+    add_round(proj, "prompt 21", "- [ ] Idea 21a")
+    save_project(proj)
+
+    unlink = type(tmp_path).unlink
+
+    def crash_on_packed(path, missing_ok=False):
+        if path.name == "project.pmk":
+            raise KeyboardInterrupt
+        unlink(path, missing_ok=missing_ok)
+
+    monkeypatch.setattr(type(tmp_path), "unlink", crash_on_packed)
+    with pytest.raises(KeyboardInterrupt):
+        compact_project(proj, packed=False)
+    monkeypatch.undo()
+    loaded = load_project()
+    assert [r.prompt for r in loaded.rounds[-2:]] == ["prompt 20", "prompt 21"]
@@ -0,0 +1,33 @@
+"""Tests for tool-use schemas and structured response decoding."""
+
+import json
+
+from projectmaker.core.structured import ANALYSIS_TOOL, IDEAS_TOOL, decode, decode_analysis, decode_ideas, validate
+
+
+def test_validate_reports_problems_by_path():
+    schema = ANALYSIS_TOOL["input_schema"]
+    assert validate({"ready": True, "gaps": [], "summary": "ok"}, schema) == []
+    errors = validate({"ready": "yes", "gaps": ["a", 3]}, schema)
+    assert "$: missing 'summary'" in errors
+    assert "$.ready: expected boolean" in errors
+    assert "$.gaps[1]: expected string" in errors
+
+
+def test_validate_min_items_and_empty_strings():
+    schema = IDEAS_TOOL["input_schema"]
+    assert validate({"ideas": []}, schema) == ["$.ideas: expected at least 1 item(s)"]
+    assert validate({"ideas": ["  "]}, schema) == ["$.ideas[0]: empty string"]
+
+
+def test_decode_ideas():
+    assert decode_ideas(json.dumps({"ideas": [" Use SQLite ", "Add a CLI"]})) == ["Use SQLite", "Add a CLI"]
+    assert decode_ideas("- [ ] Use SQLite") is None
+    assert decode_ideas('{"ideas": "not a list"}') is None
+    assert decode_ideas('{"ideas": [') is None
+
+
+def test_decode_analysis_normalizes_text():
+    text = json.dumps({"ready": False, "gaps": [" Auth "], "summary": " Needs auth. "})
+    assert decode_analysis(text) == {"ready": False, "gaps": ["Auth"], "summary": "Needs auth."}
+    assert decode(text, IDEAS_TOOL) is None
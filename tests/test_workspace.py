@@ -0,0 +1,76 @@
+"""Tests for workspace sweeps across many projects."""
+
+from unittest.mock import patch
+
+import pytest
+
+from projectmaker.core import storage
+from projectmaker.core.project import load_project
+from projectmaker.core.workspace import discover_projects, readiness_report, run_workspace
+
+
+@pytest.fixture
+def workspace_root(tmp_path, make_project):
+    make_project(tmp_path / "alpha", "alpha", ["Auth", "API"])
+    make_project(tmp_path / "group" / "beta", "beta", ["Queue"])
+    make_project(tmp_path / "empty", "empty")
+    make_project(tmp_path / ".hidden" / "gamma", "gamma", ["X"])
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "project.json").write_text("not json{{{")
+    return tmp_path
+
+
+def fake_analyze(ideas, client=None, summary="", structured=None):
+    ready = "Auth" in ideas
+    return {"ready": ready, "gaps": [] if ready else ["deployment"], "summary": f"{len(ideas)} ideas"}
+
+
+def test_discover_projects_skips_hidden(workspace_root):
+    assert [p.relative_to(workspace_root).as_posix() for p in discover_projects(workspace_root)] == [
+        "alpha", "broken", "empty", "group/beta",
+    ]
+
+
+@patch("projectmaker.core.ai_client.analyze", side_effect=fake_analyze)
+def test_run_workspace_saves_each_project(mock_analyze, workspace_root):
+    directories = discover_projects(workspace_root)
+    seen = []
+    results = run_workspace(directories, workers=2, on_result=seen.append)
+
+    assert [r.path for r in results] == [str(d) for d in directories]
+    assert len(seen) == 4
+    alpha, broken, empty, beta = results
+    assert alpha.ready and not beta.ready
+    assert beta.gaps == ["deployment"]
+    assert "Corrupted" in broken.error
+    assert not empty.ready
+    assert mock_analyze.call_count == 2
+    assert load_project(store=storage.FileStore(workspace_root / "alpha")).analysis.ready
+
+    # A second sweep reuses the stored verdicts.
+    results = run_workspace(directories, workers=2)
+    assert mock_analyze.call_count == 2
+    assert results[0].reused and results[3].reused
+
+
+@patch("projectmaker.core.ai_client.generate_plan", return_value="# Plan")
+@patch("projectmaker.core.ai_client.analyze", side_effect=fake_analyze)
+def test_run_workspace_plans_ready_projects(mock_analyze, mock_plan, workspace_root):
+    results = run_workspace([workspace_root / "alpha", workspace_root / "group" / "beta"], plan=True)
+    assert [r.planned for r in results] == [True, False]
+    assert load_project(store=storage.FileStore(workspace_root / "alpha")).plan == "# Plan"
+    mock_plan.assert_called_once()
+
+
+def test_run_workspace_in_processes(workspace_root):
+    results = run_workspace([workspace_root / "empty", workspace_root / "broken"], workers=2, processes=True)
+    assert results[0].error is None and not results[0].ready
+    assert results[1].error
+
+
+@patch("projectmaker.core.ai_client.analyze", side_effect=fake_analyze)
+def test_readiness_report(mock_analyze, workspace_root):
+    report = readiness_report(run_workspace(discover_projects(workspace_root)))
+    assert (report["projects"], report["ready"], report["not_ready"], report["failed"]) == (4, 1, 2, 1)
+    assert dict(report["common_gaps"])["deployment"] == 1
+    assert len(report["results"]) == 4